@@ -0,0 +1,100 @@
+# benchmarks/ann_benchmark.py
+"""Mede recall@5 e latência p99 do índice LSH contra a busca exata.
+
+Gera catálogos sintéticos (gêneros + palavras-chave, pesados por TF-IDF)
+de tamanhos crescentes e consulta uma amostra de filmes em cada índice.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/ann_benchmark.py --sizes 5000 50000 200000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.model.ann_index import build_ann_index
+
+N_GENRES = 20
+N_KEYWORDS = 20_000
+KEYWORDS_PER_MOVIE = 4
+
+def make_catalog(n_rows, seed=0):
+    """Cria uma matriz TF-IDF esparsa parecida com a do CineBot (gêneros + palavras-chave)."""
+    rng = np.random.default_rng(seed)
+    n_genres = rng.integers(1, 4, size=n_rows)
+    rows, cols = [], []
+    for row, count in enumerate(n_genres):
+        genres = rng.choice(N_GENRES, size=count, replace=False)
+        keywords = N_GENRES + (rng.zipf(1.3, size=KEYWORDS_PER_MOVIE) % N_KEYWORDS)
+        tokens = np.unique(np.concatenate([genres, keywords]))
+        rows.extend([row] * len(tokens))
+        cols.extend(tokens)
+    counts = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                               shape=(n_rows, N_GENRES + N_KEYWORDS))
+    return TfidfTransformer().fit_transform(counts).astype(np.float32)
+
+def run_queries(index, matrix, query_rows, k, **query_params):
+    latencies, results = [], []
+    for row in query_rows:
+        start = time.perf_counter()
+        ids, _ = index.query(matrix[row], k=k, exclude=row, **query_params)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids)
+    return results, np.array(latencies) * 1000
+
+def recall_at_k(approx, exact_scores, index, matrix, query_rows, k):
+    """Recall@k por score: conta os vizinhos aproximados tão bons quanto o k-ésimo exato."""
+    hits = 0
+    for ids, threshold, row in zip(approx, exact_scores, query_rows):
+        if len(ids) == 0:
+            continue
+        scores = (index.matrix[ids] @ matrix[row].T).toarray().ravel()
+        hits += int(np.sum(scores >= threshold - 1e-6))
+    return hits / (k * len(query_rows))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5_000, 50_000, 200_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--probes', type=int, nargs='+', default=[0, 2, 4],
+                        help="Valores de n_probes testados (o ajuste de recall x latência).")
+    args = parser.parse_args(argv)
+
+    print(f"{'N':>9} {'índice':>12} {'build (s)':>10} {'recall@k':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for n_rows in args.sizes:
+        matrix = make_catalog(n_rows)
+        rng = np.random.default_rng(1)
+        query_rows = rng.choice(n_rows, size=min(args.queries, n_rows), replace=False)
+
+        start = time.perf_counter()
+        exact = build_ann_index(matrix, method='exact')
+        exact_build = time.perf_counter() - start
+        exact_ids, exact_ms = run_queries(exact, matrix, query_rows, args.k)
+        exact_scores = [
+            (exact.matrix[ids] @ matrix[row].T).toarray().ravel()[-1]
+            for ids, row in zip(exact_ids, query_rows)
+        ]
+        print(f"{n_rows:>9} {'exact':>12} {exact_build:>10.2f} {1.0:>9.3f} "
+              f"{np.percentile(exact_ms, 50):>9.3f} {np.percentile(exact_ms, 99):>9.3f}")
+
+        start = time.perf_counter()
+        lsh = build_ann_index(matrix, method='lsh')
+        lsh_build = time.perf_counter() - start
+        for n_probes in args.probes:
+            approx_ids, lsh_ms = run_queries(lsh, matrix, query_rows, args.k, n_probes=n_probes)
+            recall = recall_at_k(approx_ids, exact_scores, lsh, matrix, query_rows, args.k)
+            label = f"lsh/p={n_probes}"
+            print(f"{n_rows:>9} {label:>12} {lsh_build:>10.2f} {recall:>9.3f} "
+                  f"{np.percentile(lsh_ms, 50):>9.3f} {np.percentile(lsh_ms, 99):>9.3f}")
+
+if __name__ == '__main__':
+    main()
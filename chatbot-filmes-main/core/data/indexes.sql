@@ -0,0 +1,12 @@
+-- Índices criados ao final do pipeline, depois da carga (mais barato do que
+-- mantê-los linha a linha durante os inserts em massa).
+CREATE INDEX IF NOT EXISTS idx_sor_movies_id ON sor_movies (id);
+
+-- O to_sql(if_exists='replace') descarta as chaves declaradas em sot_tables.sql;
+-- estes índices as recompõem e cobrem as consultas do chat.
+CREATE INDEX IF NOT EXISTS idx_sot_movies_clean_movie_id ON sot_movies_clean (movie_id, vote_average, title);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sot_movie_genres_movie_id ON sot_movie_genres (movie_id, genre_name);
+CREATE INDEX IF NOT EXISTS idx_sot_movie_genres_genre ON sot_movie_genres (genre_name, movie_id);
+
+-- "Qual o melhor gênero?": ORDER BY average_rating DESC LIMIT 1 sem ordenação.
+CREATE INDEX IF NOT EXISTS idx_spec_genre_ratings_rating ON spec_genre_ratings (average_rating DESC, genre_name);
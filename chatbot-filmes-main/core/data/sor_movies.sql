@@ -3,5 +3,6 @@ CREATE TABLE IF NOT EXISTS sor_movies (
                                           title TEXT,
                                           genres TEXT,
                                           vote_average REAL,
-                                          vote_count INTEGER
+                                          vote_count INTEGER,
+                                          row_hash INTEGER -- hash do conteúdo da linha (pipeline incremental)
 );
@@ -1,4 +1,6 @@
-CREATE TABLE IF NOT EXISTS spec_genre_ratings AS
+DROP TABLE IF EXISTS spec_genre_ratings;
+
+CREATE TABLE spec_genre_ratings AS
 SELECT
     g.genre_name,
     AVG(m.vote_average) as average_rating,
@@ -10,4 +12,4 @@ FROM
 GROUP BY
     g.genre_name
 ORDER BY
-    average_rating DESC;
\ No newline at end of file
+    average_rating DESC;
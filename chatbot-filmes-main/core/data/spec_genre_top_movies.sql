@@ -0,0 +1,28 @@
+DROP TABLE IF EXISTS spec_genre_top_movies;
+
+-- Top-N filmes por gênero, já ranqueados. A chave (genre_name, rank) em uma
+-- tabela WITHOUT ROWID faz do "top 5 filmes de X" uma única leitura de intervalo.
+CREATE TABLE spec_genre_top_movies (
+    genre_name TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    title TEXT,
+    rating REAL,
+    PRIMARY KEY (genre_name, rank)
+) WITHOUT ROWID;
+
+INSERT INTO spec_genre_top_movies (genre_name, rank, movie_id, title, rating)
+SELECT genre_name, rank, movie_id, title, rating
+FROM (
+    SELECT
+        g.genre_name,
+        ROW_NUMBER() OVER (PARTITION BY g.genre_name ORDER BY m.vote_average DESC, m.movie_id) AS rank,
+        m.movie_id,
+        m.title,
+        m.vote_average AS rating
+    FROM
+        sot_movies_clean m
+            JOIN
+        sot_movie_genres g ON m.movie_id = g.movie_id
+)
+WHERE rank <= 50;
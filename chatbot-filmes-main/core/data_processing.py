@@ -2,8 +2,17 @@
 import pandas as pd
 import json
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import text, bindparam
 
 MIN_VOTE_COUNT = 500
+# Tamanho dos lotes de ids em cláusulas IN (fica bem abaixo do limite de variáveis do SQLite).
+ID_BATCH_SIZE = 500
+# A partir deste número de filmes o parse do JSON de gêneros é dividido entre
+# processos (json.loads é CPU-bound); abaixo disso o custo do pool não compensa.
+PARALLEL_MIN_ROWS = 50_000
+PARSE_CHUNK_SIZE = 10_000
 
 def _parse_json_genres(genre_str):
     """Função auxiliar para converter a string JSON de gêneros em uma lista de nomes."""
@@ -13,8 +22,48 @@ def _parse_json_genres(genre_str):
     except (json.JSONDecodeError, TypeError):
         return []
 
-def process_and_normalize_data(engine):
-    """Lê da SOR, normaliza os dados e insere na SOT usando um engine SQLAlchemy."""
+def _parse_genres_chunk(values):
+    return [_parse_json_genres(v) for v in values]
+
+def _parse_genres(values, workers=None):
+    """Converte uma sequência de JSONs de gêneros em listas de nomes, em paralelo se for grande."""
+    values = list(values)
+    workers = workers or os.cpu_count() or 1
+    if len(values) < PARALLEL_MIN_ROWS or workers == 1:
+        return _parse_genres_chunk(values)
+
+    chunks = [values[i:i + PARSE_CHUNK_SIZE] for i in range(0, len(values), PARSE_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [genres for chunk in pool.map(_parse_genres_chunk, chunks) for genres in chunk]
+
+def _id_batches(ids):
+    ids = list(dict.fromkeys(int(i) for i in ids))  # sem repetidos: cada filme é reprocessado uma vez
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        yield ids[start:start + ID_BATCH_SIZE]
+
+def _normalize_genres(df_sor):
+    """Explode a coluna JSON de gêneros em pares (movie_id, genre_name)."""
+    df_genres_raw = df_sor[['id', 'genres']].dropna(subset=['genres'])
+    df_genres_raw['genres_list'] = _parse_genres(df_genres_raw['genres'])
+    df_genres_normalized = df_genres_raw.explode('genres_list')
+
+    df_final_genres = df_genres_normalized[['id', 'genres_list']].rename(columns={'id': 'movie_id', 'genres_list': 'genre_name'})
+    df_final_genres.dropna(subset=['genre_name'], inplace=True)
+    df_final_genres.drop_duplicates(inplace=True)
+    return df_final_genres
+
+def process_and_normalize_data(engine, movie_ids=None):
+    """Lê da SOR, normaliza os dados e insere na SOT usando um engine SQLAlchemy.
+
+    Sem `movie_ids`, recria as tabelas SOT inteiras. Com `movie_ids`, só os filmes
+    informados são apagados e reprocessados (modo incremental).
+
+    Retorna um resumo com as linhas escritas e, no modo incremental, os gêneros
+    afetados (antes e depois da mudança), para atualizar a SPEC.
+    """
+    if movie_ids is not None:
+        return _process_movies_incremental(engine, movie_ids)
+
     logging.info("Iniciando processo de normalização de dados (SOR -> SOT).")
 
     try:
@@ -22,23 +71,60 @@ def process_and_normalize_data(engine):
         query = f"SELECT id, title, genres, vote_average FROM sor_movies WHERE vote_count >= {MIN_VOTE_COUNT}"
         df_sor = pd.read_sql_query(query, engine)
 
-        # 2. Popular a tabela sot_movies_clean
         df_sot_movies = df_sor[['id', 'title', 'vote_average']].rename(columns={'id': 'movie_id'})
-        df_sot_movies.to_sql('sot_movies_clean', engine, if_exists='replace', index=False)
-        logging.info(f"Tabela 'sot_movies_clean' populada com {len(df_sot_movies)} filmes.")
+        df_final_genres = _normalize_genres(df_sor)
 
-        # 3. Processar e normalizar os gêneros
-        df_genres_raw = df_sor[['id', 'genres']].dropna(subset=['genres'])
-        df_genres_raw['genres_list'] = df_genres_raw['genres'].apply(_parse_json_genres)
-        df_genres_normalized = df_genres_raw.explode('genres_list')
+        # 2. Popular as tabelas SOT em uma única transação
+        with engine.begin() as connection:
+            df_sot_movies.to_sql('sot_movies_clean', connection, if_exists='replace', index=False)
+            logging.info(f"Tabela 'sot_movies_clean' populada com {len(df_sot_movies)} filmes.")
 
-        df_final_genres = df_genres_normalized[['id', 'genres_list']].rename(columns={'id': 'movie_id', 'genres_list': 'genre_name'})
-        df_final_genres.dropna(subset=['genre_name'], inplace=True)
-        df_final_genres.drop_duplicates(inplace=True)
+            # 3. Processar e normalizar os gêneros
+            df_final_genres.to_sql('sot_movie_genres', connection, if_exists='replace', index=False)
+            logging.info(f"Tabela 'sot_movie_genres' populada com {len(df_final_genres)} relações filme-gênero.")
 
-        df_final_genres.to_sql('sot_movie_genres', engine, if_exists='replace', index=False)
-        logging.info(f"Tabela 'sot_movie_genres' populada com {len(df_final_genres)} relações filme-gênero.")
+        return {'sot_movies': len(df_sot_movies), 'sot_movie_genres': len(df_final_genres), 'affected_genres': None}
 
     except Exception as e:
         logging.error(f"Um erro ocorreu durante a normalização: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def _process_movies_incremental(engine, movie_ids):
+    """Reprocessa SOR -> SOT apenas para os filmes informados, em uma única transação."""
+    logging.info(f"Normalização incremental de {len(movie_ids)} filmes (SOR -> SOT).")
+    in_ids = bindparam('ids', expanding=True)
+    select_genres = text("SELECT DISTINCT genre_name FROM sot_movie_genres WHERE movie_id IN :ids").bindparams(in_ids)
+    select_sor = text(
+        f"SELECT id, title, genres, vote_average FROM sor_movies WHERE vote_count >= {MIN_VOTE_COUNT} AND id IN :ids"
+    ).bindparams(in_ids)
+    delete_movies = text("DELETE FROM sot_movies_clean WHERE movie_id IN :ids").bindparams(in_ids)
+    delete_genres = text("DELETE FROM sot_movie_genres WHERE movie_id IN :ids").bindparams(in_ids)
+
+    affected_genres = set()
+    frames = []
+    try:
+        with engine.begin() as connection:
+            for batch in _id_batches(movie_ids):
+                affected_genres.update(connection.execute(select_genres, {'ids': batch}).scalars())
+                connection.execute(delete_movies, {'ids': batch})
+                connection.execute(delete_genres, {'ids': batch})
+                frames.append(pd.read_sql_query(select_sor, connection, params={'ids': batch}))
+
+            df_sor = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['id', 'title', 'genres', 'vote_average'])
+            df_sot_movies = df_sor[['id', 'title', 'vote_average']].rename(columns={'id': 'movie_id'})
+            df_final_genres = _normalize_genres(df_sor)
+            df_sot_movies.to_sql('sot_movies_clean', connection, if_exists='append', index=False)
+            df_final_genres.to_sql('sot_movie_genres', connection, if_exists='append', index=False)
+
+        affected_genres.update(df_final_genres['genre_name'])
+        logging.info(
+            f"SOT incremental: {len(df_sot_movies)} filmes e {len(df_final_genres)} relações filme-gênero regravados."
+        )
+        return {
+            'sot_movies': len(df_sot_movies),
+            'sot_movie_genres': len(df_final_genres),
+            'affected_genres': sorted(affected_genres),
+        }
+    except Exception as e:
+        logging.error(f"Um erro ocorreu durante a normalização incremental: {e}")
+        raise
@@ -1,10 +1,49 @@
 # core/database_manager.py
+import numpy as np
 import pandas as pd
 import logging
-from sqlalchemy import text
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import create_engine, event, text, bindparam, inspect
+from sqlalchemy.pool import StaticPool
+
+from core.data_processing import ID_BATCH_SIZE
+from core.dataset_cache import iter_csv_chunks
+from core.query_cache import bump_dataset_generation
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+SOR_COLUMNS = ['id', 'title', 'genres', 'vote_average', 'vote_count']
+# Linhas do CSV lidas e gravadas por transação na ingestão da SOR.
+CSV_CHUNK_SIZE = 20_000
+INDEX_SCRIPT_PATH = Path(__file__).parent / 'data' / 'indexes.sql'
+SPEC_TOP_MOVIES_SCRIPT_PATH = Path(__file__).parent / 'data' / 'spec_genre_top_movies.sql'
+# Quantos filmes por gênero ficam materializados em spec_genre_top_movies
+# (deve acompanhar o filtro `rank <= 50` de spec_genre_top_movies.sql).
+TOP_MOVIES_PER_GENRE = 50
+
+# PRAGMAs da sessão de carga em massa: WAL (leitores não bloqueiam o escritor),
+# sem fsync a cada commit e um cache de páginas maior (valor negativo = KiB).
+BULK_LOAD_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'OFF',
+    'cache_size': '-262144',
+    'temp_store': 'MEMORY',
+}
+# Consultas mais lentas que isso são registradas como aviso (as demais, em DEBUG).
+SLOW_QUERY_MS = 200
+# Tempos por consulta (texto SQL -> contagem, total e máximo em ms), ver query_stats().
+_query_stats = {}
+_query_stats_lock = threading.Lock()
+
 def recreate_database(engine, metadata):
     """Dropa todas as tabelas e as cria novamente a partir dos metadados."""
     try:
@@ -16,14 +55,56 @@ def recreate_database(engine, metadata):
         logging.error(f"Erro ao recriar o banco de dados: {e}")
         raise
 
+@contextmanager
+def bulk_load_session(engine):
+    """Engine dedicado para cargas em massa no SQLite.
+
+    Usa uma única conexão (StaticPool) com os BULK_LOAD_PRAGMAS aplicados; tudo o
+    que o pipeline grava passa por ela, em transações explícitas. Ao sair, faz o
+    checkpoint do WAL e descarta a conexão. Esses PRAGMAs (exceto journal_mode,
+    que fica gravado no arquivo) valem só para a conexão que os executou: as
+    conexões do engine normal da aplicação abrem com os valores padrão do SQLite.
+    Para bancos que não são SQLite, devolve o próprio engine.
+    """
+    if engine.dialect.name != 'sqlite':
+        yield engine
+        return
+
+    bulk_engine = create_engine(engine.url, poolclass=StaticPool)
+
+    @event.listens_for(bulk_engine, 'connect')
+    def _apply_bulk_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in BULK_LOAD_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    try:
+        yield bulk_engine
+    finally:
+        try:
+            with bulk_engine.connect() as connection:
+                connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            bulk_engine.dispose()
+
 def execute_sql_from_file(engine, filepath):
-    """Executa um script SQL a partir de um arquivo."""
+    """Executa um script SQL (um ou mais comandos separados por ';') a partir de um arquivo.
+
+    No SQLite, o script inteiro roda em uma transação explícita (o módulo sqlite3
+    não abre transação antes de DDL): um DROP + CREATE de tabela SPEC só fica
+    visível no COMMIT, e as leituras do chat continuam vendo a versão anterior.
+    """
     try:
         with open(filepath, 'r', encoding='utf-8') as sql_file:
             sql_script = sql_file.read()
 
+        statements = [stmt.strip() for stmt in sql_script.split(';') if stmt.strip()]
         with engine.connect() as connection:
-            connection.execute(text(sql_script))
+            if engine.dialect.name == 'sqlite':
+                connection.exec_driver_sql("BEGIN")
+            for statement in statements:
+                connection.execute(text(statement))
             connection.commit() # SQLAlchemy 2.0 style commit
 
         logging.info(f"SQL script '{filepath}' executado com sucesso.")
@@ -31,37 +112,264 @@ def execute_sql_from_file(engine, filepath):
         logging.error(f"Erro ao executar o script SQL '{filepath}': {e}")
         raise
 
-def run_data_pipeline(engine, csv_path, sor_table_name, spec_script_path):
-    """Executa o pipeline completo: CSV -> SOR -> SOT -> SPEC."""
+def _row_hashes(df):
+    """Hash de conteúdo (int64) de cada linha da SOR, usado para detectar mudanças."""
+    hashes = pd.util.hash_pandas_object(df[SOR_COLUMNS].astype(str), index=False)
+    return hashes.to_numpy().view(np.int64)
+
+def refresh_spec_genres(engine, genres):
+    """Recalcula as tabelas SPEC (spec_genre_ratings e spec_genre_top_movies)
+    apenas para os gêneros informados."""
+    in_genres = bindparam('genres', expanding=True)
+    delete_ratings = text("DELETE FROM spec_genre_ratings WHERE genre_name IN :genres").bindparams(in_genres)
+    insert_ratings = text("""
+        INSERT INTO spec_genre_ratings (genre_name, average_rating, movie_count)
+        SELECT g.genre_name, AVG(m.vote_average), COUNT(m.movie_id)
+        FROM sot_movies_clean m JOIN sot_movie_genres g ON m.movie_id = g.movie_id
+        WHERE g.genre_name IN :genres
+        GROUP BY g.genre_name
+    """).bindparams(in_genres)
+    delete_top = text("DELETE FROM spec_genre_top_movies WHERE genre_name IN :genres").bindparams(in_genres)
+    insert_top = text(f"""
+        INSERT INTO spec_genre_top_movies (genre_name, rank, movie_id, title, rating)
+        SELECT genre_name, rank, movie_id, title, rating
+        FROM (
+            SELECT g.genre_name,
+                   ROW_NUMBER() OVER (PARTITION BY g.genre_name ORDER BY m.vote_average DESC, m.movie_id) AS rank,
+                   m.movie_id, m.title, m.vote_average AS rating
+            FROM sot_movies_clean m JOIN sot_movie_genres g ON m.movie_id = g.movie_id
+            WHERE g.genre_name IN :genres
+        )
+        WHERE rank <= {TOP_MOVIES_PER_GENRE}
+    """).bindparams(in_genres)
+
+    genres = list(genres)
+    if not genres:
+        return 0
+    with engine.begin() as connection:
+        connection.execute(delete_ratings, {'genres': genres})
+        connection.execute(insert_ratings, {'genres': genres})
+        connection.execute(delete_top, {'genres': genres})
+        connection.execute(insert_top, {'genres': genres})
+    logging.info(f"SPEC atualizada para {len(genres)} gêneros.")
+    return len(genres)
+
+def _peak_rss_mb():
+    """Pico de memória residente do processo em MB (None se não disponível, ex.: Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+def _upsert_sor_changes(engine, df_chunk, sor_table_name, existing):
+    """Grava na SOR só os filmes do chunk que são novos ou mudaram, em uma transação.
+
+    `existing` mapeia id -> row_hash do que já está na SOR e é atualizado aqui.
+    Retorna (ids novos, ids alterados).
+    """
+    is_new = ~df_chunk['id'].isin(existing.keys())
+    known_hash = df_chunk['id'].map(existing)
+    is_changed = ~is_new & (known_hash != df_chunk['row_hash'])
+    df_new, df_changed = df_chunk[is_new], df_chunk[is_changed]
+
+    delete_sor = text(f"DELETE FROM {sor_table_name} WHERE id IN :ids").bindparams(bindparam('ids', expanding=True))
+    changed_ids = [int(i) for i in df_changed['id']]
+    with engine.begin() as connection:
+        for start in range(0, len(changed_ids), ID_BATCH_SIZE):
+            connection.execute(delete_sor, {'ids': changed_ids[start:start + ID_BATCH_SIZE]})
+        pd.concat([df_new, df_changed]).to_sql(sor_table_name, connection, if_exists='append', index=False)
+
+    existing.update(zip(df_chunk['id'], df_chunk['row_hash']))
+    return df_new['id'].tolist(), df_changed['id'].tolist()
+
+def _delete_sor_ids(engine, sor_table_name, ids):
+    """Apaga da SOR os filmes informados (em lotes de ID_BATCH_SIZE), em uma transação."""
+    delete_sor = text(f"DELETE FROM {sor_table_name} WHERE id IN :ids").bindparams(bindparam('ids', expanding=True))
+    with engine.begin() as connection:
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            connection.execute(delete_sor, {'ids': ids[start:start + ID_BATCH_SIZE]})
+
+def ingest_csv_to_sor(engine, csv_path, sor_table_name, incremental=False, chunksize=CSV_CHUNK_SIZE):
+    """Lê o CSV em chunks e grava na SOR, um chunk por transação.
+
+    Os chunks vêm de `iter_csv_chunks`: um CSV com o mesmo conteúdo de uma
+    execução anterior é lido do cache colunar, sem parse.
+
+    A memória fica limitada a um chunk mais o mapa id -> hash da SOR. No modo
+    completo a tabela é recriada; no incremental só entram linhas novas/alteradas,
+    e os filmes da SOR que não aparecem mais no CSV são apagados.
+    Retorna (ids novos, ids alterados, ids removidos, linhas lidas, estatísticas).
+    """
+    started = time.perf_counter()
+    if incremental:
+        with engine.connect() as connection:
+            df_existing = pd.read_sql_query(f"SELECT id, row_hash FROM {sor_table_name}", connection)
+        existing = dict(zip(df_existing['id'], df_existing['row_hash']))
+    else:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {sor_table_name}"))
+        existing = {}
+
+    # dicts como conjuntos ordenados: um id repetido em outro chunk vale a última
+    # linha (como dentro do chunk), mas entra uma vez só nas listas de ids tocados.
+    new_ids, changed_ids, rows_read = {}, {}, 0
+    seen_ids = set()
+    for chunk in iter_csv_chunks(csv_path, columns=SOR_COLUMNS, chunksize=chunksize):
+        chunk = chunk.drop_duplicates(subset='id', keep='last')
+        chunk['row_hash'] = _row_hashes(chunk)
+        chunk_new, chunk_changed = _upsert_sor_changes(engine, chunk, sor_table_name, existing)
+        new_ids.update(dict.fromkeys(chunk_new))
+        changed_ids.update(dict.fromkeys(i for i in chunk_changed if i not in new_ids))
+        seen_ids.update(chunk['id'])
+        rows_read += len(chunk)
+    new_ids, changed_ids = list(new_ids), list(changed_ids)
+
+    removed_ids = sorted(int(i) for i in existing.keys() - seen_ids)
+    if removed_ids:
+        _delete_sor_ids(engine, sor_table_name, removed_ids)
+        logging.info(f"{len(removed_ids)} filmes que saíram do CSV foram apagados da SOR.")
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'sor_seconds': round(elapsed, 3),
+        'sor_rows_per_s': round(rows_read / elapsed, 1) if elapsed > 0 else None,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+    logging.info(f"Dados de '{csv_path}' gravados na tabela '{sor_table_name}': {rows_read} linhas lidas, {stats}.")
+    return new_ids, changed_ids, removed_ids, rows_read, stats
+
+def _no_progress(stage, progress=None):
+    pass
+
+def run_data_pipeline(engine, csv_path, sor_table_name, spec_script_path, incremental=False, bulk_load=True,
+                      progress=None):
+    """Executa o pipeline completo: CSV -> SOR -> SOT -> SPEC.
+
+    Com `incremental=True`, cada linha do CSV é comparada pelo hash de conteúdo com
+    a SOR e só os filmes novos ou alterados são regravados na SOR e na SOT; os que
+    saíram do CSV são apagados das duas, e a SPEC é recalculada apenas para os
+    gêneros envolvidos (inclusive os dos filmes apagados). Se a SOR ainda não existir
+    (ou não tiver hashes), cai no modo completo.
+
+    Com `bulk_load=True` (padrão) toda a carga roda em uma `bulk_load_session` e
+    os índices de INDEX_SCRIPT_PATH são criados só depois dos dados carregados.
+
+    `progress`, se informado, é chamado como progress(etapa, fração) entre as
+    camadas (ex.: Job.update de core/jobs.py).
+
+    Retorna um resumo com as linhas tocadas em cada camada.
+    """
+    progress = progress or _no_progress
+    if bulk_load:
+        with bulk_load_session(engine) as bulk_engine:
+            return _run_data_pipeline(bulk_engine, csv_path, sor_table_name, spec_script_path, incremental, progress)
+    return _run_data_pipeline(engine, csv_path, sor_table_name, spec_script_path, incremental, progress)
+
+def _run_data_pipeline(engine, csv_path, sor_table_name, spec_script_path, incremental, progress):
     from core.data_processing import process_and_normalize_data # Importação local
 
     logging.info("Iniciando pipeline de dados...")
+    started = time.perf_counter()
 
-    # 1. Inserir CSV na SOR
+    if incremental:
+        inspector = inspect(engine)
+        columns = inspector.get_columns(sor_table_name) if inspector.has_table(sor_table_name) else []
+        if 'row_hash' not in {c['name'] for c in columns} or not inspector.has_table('spec_genre_top_movies'):
+            logging.info("SOR sem hashes de linha ou SPEC incompleta: executando o pipeline completo.")
+            incremental = False
+
+    # 1. Inserir CSV na SOR (em chunks)
+    progress('SOR: ingestão do CSV', 0.0)
     try:
-        colunas_necessarias = ['id', 'title', 'genres', 'vote_average', 'vote_count']
-        df_sor = pd.read_csv(csv_path, usecols=colunas_necessarias)
-        df_sor.to_sql(sor_table_name, engine, if_exists='replace', index=False)
-        logging.info(f"Dados de '{csv_path}' inseridos na tabela '{sor_table_name}'.")
+        new_ids, changed_ids, removed_ids, rows_read, sor_stats = ingest_csv_to_sor(
+            engine, csv_path, sor_table_name, incremental=incremental
+        )
     except Exception as e:
         logging.error(f"Falha ao inserir CSV na SOR: {e}")
         raise
 
-    # 2. Processar SOR para SOT
-    process_and_normalize_data(engine)
+    if incremental:
+        # 2. SOT e SPEC só para os filmes e gêneros afetados. Os removidos já não
+        # estão na SOR: o reprocessamento só os apaga da SOT e devolve seus gêneros.
+        touched_ids = list(dict.fromkeys(new_ids + changed_ids + removed_ids))
+        progress('SOT/SPEC: filmes alterados', 0.5)
+        sot_summary = process_and_normalize_data(engine, movie_ids=touched_ids)
+        spec_genres = refresh_spec_genres(engine, sot_summary['affected_genres'])
+    else:
+        # 2. Processar SOR para SOT
+        progress('SOT: normalização', 0.5)
+        sot_summary = process_and_normalize_data(engine)
+
+        # 3. Criar as tabelas SPEC a partir da SOT
+        progress('SPEC: agregados por gênero', 0.75)
+        execute_sql_from_file(engine, spec_script_path)
+        execute_sql_from_file(engine, SPEC_TOP_MOVIES_SCRIPT_PATH)
+        spec_genres = None
+
+    # 4. Índices depois da carga
+    progress('Criando índices', 0.9)
+    execute_sql_from_file(engine, INDEX_SCRIPT_PATH)
+
+    # 5. Nova geração do dataset: os resultados em cache (core/query_cache.py) deixam de valer
+    generation = bump_dataset_generation(engine)
+
+    summary = {
+        'mode': 'incremental' if incremental else 'full',
+        'sor_inserted': len(new_ids),
+        'sor_updated': len(changed_ids),
+        'sor_deleted': len(removed_ids),
+        'sor_unchanged': rows_read - len(new_ids) - len(changed_ids),
+        'sot_movies': sot_summary['sot_movies'],
+        'sot_movie_genres': sot_summary['sot_movie_genres'],
+        'spec_genres': spec_genres,
+        'generation': generation,
+        # Filmes novos/alterados/removidos, para a atualização incremental do recomendador.
+        'touched_movie_ids': touched_ids if incremental else None,
+        **sor_stats,
+        'total_seconds': round(time.perf_counter() - started, 3),
+    }
+    logging.info(f"Pipeline de dados concluído com sucesso: {summary}")
+    return summary
+
+
+def _record_query_time(query, elapsed_ms):
+    with _query_stats_lock:
+        stats = _query_stats.setdefault(query, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
 
-    # 3. Criar a tabela SPEC a partir da SOT
-    execute_sql_from_file(engine, spec_script_path)
+def query_stats():
+    """Tempos acumulados por consulta, da mais custosa (tempo total) para a menos."""
+    with _query_stats_lock:
+        rows = [{'query': ' '.join(query.split()), **stats, 'mean_ms': stats['total_ms'] / stats['count']}
+                for query, stats in _query_stats.items()]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
 
-    logging.info("Pipeline de dados concluído com sucesso.")
+def query_db(engine, query, params=None, cache=None):
+    """Executa uma query e retorna os resultados como DataFrame.
 
+    Use o `read_engine` de core/config.py nas consultas do chat: conexão do pool,
+    somente leitura e com statements preparados reaproveitados. O tempo de cada
+    consulta (incluindo a espera por uma conexão do pool) é acumulado em
+    query_stats(); as lentas (SLOW_QUERY_MS) são registradas como aviso.
 
-def query_db(engine, query, params=None):
-    """Executa uma query e retorna os resultados como DataFrame."""
+    Com `cache` (um QueryCache de core/query_cache.py), o resultado é procurado
+    antes pela chave SQL + parâmetros + geração do dataset; só as faltas chegam
+    ao banco.
+    """
+    if cache is not None:
+        return cache.get_or_load(engine, query, params, lambda: query_db(engine, query, params))
+    started = time.perf_counter()
     try:
         with engine.connect() as connection:
             df = pd.read_sql_query(text(query), connection, params=params)
-        return df
     except Exception as e:
         logging.error(f"Erro ao executar a query: {e}")
-        return None
\ No newline at end of file
+        return None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _record_query_time(query, elapsed_ms)
+    log = logging.warning if elapsed_ms >= SLOW_QUERY_MS else logging.debug
+    log(f"Query em {elapsed_ms:.1f} ms ({len(df)} linhas): {' '.join(query.split())[:120]}")
+    return df
\ No newline at end of file
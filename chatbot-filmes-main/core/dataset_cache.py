@@ -0,0 +1,118 @@
+# core/dataset_cache.py
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # sem pyarrow o cache fica desligado e o CSV é sempre lido
+    pa = None
+
+# Arquivos Arrow (IPC) com o CSV já parseado, nomeados pelo SHA-256 do conteúdo
+# e pelas colunas lidas (só as pedidas são parseadas e guardadas).
+CACHE_DIR = Path('data/cache')
+HASH_BLOCK_SIZE = 1 << 20
+# Quantos arquivos de cache (conteúdos distintos) ficam em disco; os usados há
+# mais tempo são apagados depois de cada gravação bem-sucedida.
+CACHE_KEEP_FILES = 3
+
+# (caminho, tamanho, mtime) -> sha256, para não reler do disco um CSV que não mudou.
+_file_digests = {}
+
+def file_digest(csv_path):
+    """SHA-256 do conteúdo do arquivo (memorizado enquanto tamanho e mtime não mudam)."""
+    stat = os.stat(csv_path)
+    key = (os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(csv_path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+def cache_path(csv_path, cache_dir=CACHE_DIR, columns=None):
+    """Arquivo de cache de (conteúdo do CSV, colunas): `<sha256>-<hash das colunas>.arrow`."""
+    column_key = 'all' if columns is None else '\x1f'.join(columns)
+    column_hash = hashlib.sha256(column_key.encode('utf-8')).hexdigest()[:12]
+    return Path(cache_dir) / f'{file_digest(csv_path)}-{column_hash}.arrow'
+
+def evict_cache(cache_dir=CACHE_DIR, keep=CACHE_KEEP_FILES):
+    """Apaga os arquivos de cache além dos `keep` usados mais recentemente (mtime)."""
+    files = []
+    for path in Path(cache_dir).glob('*.arrow'):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:  # removido por outro processo
+            pass
+    files.sort(reverse=True)
+    for _, stale in files[keep:]:
+        try:
+            stale.unlink()
+            logging.info(f"Cache colunar: '{stale.name}' removido.")
+        except OSError as e:  # ex.: ainda mapeado por um leitor no Windows
+            logging.warning(f"Cache colunar: não foi possível remover '{stale}': {e}")
+
+def iter_csv_chunks(csv_path, columns=None, chunksize=20_000, cache_dir=CACHE_DIR):
+    """Itera o CSV em DataFrames de até `chunksize` linhas, passando pelo cache colunar.
+
+    Se o conteúdo do arquivo já foi lido com as mesmas `columns`, o Arrow
+    correspondente é mapeado em memória, sem parse de CSV. Senão, o CSV é lido
+    em chunks (só as `columns` pedidas, com os tipos inferidos) e cada chunk é
+    gravado no arquivo de cache enquanto é entregue, sem segurar o arquivo
+    inteiro em memória.
+    """
+    if pa is None:
+        yield from pd.read_csv(csv_path, usecols=columns, chunksize=chunksize)
+        return
+
+    path = cache_path(csv_path, cache_dir, columns)
+    if path.exists():
+        logging.info(f"Cache colunar: lendo '{csv_path}' de '{path}' (sem parse do CSV).")
+        os.utime(path)  # marca o uso, para a remoção dos menos usados
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+        return
+
+    yield from _parse_and_cache(csv_path, path, columns, chunksize)
+
+def _parse_and_cache(csv_path, path, columns, chunksize):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nome único: duas cargas do mesmo CSV ao mesmo tempo não escrevem no mesmo temporário.
+    tmp_path = path.with_name(f'{path.name}.{uuid.uuid4().hex}.tmp')
+    writer, schema, complete = None, None, False
+    try:
+        for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+            if columns is not None:
+                chunk = chunk[columns]  # usecols não preserva a ordem pedida
+            if writer is not None or schema is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if schema is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(str(tmp_path), schema)
+                try:
+                    writer.write_table(table.cast(schema))
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+                    # Tipo inferido mudou entre chunks (ex.: inteiro que ganhou nulos):
+                    # segue sem cache em vez de gravar um arquivo inconsistente.
+                    logging.warning(f"Cache colunar desativado para '{csv_path}': {e}")
+                    writer.close()
+                    writer = None
+                    tmp_path.unlink(missing_ok=True)
+            yield chunk
+        complete = writer is not None
+    finally:
+        if writer is not None:
+            writer.close()
+            if complete:
+                os.replace(tmp_path, path)
+                logging.info(f"Cache colunar de '{csv_path}' gravado em '{path}'.")
+                evict_cache(path.parent)
+            else:
+                tmp_path.unlink(missing_ok=True)
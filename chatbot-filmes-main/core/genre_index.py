@@ -0,0 +1,90 @@
+# core/genre_index.py
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+def _bitset(rows, n_rows):
+    """Inteiro Python com o bit `i` ligado para cada linha `i` de `rows`."""
+    bits = np.zeros(n_rows, dtype=bool)
+    bits[rows] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+class GenreIndex:
+    """Índice em memória de gêneros e notas sobre a SOT, para consultas sem SQL.
+
+    As linhas são os filmes de `sot_movies_clean` ordenados por nota decrescente
+    (desempate por movie_id, como em spec_genre_top_movies). Cada gênero vira um
+    bitset (um int do Python, bit i = linha i), então E/OU/SEM entre gêneros são
+    operações &, | e & ~ sobre inteiros. Como as notas estão ordenadas, "nota
+    acima de X" é um prefixo das linhas (busca binária) e o top-N por nota são os
+    N bits ligados de menor posição.
+    """
+
+    def __init__(self, movie_ids, titles, ratings, genre_rows):
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        self.titles = list(titles)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        self.n_rows = len(self.titles)
+        self.all_rows = (1 << self.n_rows) - 1
+        self._neg_ratings = -self.ratings  # crescente, para o searchsorted
+        self.genres = {genre: _bitset(rows, self.n_rows) for genre, rows in genre_rows.items()}
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Monta o índice a partir das tabelas SOT gravadas por `process_and_normalize_data`."""
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            movies = pd.read_sql_query(
+                "SELECT movie_id, title, vote_average FROM sot_movies_clean ORDER BY vote_average DESC, movie_id",
+                connection,
+            )
+            genres = pd.read_sql_query("SELECT movie_id, genre_name FROM sot_movie_genres", connection)
+
+        position = pd.Series(np.arange(len(movies)), index=movies['movie_id'])
+        genres = genres[genres['movie_id'].isin(position.index)]
+        rows = position.loc[genres['movie_id']].to_numpy()
+        genre_rows = {genre: rows[mask] for genre, mask in
+                      ((g, (genres['genre_name'] == g).to_numpy()) for g in genres['genre_name'].unique())}
+
+        index = cls(movies['movie_id'], movies['title'], movies['vote_average'].fillna(-np.inf), genre_rows)
+        logging.info(f"Índice de gêneros: {index.n_rows} filmes, {len(index.genres)} gêneros "
+                     f"em {time.perf_counter() - started:.2f}s.")
+        return index
+
+    def rating_mask(self, min_rating, inclusive=False):
+        """Bitset das linhas com nota > `min_rating` (>= com `inclusive`): um prefixo das linhas."""
+        side = 'right' if inclusive else 'left'
+        count = int(np.searchsorted(self._neg_ratings, -min_rating, side=side))
+        return (1 << count) - 1
+
+    def select(self, include=(), op='and', exclude=(), min_rating=None, inclusive=False):
+        """Bitset dos filmes com os gêneros de `include` (todos com op='and', algum com op='or'),
+        sem nenhum de `exclude` e com nota acima de `min_rating` (ou igual, com `inclusive`).
+        Gênero desconhecido = conjunto vazio."""
+        if include:
+            sets = [self.genres.get(genre, 0) for genre in include]
+            mask = sets[0]
+            for other in sets[1:]:
+                mask = mask & other if op == 'and' else mask | other
+        else:
+            mask = self.all_rows
+        for genre in exclude:
+            mask &= ~self.genres.get(genre, 0)
+        if min_rating is not None:
+            mask &= self.rating_mask(min_rating, inclusive=inclusive)
+        return mask
+
+    def top(self, mask, n=5):
+        """Os `n` filmes de maior nota do bitset: [(título, nota)]."""
+        result = []
+        while mask and len(result) < n:
+            lowest = mask & -mask
+            row = lowest.bit_length() - 1
+            result.append((self.titles[row], float(self.ratings[row])))
+            mask ^= lowest
+        return result
+
+    def count(self, mask):
+        return bin(mask).count('1')
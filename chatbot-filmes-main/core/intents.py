@@ -0,0 +1,146 @@
+# core/intents.py
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+GENRE_TRANSLATIONS = {
+    "ação": "Action", "aventura": "Adventure", "animação": "Animation",
+    "comédia": "Comedy", "crime": "Crime", "documentário": "Documentary",
+    "drama": "Drama", "família": "Family", "fantasia": "Fantasy",
+    "história": "History", "terror": "Horror", "música": "Music",
+    "mistério": "Mystery", "romance": "Romance", "ficção científica": "Science Fiction",
+    "cinema tv": "TV Movie", "suspense": "Thriller", "guerra": "War", "faroeste": "Western"
+}
+GENRE_TRANSLATIONS_INV = {v: k for k, v in GENRE_TRANSLATIONS.items()}
+
+GREETINGS = {'oi', 'ola', 'olá', 'bom dia'}
+
+# Palavras-chave de cada intenção. Todas (e os nomes dos gêneros) vão para uma
+# única expressão regular, e a mensagem é percorrida uma vez só.
+INTENT_KEYWORDS = {
+    'best': ['melhor'],
+    'genre_word': ['gênero'],
+    'top_movies': ['filmes de', 'top filmes', 'filmes com'],
+    'recommend': ['recomende', 'parecido com', 'similar a'],
+}
+
+# Conectivos entre gêneros: "ação e comédia", "ação ou aventura", "drama sem romance".
+CONNECTORS = {'e': 'and', 'ou': 'or', 'sem': 'not', 'exceto': 'not', 'mas não': 'not'}
+# Filtro de nota: "nota acima de 7", "nota maior que 7.5" (nota > X) e "nota mínima 8"
+# (nota >= X, grupo `minimum`).
+RATING_PATTERN = (r'(?:nota\s+)?(?:acima\s+de|maior\s+que|superior\s+a|(?P<minimum>mínima)(?:\s+de)?)'
+                  r'\s*(?P<rating>\d+(?:[.,]\d+)?)')
+
+# Quantas respostas ficam memorizadas (compartilhadas entre as sessões).
+RESPONSE_MEMO_SIZE = 1024
+
+def _build_matcher():
+    """Tabela termo -> (tipo, valor) e a regex com todos os termos, do mais longo ao mais curto.
+
+    A alternância ordenada por tamanho faz a regex preferir o termo mais longo
+    em cada posição ("animação" e não "ação"); o lookbehind impede que um termo
+    comece no meio de uma palavra. Conectivos (palavras curtas) também exigem o
+    fim da palavra, e o filtro de nota captura o número no mesmo casamento.
+    """
+    terms = {}
+    for kind, keywords in INTENT_KEYWORDS.items():
+        for keyword in keywords:
+            terms[keyword] = (kind, keyword)
+    for genre_pt, genre_en in GENRE_TRANSLATIONS.items():
+        terms[genre_pt] = ('genre', genre_en)
+    alternation = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    connectors = '|'.join(re.escape(c) for c in sorted(CONNECTORS, key=len, reverse=True))
+    pattern = rf'(?<!\w)(?:{RATING_PATTERN}|(?P<connector>{connectors})(?!\w)|(?P<term>{alternation}))'
+    return terms, re.compile(pattern, re.IGNORECASE)
+
+_TERMS, _MATCHER = _build_matcher()
+
+class Intent(namedtuple('Intent', ['name', 'slots'])):
+    """Intenção reconhecida e seus slots, como tupla ordenada de pares (hashável, serve de chave)."""
+    __slots__ = ()
+
+    def slot(self, name, default=None):
+        return dict(self.slots).get(name, default)
+
+def _make_intent(name, **slots):
+    return Intent(name, tuple(sorted(slots.items())))
+
+def parse_intent(prompt):
+    """Classifica a mensagem e extrai os slots em uma única passada da regex.
+
+    Intenções, na mesma prioridade das regras originais: 'greeting',
+    'best_genre' ("melhor" + "gênero"), 'top_movies', 'recommend' (slot
+    `title`: o texto depois da última palavra-chave) e 'unknown'.
+
+    Slots de 'top_movies': `genres` (nomes em inglês, na ordem da mensagem),
+    `op` ('and' ou 'or' entre eles), `exclude` (gêneros depois de "sem"/"exceto")
+    `min_rating` (float ou None) e `rating_inclusive` (True para "nota mínima X",
+    que inclui a própria nota X; False para "acima de X").
+    """
+    if prompt.strip().lower() in GREETINGS:
+        return _make_intent('greeting')
+
+    kinds = set()
+    genres, exclude = [], []
+    op, negate, min_rating, rating_inclusive = 'and', False, None, False
+    recommend_end = None
+    for match in _MATCHER.finditer(prompt):
+        if match.group('rating') is not None:
+            min_rating = float(match.group('rating').replace(',', '.'))
+            rating_inclusive = match.group('minimum') is not None
+            continue
+        if match.group('connector') is not None:
+            connector = CONNECTORS[match.group('connector').lower()]
+            if connector == 'not':
+                negate = True
+            elif connector == 'or' and not negate:
+                op = 'or'
+            continue
+        kind, value = _TERMS[match.group('term').lower()]
+        kinds.add(kind)
+        if kind == 'genre':
+            target = exclude if negate else genres
+            if value not in target:
+                target.append(value)
+        elif kind == 'recommend':
+            recommend_end = match.end()
+
+    if 'best' in kinds and 'genre_word' in kinds:
+        return _make_intent('best_genre')
+    if 'top_movies' in kinds:
+        return _make_intent('top_movies', genres=tuple(genres), op=op, exclude=tuple(exclude), min_rating=min_rating,
+                            rating_inclusive=rating_inclusive)
+    if recommend_end is not None:
+        return _make_intent('recommend', title=prompt[recommend_end:].strip().replace('"', ''))
+    return _make_intent('unknown')
+
+class ResponseMemo:
+    """LRU limitado de respostas determinísticas, chave (intenção, slots, versão do dataset)."""
+
+    def __init__(self, maxsize=RESPONSE_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,142 @@
+# core/jobs.py
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = 'na fila'
+RUNNING = 'executando'
+DONE = 'concluído'
+FAILED = 'erro'
+CANCELLED = 'cancelado'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Quantos jobs terminados continuam visíveis no painel.
+HISTORY_SIZE = 20
+
+class JobCancelled(Exception):
+    """Levantada dentro do job, no próximo ponto de cancelamento, depois de um pedido de cancelamento."""
+
+class Job:
+    """Uma execução em segundo plano, com etapa, progresso e cancelamento cooperativo.
+
+    A função do job recebe o próprio Job. `update(etapa, fração)` só registra o
+    progresso; `report(etapa, fração)` registra e é também um ponto de
+    cancelamento (levanta JobCancelled se alguém pediu para cancelar). Trechos
+    que não podem parar no meio (ex.: a carga SOR -> SOT -> SPEC) usam `update`.
+    """
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex[:8]
+        self.key = key
+        self.name = name
+        self.status = PENDING
+        self.stage = ''
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def update(self, stage, progress=None):
+        self.stage = stage
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+
+    def report(self, stage, progress=None):
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job '{self.name}' cancelado na etapa '{self.stage}'.")
+        self.update(stage, progress)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class JobManager:
+    """Executa jobs em um pool de threads, com no máximo um job ativo por chave.
+
+    A chave identifica o dataset (o CSV, o banco e o modelo derivados dele): um
+    segundo pedido para a mesma chave, enquanto o primeiro está na fila ou
+    executando, recebe o job existente em vez de disputar o banco.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+
+    def submit(self, key, name, fn, *args, **kwargs):
+        """Agenda `fn(job, *args, **kwargs)` sob a chave `key`.
+
+        Retorna (job, criado); `criado` é False quando já havia um job ativo para
+        a chave e ele foi devolvido no lugar de um novo.
+        """
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                return active, False
+            job = Job(key, name)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._trim_history()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.report('iniciando', 0.0)
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            logging.exception(f"Job '{job.name}' ({job.id}) falhou.")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            job._done.set()
+            logging.info(f"Job '{job.name}' ({job.id}) {job.status} em {job.elapsed():.2f}s.")
+
+    def _trim_history(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - HISTORY_SIZE)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id) if job_id else None
+
+    def active(self, key):
+        with self._lock:
+            return self._active.get(key)
+
+    def jobs(self):
+        """Jobs conhecidos, do mais recente para o mais antigo."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
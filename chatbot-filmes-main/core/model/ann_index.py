@@ -0,0 +1,274 @@
+# core/model/ann_index.py
+import numpy as np
+import logging
+from scipy import sparse
+
+# Parâmetros padrão do LSH. Mais tabelas e mais sondagens aumentam o recall
+# (e a latência); mais bits por tabela deixam os baldes menores e mais rápidos.
+# Com n_bits=None o número de bits acompanha o tamanho do catálogo (~64 itens por balde).
+DEFAULT_N_TABLES = 16
+DEFAULT_N_BITS = None
+DEFAULT_N_PROBES = 2
+DEFAULT_MAX_CANDIDATES = 5000
+# Linhas consultadas por bloco em `top_k_with_index`: limita os pares
+# (linha, candidato) pontuados de uma vez a QUERY_BLOCK_SIZE x max_candidates.
+QUERY_BLOCK_SIZE = 256
+
+def _top_k_from_scores(candidates, scores, k):
+    """Seleciona os k melhores candidatos, ordenados pela similaridade."""
+    k = min(k, len(candidates))
+    if k == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return candidates[top].astype(np.int32), scores[top].astype(np.float32)
+
+def _exact_top_k_rows(matrix, matrix_t, rows, k):
+    """Top-k exato (sem a própria linha) das linhas `rows` do índice: dois arrays len(rows) x k."""
+    block = (matrix[rows] @ matrix_t).toarray()
+    block[np.arange(len(rows)), rows] = -np.inf
+    top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    scores = np.take_along_axis(block, top, axis=1)
+    order = np.argsort(-scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+class ExactIndex:
+    """Busca exata (força bruta) por similaridade de cosseno.
+
+    Serve como referência para medir o recall do LSH e como fallback
+    quando o índice aproximado não encontra candidatos suficientes.
+    """
+
+    method = 'exact'
+
+    def __init__(self, matrix):
+        self.matrix = matrix.tocsr().astype(np.float32)
+        self._matrix_t = self.matrix.T.tocsc()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def query(self, vector, k=5, exclude=None):
+        """Retorna (ids, scores) dos k vizinhos mais similares ao vetor (1 x d)."""
+        scores = (vector @ self._matrix_t).toarray().ravel()
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        candidates = np.arange(len(scores))
+        return _top_k_from_scores(candidates, scores, k)
+
+class LSHIndex:
+    """Índice aproximado por projeções aleatórias (SimHash) em várias tabelas.
+
+    Cada tabela transforma o vetor em um código de `n_bits` bits (o sinal de
+    cada projeção). Na consulta, os candidatos são os filmes que caem no mesmo
+    balde em alguma tabela; com `n_probes` > 0 também são visitados os baldes
+    vizinhos obtidos invertendo os bits de menor margem (multi-probe). Só os
+    candidatos são pontuados com o cosseno exato.
+    """
+
+    method = 'lsh'
+
+    def __init__(self, matrix, n_tables=DEFAULT_N_TABLES, n_bits=DEFAULT_N_BITS,
+                 n_probes=DEFAULT_N_PROBES, max_candidates=DEFAULT_MAX_CANDIDATES,
+                 random_state=42, block_size=4096):
+        n_rows = matrix.shape[0]
+        if n_bits is None:
+            n_bits = int(np.clip(round(np.log2(max(n_rows, 2))) - 6, 4, 24))
+        if not 1 <= n_bits <= 63:
+            raise ValueError("n_bits deve estar entre 1 e 63.")
+        self.matrix = matrix.tocsr().astype(np.float32)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.n_probes = n_probes
+        self.max_candidates = max_candidates
+        self.exact = ExactIndex(self.matrix)
+
+        rng = np.random.default_rng(random_state)
+        n_features = self.matrix.shape[1]
+        self._projections = rng.standard_normal((n_features, n_tables * n_bits)).astype(np.float32)
+        self._powers = (np.uint64(1) << np.arange(n_bits, dtype=np.uint64))
+
+        codes = np.empty((n_rows, n_tables), dtype=np.uint64)
+        for start in range(0, n_rows, block_size):
+            end = min(start + block_size, n_rows)
+            projected = self.matrix[start:end] @ self._projections
+            codes[start:end] = self._codes_from_projection(projected)
+
+        # Cada tabela vira um "CSR" de baldes: códigos únicos ordenados e os
+        # intervalos correspondentes em `order` (ids dos filmes ordenados por código).
+        self._tables = []
+        for t in range(n_tables):
+            order = np.argsort(codes[:, t], kind='stable').astype(np.int32)
+            unique_codes, starts = np.unique(codes[order, t], return_index=True)
+            ends = np.append(starts[1:], n_rows)
+            self._tables.append((unique_codes, starts, ends, order))
+
+        logging.info(f"Índice LSH construído: {n_rows} itens, {n_tables} tabelas x {n_bits} bits.")
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _codes_from_projection(self, projected):
+        bits = (np.asarray(projected) > 0).reshape(-1, self.n_tables, self.n_bits)
+        return (bits.astype(np.uint64) * self._powers).sum(axis=2, dtype=np.uint64)
+
+    def _probe_codes(self, projected_row, n_probes):
+        """Gera o código principal e os `n_probes` vizinhos de cada tabela."""
+        projected_row = projected_row.reshape(self.n_tables, self.n_bits)
+        base = self._codes_from_projection(projected_row[None, :, :])[0]
+        codes = [base]
+        if n_probes > 0:
+            # Inverte, em cada tabela, os bits cuja projeção ficou mais perto de zero.
+            weakest = np.argsort(np.abs(projected_row), axis=1)[:, :n_probes]
+            for p in range(weakest.shape[1]):
+                flip = self._powers[weakest[:, p]]
+                codes.append(base ^ flip)
+        return codes
+
+    def candidates(self, vector, n_probes=None):
+        """Retorna os ids candidatos (sem repetição) para o vetor consultado."""
+        n_probes = self.n_probes if n_probes is None else n_probes
+        projected = np.asarray(vector @ self._projections).ravel()
+        found = []
+        for codes in self._probe_codes(projected, n_probes):
+            for t, (unique_codes, starts, ends, order) in enumerate(self._tables):
+                pos = np.searchsorted(unique_codes, codes[t])
+                if pos < len(unique_codes) and unique_codes[pos] == codes[t]:
+                    found.append(order[starts[pos]:ends[pos]])
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        candidates, hits = np.unique(np.concatenate(found), return_counts=True)
+        if len(candidates) > self.max_candidates:
+            # Prioriza quem colidiu em mais tabelas/sondagens: são os mais prováveis vizinhos.
+            keep = np.argpartition(-hits, self.max_candidates - 1)[:self.max_candidates]
+            candidates = np.sort(candidates[keep])
+        return candidates
+
+    def block_candidates(self, rows, n_probes=None):
+        """Candidatos de várias linhas do próprio índice de uma vez.
+
+        Mesmo critério de `candidates` (balde principal e multi-probe em cada
+        tabela, no máximo max_candidates por linha, priorizando quem colidiu mais
+        vezes), mas vetorizado sobre o bloco. A própria linha não entra.
+        Retorna uma CSR len(rows) x N cujas colunas são os candidatos de cada linha.
+        """
+        n_probes = self.n_probes if n_probes is None else n_probes
+        rows = np.asarray(rows, dtype=np.int64)
+        n_queries = len(rows)
+        projected = np.asarray(self.matrix[rows] @ self._projections)
+        base = self._codes_from_projection(projected)
+        probes = [base]
+        if n_probes > 0:
+            margins = np.abs(projected).reshape(n_queries, self.n_tables, self.n_bits)
+            weakest = np.argsort(margins, axis=2)[:, :, :n_probes]
+            for p in range(weakest.shape[2]):
+                probes.append(base ^ self._powers[weakest[:, :, p]])
+
+        max_hits = self.n_tables * len(probes)
+        keys = []
+        for codes in probes:
+            for t, (unique_codes, starts, ends, order) in enumerate(self._tables):
+                pos = np.minimum(np.searchsorted(unique_codes, codes[:, t]), len(unique_codes) - 1)
+                found = unique_codes[pos] == codes[:, t]
+                lengths = np.where(found, ends[pos] - starts[pos], 0)
+                total = int(lengths.sum())
+                if total == 0:
+                    continue
+                # Concatena os intervalos [start, end) de `order` de todas as linhas sem laço.
+                offsets = np.repeat(starts[pos] - (np.cumsum(lengths) - lengths), lengths)
+                keys.append(np.repeat(np.arange(n_queries) * len(self), lengths) + order[np.arange(total) + offsets])
+        # Cada par (linha, candidato) vira a chave linha * N + candidato: ordenadas,
+        # as repetições ficam juntas e o tamanho de cada sequência é o número de colisões.
+        keys = np.sort(np.concatenate(keys)) if keys else np.empty(0, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+        unique_keys, collisions = keys[starts], np.diff(np.r_[starts, len(keys)])
+        not_self = unique_keys % len(self) != rows[unique_keys // len(self)]
+        unique_keys, collisions = unique_keys[not_self], collisions[not_self]
+        indptr = np.searchsorted(unique_keys, np.arange(n_queries + 1) * len(self))
+        hits = sparse.csr_matrix((collisions, unique_keys % len(self), indptr), shape=(n_queries, len(self)))
+
+        counts = np.diff(hits.indptr)
+        if (counts > self.max_candidates).any():
+            # Por linha, o menor número de colisões `threshold` com no máximo
+            # max_candidates candidatos acima dele; as vagas que sobram vão para os
+            # de `threshold - 1` colisões, na ordem dos ids.
+            data = hits.data.astype(np.int64)
+            query_of = np.repeat(np.arange(n_queries), counts)
+            histogram = np.bincount(query_of * (max_hits + 2) + data, minlength=n_queries * (max_hits + 2))
+            at_least = np.cumsum(histogram.reshape(n_queries, max_hits + 2)[:, ::-1], axis=1)[:, ::-1]
+            threshold = np.argmax(at_least <= self.max_candidates, axis=1)
+            free = self.max_candidates - at_least[np.arange(n_queries), threshold]
+            tied = data == threshold[query_of] - 1
+            tied_rank = np.cumsum(tied) - np.repeat(np.cumsum(tied)[hits.indptr[:-1]] - tied[hits.indptr[:-1]], counts)
+            keep = (data >= threshold[query_of]) | (tied & (tied_rank <= free[query_of]))
+            hits.data[~keep] = 0
+            hits.eliminate_zeros()
+        return hits
+
+    def query(self, vector, k=5, exclude=None, n_probes=None):
+        """Retorna (ids, scores) aproximados dos k vizinhos mais similares.
+
+        Se os baldes não trouxerem ao menos k candidatos, recorre à busca exata.
+        """
+        candidates = self.candidates(vector, n_probes=n_probes)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        if len(candidates) < k:
+            return self.exact.query(vector, k=k, exclude=exclude)
+        scores = (self.matrix[candidates] @ vector.T).toarray().ravel()
+        return _top_k_from_scores(candidates, scores, k)
+
+def build_ann_index(matrix, method='lsh', **params):
+    """Constrói o índice de vizinhos escolhido ('lsh' ou 'exact')."""
+    if method == 'lsh':
+        return LSHIndex(matrix, **params)
+    if method == 'exact':
+        return ExactIndex(matrix)
+    raise ValueError(f"Método de índice desconhecido: '{method}'.")
+
+def top_k_with_index(index, k, block_size=QUERY_BLOCK_SIZE):
+    """Monta as listas de top-k vizinhos de todas as linhas consultando o índice, bloco a bloco.
+
+    No LSH, os candidatos de um bloco de linhas saem de `block_candidates` e os
+    pares (linha, candidato) são pontuados em uma operação esparsa só; linhas
+    com menos de k candidatos recorrem à busca exata, como em `LSHIndex.query`.
+    """
+    n_rows = len(index)
+    k = max(0, min(k, n_rows - 1))
+    neighbor_ids = np.full((n_rows, k), -1, dtype=np.int32)
+    neighbor_scores = np.full((n_rows, k), -np.inf, dtype=np.float32)
+    if k == 0:
+        return neighbor_ids, neighbor_scores
+
+    exact = index if index.method == 'exact' else index.exact
+    for start in range(0, n_rows, block_size):
+        rows = np.arange(start, min(start + block_size, n_rows))
+        if index.method == 'exact':
+            fallback = rows
+        else:
+            candidates = index.block_candidates(rows)
+            counts = np.diff(candidates.indptr)
+            local = np.repeat(np.arange(len(rows)), counts)
+            # Cosseno de cada par (os vetores já são normalizados, L2): cada valor
+            # não nulo do candidato vezes a mesma coluna da linha consultada (densa).
+            queries = index.matrix[rows].toarray()
+            members = index.matrix[candidates.indices]
+            pair = np.repeat(np.arange(candidates.nnz), np.diff(members.indptr))
+            products = members.data * queries[local[pair], members.indices]
+            scores = np.bincount(pair, weights=products, minlength=candidates.nnz)
+
+            # Top-k por linha em uma matriz len(rows) x max(candidatos) completada com -inf.
+            padded = np.full((len(rows), max(int(counts.max(initial=0)), k)), -np.inf)
+            padded[local, np.arange(candidates.nnz) - np.repeat(candidates.indptr[:-1], counts)] = scores
+            top = np.argpartition(-padded, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(padded, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            enough = counts >= k
+            neighbor_ids[rows[enough]] = candidates.indices[(candidates.indptr[:-1, None] + top)[enough]]
+            neighbor_scores[rows[enough]] = np.take_along_axis(top_scores, order, axis=1)[enough]
+            fallback = rows[~enough]
+        if len(fallback):
+            ids, scores = _exact_top_k_rows(exact.matrix, exact._matrix_t, fallback, k)
+            neighbor_ids[fallback], neighbor_scores[fallback] = ids, scores
+    return neighbor_ids, neighbor_scores
@@ -0,0 +1,393 @@
+# core/model/artifact.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections import namedtuple
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from core.title_matcher import TitleMatcher
+
+SCHEMA_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# Arquivos do artefato. Todos são .npy (ou bytes crus) para poderem ser abertos
+# com mmap: várias sessões e processos compartilham as mesmas páginas do cache do SO.
+NEIGHBOR_IDS_FILE = 'neighbor_ids.npy'
+NEIGHBOR_SCORES_FILE = 'neighbor_scores.npy'
+TITLES_DATA_FILE = 'titles.bin'
+TITLES_OFFSETS_FILE = 'title_offsets.npy'
+# Matriz TF-IDF (CSR) das linhas, usada pelas atualizações incrementais.
+TFIDF_DATA_FILE = 'tfidf_data.npy'
+TFIDF_INDICES_FILE = 'tfidf_indices.npy'
+TFIDF_INDPTR_FILE = 'tfidf_indptr.npy'
+
+# Segmento delta (atualizações incrementais desde o último artefato completo).
+# Fica em um diretório irmão, `<artefato>.delta`, e vale só para o build_hash
+# do artefato em que foi gerado. É pequeno e lido inteiro, por isso um único .npz.
+DELTA_SUFFIX = '.delta'
+DELTA_ARRAYS_FILE = 'delta.npz'
+
+def _encode_titles(titles):
+    """Guarda os títulos de forma colunar: bytes UTF-8 concatenados + offsets."""
+    encoded = [str(t).encode('utf-8') for t in titles]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return b''.join(encoded), offsets
+
+def _decode_title(titles_data, offsets, idx):
+    start, end = offsets[idx], offsets[idx + 1]
+    return bytes(titles_data[start:end]).decode('utf-8')
+
+def _fresh_dir(directory):
+    """Prepara `<directory>.tmp` vazio para uma gravação que depois é trocada com `_swap_dir`."""
+    tmp_dir = directory.with_name(directory.name + '.tmp')
+    old_dir = directory.with_name(directory.name + '.old')
+    for stale in (tmp_dir, old_dir):
+        if stale.exists():
+            shutil.rmtree(stale)
+    tmp_dir.mkdir(parents=True)
+    return tmp_dir
+
+def _swap_dir(tmp_dir, directory):
+    old_dir = directory.with_name(directory.name + '.old')
+    if directory.exists():
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    if old_dir.exists():
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+def _hash_files(directory, names):
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update((directory / name).read_bytes())
+    return digest.hexdigest()
+
+def _live_rows(neighbor_ids, tfidf_matrix):
+    """Máscara das linhas vivas: com vetor TF-IDF ou com algum vizinho.
+
+    Filmes que uma atualização incremental removeu (ou cujo título mudou) ficam
+    sem vetor e sem vizinhos; essas linhas não são recomendáveis nem buscáveis.
+    """
+    return (np.diff(tfidf_matrix.indptr) > 0) | (np.asarray(neighbor_ids) >= 0).any(axis=1)
+
+def _drop_rows(neighbor_ids, neighbor_scores, titles, tfidf_matrix, live):
+    """Remove as linhas mortas e renumera as posições nas listas de vizinhos."""
+    new_position = np.cumsum(live) - 1
+    neighbor_ids = np.asarray(neighbor_ids)[live]
+    neighbor_scores = np.asarray(neighbor_scores)[live]
+    valid = neighbor_ids >= 0
+    valid[valid] = live[neighbor_ids[valid]]
+    neighbor_ids = np.where(valid, new_position[np.maximum(neighbor_ids, 0)], -1)
+    neighbor_scores = np.where(valid, neighbor_scores, -np.inf)
+    titles = [t for t, alive in zip(titles, live) if alive]
+    return neighbor_ids, neighbor_scores, titles, tfidf_matrix[live]
+
+def save_artifact(directory, neighbor_ids, neighbor_scores, titles, tfidf_matrix=None, dataset_generation=None):
+    """Grava o artefato de recomendação em `directory` e retorna o manifesto.
+
+    O diretório é escrito ao lado (sufixo .tmp) e só então trocado pelo atual,
+    para que leitores nunca vejam um artefato pela metade. Com `tfidf_matrix`,
+    a matriz TF-IDF também é gravada, o que habilita `update_recommender`, e as
+    linhas mortas (sem vetor e sem vizinhos, ver `_live_rows`) são descartadas.
+    `dataset_generation` é a geração do dataset (core/query_cache.py) lida no treino.
+    Um segmento delta do artefato anterior deixa de valer (o build_hash muda) e é apagado.
+    """
+    directory = Path(directory)
+    if tfidf_matrix is not None:
+        tfidf_matrix = sparse.csr_matrix(tfidf_matrix, dtype=np.float64)
+        live = _live_rows(neighbor_ids, tfidf_matrix)
+        if not live.all():
+            logging.info(f"Artefato: {int((~live).sum())} filmes removidos descartados.")
+            neighbor_ids, neighbor_scores, titles, tfidf_matrix = _drop_rows(
+                neighbor_ids, neighbor_scores, titles, tfidf_matrix, live
+            )
+    tmp_dir = _fresh_dir(directory)
+
+    titles_data, title_offsets = _encode_titles(titles)
+    np.save(tmp_dir / NEIGHBOR_IDS_FILE, np.ascontiguousarray(neighbor_ids, dtype=np.int32))
+    np.save(tmp_dir / NEIGHBOR_SCORES_FILE, np.ascontiguousarray(neighbor_scores, dtype=np.float32))
+    np.save(tmp_dir / TITLES_OFFSETS_FILE, title_offsets)
+    (tmp_dir / TITLES_DATA_FILE).write_bytes(titles_data)
+    files = [NEIGHBOR_IDS_FILE, NEIGHBOR_SCORES_FILE, TITLES_OFFSETS_FILE, TITLES_DATA_FILE]
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'row_count': int(len(title_offsets) - 1),
+        'k': int(neighbor_ids.shape[1]),
+        'dataset_generation': dataset_generation,
+    }
+    if tfidf_matrix is not None:
+        np.save(tmp_dir / TFIDF_DATA_FILE, tfidf_matrix.data)
+        np.save(tmp_dir / TFIDF_INDICES_FILE, tfidf_matrix.indices.astype(np.int32))
+        np.save(tmp_dir / TFIDF_INDPTR_FILE, tfidf_matrix.indptr.astype(np.int64))
+        files += [TFIDF_DATA_FILE, TFIDF_INDICES_FILE, TFIDF_INDPTR_FILE]
+        manifest['tfidf_shape'] = [int(n) for n in tfidf_matrix.shape]
+
+    manifest['build_hash'] = _hash_files(tmp_dir, files)
+    manifest['created_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    with open(tmp_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    _swap_dir(tmp_dir, directory)
+    delta_dir = directory.with_name(directory.name + DELTA_SUFFIX)
+    if delta_dir.exists():
+        shutil.rmtree(delta_dir, ignore_errors=True)
+
+    logging.info(f"Artefato de recomendação salvo em '{directory}' ({manifest['row_count']} filmes).")
+    return manifest
+
+def replace_rows(matrix, positions, rows, n_rows=None):
+    """Cópia da matriz CSR com as linhas `positions` trocadas por `rows`, estendida até `n_rows` linhas.
+
+    Custa O(nnz) (duas multiplicações esparsas), sem converter a matriz para LIL.
+    """
+    matrix = sparse.csr_matrix(matrix)
+    n_rows = max(matrix.shape[0], n_rows or 0)
+    positions = np.asarray(positions, dtype=np.int64)
+    if n_rows > matrix.shape[0]:
+        matrix = sparse.vstack([matrix, sparse.csr_matrix((n_rows - matrix.shape[0], matrix.shape[1]))]).tocsr()
+    keep = np.ones(n_rows)
+    keep[positions] = 0.0
+    placement = sparse.csr_matrix(
+        (np.ones(len(positions)), (positions, np.arange(len(positions)))), shape=(n_rows, len(positions))
+    )
+    result = (sparse.diags(keep) @ matrix + placement @ sparse.csr_matrix(rows)).tocsr()
+    result.eliminate_zeros()
+    return result
+
+# Atualizações acumuladas sobre um artefato: títulos acrescentados (posições a
+# partir de row_count), vetores TF-IDF das linhas novas/alteradas e as listas de
+# vizinhos que mudaram (substituem as do artefato nessas posições).
+DeltaSegment = namedtuple('DeltaSegment', [
+    'base_build_hash', 'delta_hash', 'dataset_generation', 'titles', 'vector_positions', 'vectors',
+    'override_positions', 'override_ids', 'override_scores',
+])
+
+def delta_dir_for(directory):
+    directory = Path(directory)
+    return directory.with_name(directory.name + DELTA_SUFFIX)
+
+def save_delta(directory, base_build_hash, titles, vector_positions, vectors,
+               override_positions, override_ids, override_scores, dataset_generation=None):
+    """Grava (substituindo) o segmento delta do artefato em `directory` e retorna o manifesto dele.
+
+    Mesma troca atômica do artefato: leitores veem o delta anterior ou o novo, nunca metade.
+    """
+    delta_dir = delta_dir_for(directory)
+    tmp_dir = _fresh_dir(delta_dir)
+
+    titles_data, title_offsets = _encode_titles(titles)
+    vectors = sparse.csr_matrix(vectors, dtype=np.float64)
+    np.savez(
+        tmp_dir / DELTA_ARRAYS_FILE,
+        titles_data=np.frombuffer(titles_data, dtype=np.uint8),
+        title_offsets=title_offsets,
+        vector_positions=np.asarray(vector_positions, dtype=np.int64),
+        vector_data=vectors.data,
+        vector_indices=vectors.indices.astype(np.int32),
+        vector_indptr=vectors.indptr.astype(np.int64),
+        vector_shape=np.asarray(vectors.shape, dtype=np.int64),
+        override_positions=np.asarray(override_positions, dtype=np.int64),
+        override_ids=np.ascontiguousarray(override_ids, dtype=np.int32),
+        override_scores=np.ascontiguousarray(override_scores, dtype=np.float32),
+    )
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'base_build_hash': base_build_hash,
+        'dataset_generation': dataset_generation,
+        'appended_rows': len(titles),
+        'vector_rows': int(vectors.shape[0]),
+        'override_rows': int(len(override_positions)),
+        'delta_hash': _hash_files(tmp_dir, [DELTA_ARRAYS_FILE]),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(tmp_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    _swap_dir(tmp_dir, delta_dir)
+    logging.info(
+        f"Delta do recomendador salvo em '{delta_dir}' ({manifest['appended_rows']} filmes novos, "
+        f"{manifest['override_rows']} listas de vizinhos alteradas)."
+    )
+    return manifest
+
+def read_delta_manifest(directory, build_hash):
+    """Manifesto do delta de `directory`, ou None se não houver delta para este build_hash."""
+    try:
+        with open(delta_dir_for(directory) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    return manifest if manifest.get('base_build_hash') == build_hash else None
+
+def load_delta(directory, build_hash):
+    """Carrega o segmento delta de `directory` (DeltaSegment) ou None se não houver um válido."""
+    manifest = read_delta_manifest(directory, build_hash)
+    if manifest is None:
+        return None
+    with np.load(delta_dir_for(directory) / DELTA_ARRAYS_FILE) as arrays:
+        offsets = arrays['title_offsets']
+        titles_data = arrays['titles_data']
+        vectors = sparse.csr_matrix(
+            (arrays['vector_data'], arrays['vector_indices'], arrays['vector_indptr']),
+            shape=tuple(arrays['vector_shape']),
+        )
+        return DeltaSegment(
+            base_build_hash=build_hash,
+            delta_hash=manifest['delta_hash'],
+            dataset_generation=manifest.get('dataset_generation'),
+            titles=[_decode_title(titles_data, offsets, i) for i in range(len(offsets) - 1)],
+            vector_positions=arrays['vector_positions'],
+            vectors=vectors,
+            override_positions=arrays['override_positions'],
+            override_ids=arrays['override_ids'],
+            override_scores=arrays['override_scores'],
+        )
+
+def artifact_version(build_hash, delta_manifest):
+    """Versão servida: o build hash do artefato, mais o hash do delta quando houver um."""
+    if delta_manifest is None:
+        return build_hash
+    return f"{build_hash}+{delta_manifest['delta_hash']}"
+
+class RecommenderArtifact:
+    """Artefato de recomendação aberto com mmap (somente leitura).
+
+    Abrir é O(1) em relação ao catálogo: só o manifesto (e o delta, pequeno) é
+    lido; os arrays são paginados sob demanda pelo SO. O índice de títulos
+    (TitleMatcher) é montado na primeira recomendação, só com as linhas vivas.
+
+    Se houver um segmento delta para este build, ele é aplicado na leitura: os
+    títulos acrescentados vêm depois dos do artefato e as listas de vizinhos
+    alteradas substituem as originais.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError(
+                f"Versão de schema do artefato não suportada: {self.manifest.get('schema_version')} "
+                f"(esperada {SCHEMA_VERSION})."
+            )
+
+        self.neighbor_ids = np.load(self.directory / NEIGHBOR_IDS_FILE, mmap_mode='r')
+        self.neighbor_scores = np.load(self.directory / NEIGHBOR_SCORES_FILE, mmap_mode='r')
+        self._title_offsets = np.load(self.directory / TITLES_OFFSETS_FILE, mmap_mode='r')
+        titles_path = self.directory / TITLES_DATA_FILE
+        if titles_path.stat().st_size > 0:
+            self._titles_data = np.memmap(titles_path, dtype=np.uint8, mode='r')
+        else:
+            self._titles_data = np.empty(0, dtype=np.uint8)
+
+        if len(self._title_offsets) - 1 != self.manifest['row_count']:
+            raise ValueError("Artefato inconsistente: número de títulos difere do manifesto.")
+
+        self.base_rows = self.manifest['row_count']
+        self.delta = load_delta(self.directory, self.build_hash)
+        self._overrides = {}
+        if self.delta is not None:
+            self._overrides = {int(pos): i for i, pos in enumerate(self.delta.override_positions)}
+
+    def __len__(self):
+        return self.base_rows + (len(self.delta.titles) if self.delta is not None else 0)
+
+    @property
+    def build_hash(self):
+        return self.manifest['build_hash']
+
+    @property
+    def version(self):
+        """Identifica o conteúdo servido (artefato + delta); é o fingerprint do registro."""
+        if self.delta is None:
+            return self.build_hash
+        return f"{self.build_hash}+{self.delta.delta_hash}"
+
+    @property
+    def k(self):
+        return self.manifest['k']
+
+    @property
+    def dataset_generation(self):
+        """Geração do dataset refletida pelo que é servido (a do delta, se houver); None se desconhecida."""
+        if self.delta is not None:
+            return self.delta.dataset_generation
+        return self.manifest.get('dataset_generation')
+
+    @property
+    def has_tfidf(self):
+        return 'tfidf_shape' in self.manifest
+
+    def title(self, idx):
+        if idx >= self.base_rows:
+            return self.delta.titles[idx - self.base_rows]
+        return _decode_title(self._titles_data, self._title_offsets, idx)
+
+    def titles(self):
+        """Decodifica todos os títulos (O(N)); usado para montar o índice de busca."""
+        return [self.title(i) for i in range(len(self))]
+
+    def neighbor_row(self, idx):
+        """(posições, similaridades) dos k vizinhos da posição `idx`, já com o delta aplicado."""
+        override = self._overrides.get(idx)
+        if override is not None:
+            return self.delta.override_ids[override], self.delta.override_scores[override]
+        return self.neighbor_ids[idx], self.neighbor_scores[idx]
+
+    def neighbors(self, idx, n=5):
+        """Retorna as posições dos n filmes mais parecidos com o da posição `idx`."""
+        return [int(i) for i in self.neighbor_row(idx)[0] if i >= 0][:n]
+
+    def neighbor_arrays(self):
+        """Cópias N x k (graváveis) dos vizinhos e similaridades, com o delta aplicado."""
+        neighbor_ids = np.full((len(self), self.k), -1, dtype=np.int32)
+        neighbor_scores = np.full((len(self), self.k), -np.inf, dtype=np.float32)
+        neighbor_ids[:self.base_rows] = self.neighbor_ids
+        neighbor_scores[:self.base_rows] = self.neighbor_scores
+        if self.delta is not None and len(self.delta.override_positions):
+            neighbor_ids[self.delta.override_positions] = self.delta.override_ids
+            neighbor_scores[self.delta.override_positions] = self.delta.override_scores
+        return neighbor_ids, neighbor_scores
+
+    def live_rows(self):
+        """Máscara das linhas com vetor TF-IDF ou com algum vizinho (ver `_live_rows`).
+
+        Sem a matriz TF-IDF (artefatos antigos), todas as linhas contam como vivas.
+        """
+        if not self.has_tfidf:
+            return np.ones(len(self), dtype=bool)
+        neighbor_ids, _ = self.neighbor_arrays()
+        indptr = np.load(self.directory / TFIDF_INDPTR_FILE, mmap_mode='r')
+        has_vector = np.zeros(len(self), dtype=bool)
+        has_vector[:self.base_rows] = np.diff(indptr) > 0
+        if self.delta is not None and len(self.delta.vector_positions):
+            has_vector[self.delta.vector_positions] = np.diff(self.delta.vectors.indptr) > 0
+        return has_vector | (neighbor_ids >= 0).any(axis=1)
+
+    def tfidf_matrix(self):
+        """Matriz TF-IDF (CSR) de todas as linhas, com os vetores do delta aplicados."""
+        if not self.has_tfidf:
+            raise ValueError("Artefato sem a matriz TF-IDF; execute um treino completo.")
+        matrix = sparse.csr_matrix(
+            (np.load(self.directory / TFIDF_DATA_FILE),
+             np.load(self.directory / TFIDF_INDICES_FILE),
+             np.load(self.directory / TFIDF_INDPTR_FILE)),
+            shape=tuple(self.manifest['tfidf_shape']),
+        )
+        if self.delta is None:
+            return matrix
+        return replace_rows(matrix, self.delta.vector_positions, self.delta.vectors, n_rows=len(self))
+
+    @cached_property
+    def title_matcher(self):
+        rows = np.flatnonzero(self.live_rows())
+        return TitleMatcher([self.title(i) for i in rows], rows=rows)
@@ -1,57 +1,342 @@
 # core/model/model_trainer.py
+import numpy as np
 import pandas as pd
 import pickle
 import logging
+import time
 from pathlib import Path
+from scipy import sparse
+from sqlalchemy import bindparam, text
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
+from core.model.ann_index import build_ann_index, top_k_with_index
+from core.model.artifact import RecommenderArtifact, save_artifact, save_delta, replace_rows, MANIFEST_NAME
+from core.query_cache import read_dataset_generation
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 MODEL_PATH = Path('model/')
-MODEL_NAME = 'movie_recommender.pkl'
+ARTIFACT_NAME = 'recommender'
+VECTORIZER_NAME = 'tfidf_vectorizer.pkl'
+# Índice aproximado gravado por versões anteriores; ninguém o carrega (ele só
+# serve para calcular as listas de vizinhos durante o treino) e é apagado.
+LEGACY_ANN_INDEX_NAME = 'ann_index.pkl'
 
-def train_and_save_model(engine):
-    """Treina e salva o modelo de recomendação usando um engine SQLAlchemy."""
-    logging.info("Iniciando o treinamento do modelo de recomendação...")
+# Quantidade de vizinhos guardados por filme no índice de recomendação.
+TOP_K = 20
+# Linhas da matriz TF-IDF processadas por bloco: a memória de pico do treino
+# fica em BLOCK_SIZE x N (um bloco de similaridades) mais N x TOP_K (o índice).
+BLOCK_SIZE = 512
+# A partir deste tamanho de catálogo os vizinhos são calculados pelo índice
+# aproximado (LSH) em vez da varredura exata em blocos, que é O(N²).
+ANN_MIN_ROWS = 50_000
+# Atualização incremental: acima deste número de filmes alterados o treino
+# completo sai mais barato (e a matriz de similaridades alterados x N fica limitada).
+MAX_INCREMENTAL_ROWS = BLOCK_SIZE
+# O delta é incorporado a um novo artefato completo quando as listas de vizinhos
+# alteradas passam desta fração do catálogo.
+COMPACTION_RATIO = 0.1
+
+# Um documento por título: os nomes dos gêneros separados por espaço.
+CATALOG_QUERY = """
+                SELECT m.title, GROUP_CONCAT(g.genre_name, ' ') as genres
+                FROM sot_movies_clean m JOIN sot_movie_genres g ON m.movie_id = g.movie_id
+                {where}
+                GROUP BY m.title
+                """
+
+def compute_top_k_neighbors(tfidf_matrix, k=TOP_K, block_size=BLOCK_SIZE):
+    """Calcula os k vizinhos mais similares de cada linha, bloco a bloco.
+
+    Retorna dois arrays N x k: os índices dos vizinhos (int32) e as
+    similaridades de cosseno (float32), ordenados da maior para a menor.
+    O próprio filme nunca aparece na sua lista de vizinhos.
+    """
+    n_rows = tfidf_matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    neighbor_ids = np.empty((n_rows, k), dtype=np.int32)
+    neighbor_scores = np.empty((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return neighbor_ids, neighbor_scores
+
+    matrix_t = tfidf_matrix.T.tocsc()
+    for start in range(0, n_rows, block_size):
+        end = min(start + block_size, n_rows)
+        # Os vetores TF-IDF já são normalizados (L2), então o produto escalar é o cosseno.
+        block = (tfidf_matrix[start:end] @ matrix_t).toarray()
+        rows = np.arange(end - start)
+        block[rows, rows + start] = -np.inf
 
-    query = """
-            SELECT m.title, GROUP_CONCAT(g.genre_name, ' ') as genres
-            FROM sot_movies_clean m JOIN sot_movie_genres g ON m.movie_id = g.movie_id
-            GROUP BY m.title; \
-            """
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
 
+        neighbor_ids[start:end] = np.take_along_axis(top, order, axis=1)
+        neighbor_scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbor_ids, neighbor_scores
+
+def train_and_save_model(engine, k=TOP_K, ann_method=None, ann_params=None, progress=None):
+    """Treina e salva o índice de recomendação (top-k vizinhos) usando um engine SQLAlchemy.
+
+    `ann_method` escolhe como as listas de vizinhos são calculadas: 'exact'
+    (varredura em blocos) ou 'lsh' (índice aproximado, só em memória durante o
+    treino); por padrão usa LSH quando o catálogo tem ao menos ANN_MIN_ROWS filmes.
+    `ann_params` ajusta o LSH (recall x tempo de treino): n_tables, n_bits,
+    n_probes e max_candidates de core/model/ann_index.py.
+
+    `progress`, se informado, é chamado como progress(etapa, fração) antes de
+    cada etapa, e nunca depois que os arquivos começam a ser gravados (ex.:
+    Job.report de core/jobs.py, que pode cancelar o treino nesses pontos).
+    """
+    progress = progress or (lambda stage, fraction=None: None)
+    logging.info("Iniciando o treinamento do modelo de recomendação...")
+    progress('Lendo a SOT', 0.0)
+
+    generation = read_dataset_generation(engine)
     with engine.connect() as connection:
-        df = pd.read_sql_query(query, connection)
+        df = pd.read_sql_query(CATALOG_QUERY.format(where=''), connection)
 
     if df.empty:
         logging.error("Não foi possível treinar o modelo. O DataFrame está vazio.")
         return
 
+    progress('TF-IDF dos gêneros', 0.2)
     tfidf = TfidfVectorizer()
     tfidf_matrix = tfidf.fit_transform(df['genres'])
-    cosine_sim = linear_kernel(tfidf_matrix, tfidf_matrix)
+    if ann_method is None:
+        ann_method = 'lsh' if len(df) >= ANN_MIN_ROWS else 'exact'
+    progress(f'Índice de vizinhos ({ann_method})', 0.4)
+    if ann_method == 'exact':
+        neighbor_ids, neighbor_scores = compute_top_k_neighbors(tfidf_matrix, k=k)
+    else:
+        # O índice só existe em memória: o que o app usa são as listas de vizinhos.
+        ann_index = build_ann_index(tfidf_matrix, method=ann_method, **(ann_params or {}))
+        neighbor_ids, neighbor_scores = top_k_with_index(ann_index, k=k)
+    logging.info(f"Índice top-{neighbor_ids.shape[1]} ({ann_method}) calculado para {len(df)} filmes.")
 
+    progress('Salvando o modelo', 0.9)
     MODEL_PATH.mkdir(parents=True, exist_ok=True)
-    recommendation_data = {'cosine_sim': cosine_sim, 'dataframe': df}
-
-    with open(MODEL_PATH / MODEL_NAME, 'wb') as f:
-        pickle.dump(recommendation_data, f)
+    with open(MODEL_PATH / VECTORIZER_NAME, 'wb') as f:
+        pickle.dump(tfidf, f)
+    (MODEL_PATH / LEGACY_ANN_INDEX_NAME).unlink(missing_ok=True)
+    save_artifact(MODEL_PATH / ARTIFACT_NAME, neighbor_ids, neighbor_scores, df['title'],
+                  tfidf_matrix=tfidf_matrix, dataset_generation=generation)
 
     logging.info(f"Modelo salvo com sucesso na pasta '{MODEL_PATH}'")
 
+def _top_k_row(similarities, k):
+    """Os k maiores valores de um vetor de similaridades: (posições, scores), do maior para o menor.
+
+    Posições com similaridade -inf (o próprio filme, linhas sem vetor) viram -1.
+    """
+    top = np.argpartition(-similarities, k - 1)[:k]
+    order = np.argsort(-similarities[top], kind='stable')
+    top, scores = top[order], similarities[top][order]
+    return np.where(np.isfinite(scores), top, -1), scores
+
+def update_neighbor_lists(tfidf_matrix, neighbor_ids, neighbor_scores, upserted):
+    """Atualiza, no lugar, as listas de vizinhos depois que as linhas `upserted` mudaram.
+
+    `tfidf_matrix` já deve conter os vetores novos, e os arrays N x k já devem
+    ter as linhas acrescentadas. Custo: um produto alterados x N (as
+    similaridades das linhas alteradas com todas as outras) mais, para cada
+    lista afetada, uma comparação com o k-ésimo vizinho. Uma lista só é
+    recalculada por inteiro (uma linha x N) quando um vizinho dela caiu abaixo
+    do k-ésimo score, porque aí o substituto pode ser qualquer filme.
+
+    Linhas sem vetor (filmes removidos da SOT) não são vizinhas de ninguém.
+    Retorna as posições cujas listas foram regravadas.
+    """
+    k = neighbor_ids.shape[1]
+    upserted = np.unique(np.asarray(upserted, dtype=np.int64))
+    if k == 0 or len(upserted) == 0:
+        return upserted
+    empty = np.diff(tfidf_matrix.indptr) == 0
+    matrix_t = tfidf_matrix.T.tocsc()
+
+    sims = (tfidf_matrix[upserted] @ matrix_t).toarray()
+    sims[:, empty] = -np.inf
+    sims[empty[upserted], :] = -np.inf
+    sims[np.arange(len(upserted)), upserted] = -np.inf
+
+    def recompute(row, similarities):
+        similarities[row] = -np.inf
+        similarities[empty] = -np.inf
+        neighbor_ids[row], neighbor_scores[row] = _top_k_row(similarities, k)
+
+    # 1. As listas dos próprios filmes alterados/novos.
+    for r, row in enumerate(upserted):
+        recompute(row, sims[r].copy())
+
+    # 2. As listas que continham um filme alterado ou em que um deles agora entra.
+    is_upserted = np.zeros(len(neighbor_ids), dtype=bool)
+    is_upserted[upserted] = True
+    kth = neighbor_scores[:, -1]
+    contains = np.isin(neighbor_ids, upserted)
+    affected = (contains.any(axis=1) | (sims > kth).any(axis=0)) & ~is_upserted & ~empty
+    rank = np.full(len(neighbor_ids), -1, dtype=np.int64)
+    rank[upserted] = np.arange(len(upserted))
+
+    for row in np.flatnonzero(affected):
+        ids, scores = neighbor_ids[row], neighbor_scores[row]
+        members = contains[row]
+        if (sims[rank[ids[members]], row] < kth[row]).any():
+            recompute(row, (tfidf_matrix[row] @ matrix_t).toarray().ravel())
+            continue
+        keep = ~members & (ids >= 0)
+        candidate_ids = np.concatenate([ids[keep], upserted])
+        candidate_scores = np.concatenate([scores[keep], sims[:, row]])
+        order = np.argsort(-candidate_scores, kind='stable')[:k]
+        new_scores = np.full(k, -np.inf, dtype=np.float32)
+        new_ids = np.full(k, -1, dtype=np.int32)
+        new_scores[:len(order)] = candidate_scores[order]
+        new_ids[:len(order)] = np.where(np.isfinite(candidate_scores[order]), candidate_ids[order], -1)
+        neighbor_ids[row], neighbor_scores[row] = new_ids, new_scores
+
+    return np.union1d(upserted, np.flatnonzero(affected))
+
+def _changed_documents(engine, movie_ids):
+    """Documentos atuais (SOT) dos títulos dos filmes informados e todos os títulos do catálogo.
+
+    Os títulos vêm da SOT já regravada, não da SOR: um filme renomeado traz o
+    título novo, e o antigo é detectado como removido pela comparação do
+    artefato com o catálogo (ver `update_recommender`).
+    """
+    select_docs = text(CATALOG_QUERY.format(
+        where='WHERE m.title IN (SELECT title FROM sot_movies_clean WHERE movie_id IN :ids)'
+    )).bindparams(bindparam('ids', expanding=True))
+    select_catalog = text(
+        "SELECT DISTINCT m.title FROM sot_movies_clean m JOIN sot_movie_genres g ON m.movie_id = g.movie_id"
+    )
+    with engine.connect() as connection:
+        catalog = set(connection.execute(select_catalog).scalars())
+        if not movie_ids:
+            return pd.DataFrame(columns=['title', 'genres']), catalog
+        docs = pd.read_sql_query(select_docs, connection, params={'ids': list(movie_ids)})
+    return docs, catalog
+
+def update_recommender(engine, movie_ids, progress=None):
+    """Atualiza o recomendador só para os filmes novos ou alterados (ex.: os de uma carga incremental).
+
+    Os documentos desses filmes passam pelo vetorizador salvo (vocabulário e IDF
+    congelados), suas similaridades são calculadas contra o catálogo e só as
+    listas de vizinhos afetadas mudam (`update_neighbor_lists`). O resultado é
+    gravado como segmento delta ao lado do artefato; quando o delta passa de
+    COMPACTION_RATIO do catálogo, é incorporado a um novo artefato completo.
+
+    O artefato guarda a geração do dataset de que foi gerado. Se ela não for a
+    imediatamente anterior à atual (uma atualização foi cancelada ou falhou
+    depois da carga, e os filmes dela nunca chegaram ao recomendador), faz o
+    treino completo em vez de aplicar só esta carga. Também faz o treino
+    completo quando não há artefato com a matriz TF-IDF ou quando há mais de
+    MAX_INCREMENTAL_ROWS filmes alterados. Gêneros que não existiam no treino
+    ficam fora do vocabulário; só um treino completo os incorpora.
+
+    Títulos do artefato que saíram do catálogo (filmes removidos ou renomeados)
+    ficam sem vetor e sem vizinhos: deixam de ser buscáveis e são descartados
+    na próxima compactação.
+
+    `progress` segue a mesma convenção de `train_and_save_model`.
+    """
+    progress = progress or (lambda stage, fraction=None: None)
+    started = time.perf_counter()
+    artifact_dir = MODEL_PATH / ARTIFACT_NAME
+    artifact = load_recommendation_data() if (artifact_dir / MANIFEST_NAME).exists() else None
+    generation = read_dataset_generation(engine)
+    if artifact is None or not artifact.has_tfidf or len(movie_ids) > MAX_INCREMENTAL_ROWS:
+        reason = "sem artefato com TF-IDF" if artifact is None or not artifact.has_tfidf else "muitos filmes alterados"
+    elif artifact.dataset_generation is None or artifact.dataset_generation != generation - 1:
+        reason = f"artefato da geração {artifact.dataset_generation}, dataset na geração {generation}"
+    else:
+        reason = None
+    if reason is not None:
+        logging.info(f"Atualização incremental indisponível ({reason}): executando o treino completo.")
+        train_and_save_model(engine, k=artifact.k if artifact is not None else TOP_K, progress=progress)
+        return {'mode': 'full', 'reason': reason}
+
+    progress('Lendo os filmes alterados', 0.0)
+    docs, catalog = _changed_documents(engine, movie_ids)
+    artifact_titles = artifact.titles()
+    positions = {title: i for i, title in enumerate(artifact_titles)}
+    current_matrix = artifact.tfidf_matrix()
+    live = np.diff(current_matrix.indptr) > 0
+    removed = [t for i, t in enumerate(artifact_titles) if live[i] and t not in catalog]
+    new_titles = [t for t in docs['title'] if t not in positions]
+    for i, title in enumerate(new_titles):
+        positions[title] = len(artifact) + i
+
+    progress('TF-IDF dos filmes alterados', 0.2)
+    with open(MODEL_PATH / VECTORIZER_NAME, 'rb') as f:
+        tfidf = pickle.load(f)
+    if docs.empty:
+        vectors = sparse.csr_matrix((0, current_matrix.shape[1]))
+    else:
+        vectors = tfidf.transform(docs['genres'])
+    unknown = int((np.diff(vectors.indptr) == 0).sum())
+    if unknown:
+        logging.warning(f"{unknown} filmes só têm gêneros fora do vocabulário; faça um treino completo para incluí-los.")
+    rows = sparse.vstack([vectors, sparse.csr_matrix((len(removed), vectors.shape[1]))]).tocsr()
+    upserted = np.array([positions[t] for t in list(docs['title']) + removed], dtype=np.int64)
+
+    n_rows = len(artifact) + len(new_titles)
+    tfidf_matrix = replace_rows(current_matrix, upserted, rows, n_rows=n_rows)
+    neighbor_ids, neighbor_scores = artifact.neighbor_arrays()
+    if new_titles:
+        neighbor_ids = np.vstack([neighbor_ids, np.full((len(new_titles), artifact.k), -1, dtype=np.int32)])
+        neighbor_scores = np.vstack([neighbor_scores, np.full((len(new_titles), artifact.k), -np.inf, dtype=np.float32)])
+
+    progress('Vizinhos dos filmes alterados', 0.4)
+    changed = update_neighbor_lists(tfidf_matrix, neighbor_ids, neighbor_scores, upserted)
+
+    progress('Salvando o delta', 0.9)
+    delta = artifact.delta
+    vector_positions = np.union1d(delta.vector_positions if delta else [], upserted).astype(np.int64)
+    override_positions = np.union1d(delta.override_positions if delta else [], changed).astype(np.int64)
+    summary = {
+        'upserted': len(docs),
+        'appended': len(new_titles),
+        'removed': len(removed),
+        'neighbor_lists_updated': int(len(changed)),
+    }
+    if len(override_positions) > COMPACTION_RATIO * artifact.base_rows:
+        titles_all = artifact_titles + new_titles
+        save_artifact(artifact_dir, neighbor_ids, neighbor_scores, titles_all,
+                      tfidf_matrix=tfidf_matrix, dataset_generation=generation)
+        summary['mode'] = 'compacted'
+    else:
+        # Mesmo sem filmes alterados o delta é regravado: ele registra a nova geração.
+        save_delta(
+            artifact_dir, artifact.build_hash, (delta.titles if delta else []) + new_titles,
+            vector_positions, tfidf_matrix[vector_positions],
+            override_positions, neighbor_ids[override_positions], neighbor_scores[override_positions],
+            dataset_generation=generation,
+        )
+        summary['mode'] = 'delta'
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    logging.info(f"Recomendador atualizado incrementalmente: {summary}")
+    return summary
+
+def compact_recommender():
+    """Incorpora o segmento delta a um novo artefato completo (sem recalcular similaridades)."""
+    artifact = load_recommendation_data()
+    if artifact is None or artifact.delta is None:
+        return False
+    neighbor_ids, neighbor_scores = artifact.neighbor_arrays()
+    save_artifact(artifact.directory, neighbor_ids, neighbor_scores, artifact.titles(),
+                  tfidf_matrix=artifact.tfidf_matrix(), dataset_generation=artifact.dataset_generation)
+    return True
+
 def load_recommendation_data():
-    """Carrega os dados de recomendação do arquivo pickle."""
-    model_file = MODEL_PATH / MODEL_NAME
-    if not model_file.exists():
-        logging.error(f"Arquivo do modelo não encontrado em '{model_file}'.")
-        return None, None
+    """Abre o artefato de recomendação (mmap) salvo pelo treino."""
+    artifact_dir = MODEL_PATH / ARTIFACT_NAME
+    if not (artifact_dir / MANIFEST_NAME).exists():
+        logging.error(f"Artefato do modelo não encontrado em '{artifact_dir}'.")
+        return None
 
     try:
-        with open(model_file, 'rb') as f:
-            data = pickle.load(f)
-        logging.info("Modelo de recomendação carregado do arquivo pickle.")
-        return data['cosine_sim'], data['dataframe']
+        artifact = RecommenderArtifact(artifact_dir)
+        logging.info(f"Modelo de recomendação carregado (build {artifact.build_hash[:12]}).")
+        return artifact
     except Exception as e:
-        logging.error(f"Erro ao carregar o arquivo do modelo: {e}")
-        return None, None
\ No newline at end of file
+        logging.error(f"Erro ao carregar o artefato do modelo: {e}")
+        return None
@@ -0,0 +1,98 @@
+# core/model/registry.py
+import json
+import logging
+import threading
+from collections import namedtuple
+
+from core.model.artifact import MANIFEST_NAME, RecommenderArtifact, artifact_version, read_delta_manifest
+
+# Uma versão carregada do modelo. Quem atende uma requisição pega um snapshot
+# (versão + objeto) no início e usa sempre o mesmo, mesmo que um retreino
+# troque a versão atual no meio do caminho.
+ModelVersion = namedtuple('ModelVersion', ['version', 'model'])
+
+class ModelRegistry:
+    """Mantém uma instância carregada por versão do modelo, compartilhada no processo.
+
+    `fingerprint()` devolve um identificador barato da versão em disco (ou None
+    se não houver modelo) e `loader()` carrega o modelo. Uma thread em segundo
+    plano consulta o fingerprint a cada `poll_interval` segundos; quando ele muda,
+    a nova versão é carregada fora do lock e trocada atomicamente.
+    """
+
+    def __init__(self, loader, fingerprint, poll_interval=5.0, name='modelo'):
+        self._loader = loader
+        self._fingerprint = fingerprint
+        self.poll_interval = poll_interval
+        self.name = name
+        self._current = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        """Snapshot da versão atual (ModelVersion) ou None se não houver modelo."""
+        with self._lock:
+            return self._current
+
+    def refresh(self):
+        """Recarrega o modelo se a versão em disco mudou. Retorna o snapshot atual."""
+        with self._reload_lock:
+            try:
+                version = self._fingerprint()
+            except Exception as e:
+                logging.error(f"Erro ao verificar a versão do {self.name}: {e}")
+                return self.current()
+
+            current = self.current()
+            if current is not None and current.version == version:
+                return current
+
+            model = None
+            if version is not None:
+                try:
+                    model = self._loader()
+                except Exception as e:
+                    logging.error(f"Erro ao carregar o {self.name} (versão {version}): {e}")
+                    return current
+
+            new = ModelVersion(version, model) if model is not None else None
+            with self._lock:
+                self._current = new
+            if new is not None:
+                logging.info(f"Registro: {self.name} versão {str(version)[:12]} ativo.")
+            return new
+
+    def start(self):
+        """Carrega a versão atual e inicia a thread que observa o disco."""
+        self.refresh()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name=f'registry-{self.name}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+def recommender_fingerprint(artifact_dir):
+    """Versão do artefato de recomendação: o build hash do manifesto (+ o hash do delta, se houver)."""
+    try:
+        with open(artifact_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            build_hash = json.load(f)['build_hash']
+    except FileNotFoundError:
+        return None
+    return artifact_version(build_hash, read_delta_manifest(artifact_dir, build_hash))
+
+def make_recommender_registry(artifact_dir, poll_interval=5.0):
+    return ModelRegistry(
+        loader=lambda: RecommenderArtifact(artifact_dir),
+        fingerprint=lambda: recommender_fingerprint(artifact_dir),
+        poll_interval=poll_interval,
+        name='recomendador',
+    )
@@ -0,0 +1,137 @@
+# core/query_cache.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+# Limite de memória dos resultados guardados (soma de DataFrame.memory_usage(deep=True)).
+QUERY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Validade de cada resultado, mesmo sem retreino (s).
+QUERY_CACHE_TTL_S = 600
+# Intervalo mínimo entre duas leituras da geração do dataset no banco (s).
+GENERATION_CHECK_S = 2.0
+
+GENERATION_TABLE = 'dataset_generation'
+
+def bump_dataset_generation(engine):
+    """Incrementa a geração do dataset; chamada pelo pipeline ao final de uma carga bem-sucedida.
+
+    A geração fica no próprio banco (tabela `dataset_generation`, uma linha), de
+    modo que todos os processos que leem o banco enxergam a troca.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {GENERATION_TABLE} ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL, updated_at TEXT)"
+        )
+        connection.exec_driver_sql(
+            f"INSERT INTO {GENERATION_TABLE} (id, generation, updated_at) VALUES (1, 1, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(id) DO UPDATE SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP"
+        )
+        generation = connection.execute(text(f"SELECT generation FROM {GENERATION_TABLE} WHERE id = 1")).scalar()
+    logging.info(f"Geração do dataset avançada para {generation}.")
+    return generation
+
+def read_dataset_generation(engine):
+    """Geração atual do dataset (0 se o pipeline ainda não gravou nenhuma)."""
+    try:
+        with engine.connect() as connection:
+            generation = connection.execute(text(f"SELECT generation FROM {GENERATION_TABLE} WHERE id = 1")).scalar()
+    except SQLAlchemyError:
+        return 0
+    return generation or 0
+
+def _params_key(params):
+    return tuple(sorted((params or {}).items()))
+
+class QueryCache:
+    """Cache LRU de resultados de consulta (DataFrames), compartilhado pelas sessões do processo.
+
+    A chave é (SQL, parâmetros, geração do dataset): quando o pipeline avança a
+    geração, as entradas antigas deixam de ser encontradas e saem pelo LRU. Cada
+    entrada também expira após `ttl_s`. O total guardado não passa de `max_bytes`.
+    Os DataFrames devolvidos são compartilhados: não devem ser alterados.
+    """
+
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES, ttl_s=QUERY_CACHE_TTL_S,
+                 generation_check_s=GENERATION_CHECK_S):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.generation_check_s = generation_check_s
+        self._entries = OrderedDict()  # chave -> (DataFrame, bytes, expira_em)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def generation(self, engine, force=False):
+        """Geração do dataset, relida do banco no máximo a cada `generation_check_s` segundos."""
+        now = time.monotonic()
+        if force or self._generation is None or now - self._generation_checked_at >= self.generation_check_s:
+            self._generation = read_dataset_generation(engine)
+            self._generation_checked_at = now
+        return self._generation
+
+    def get_or_load(self, engine, query, params, loader):
+        """Devolve o resultado guardado ou chama `loader()` e guarda o que ele devolver (exceto None)."""
+        key = (query, _params_key(params), self.generation(engine))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._discard(key)
+                self.expirations += 1
+            self.misses += 1
+
+        # A consulta roda fora do lock; duas sessões com a mesma falta consultam as duas.
+        result = loader()
+        if result is not None:
+            self._store(key, result, now + self.ttl_s)
+        return result
+
+    def _store(self, key, df, expires_at):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (df, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _discard(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'generation': self._generation,
+            }
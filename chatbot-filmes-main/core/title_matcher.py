@@ -0,0 +1,87 @@
+# core/title_matcher.py
+import numpy as np
+from thefuzz import process, utils
+
+# Mesma regra de aceitação do chatbot: só aceita correspondências com score > 80.
+SCORE_THRESHOLD = 80
+NGRAM_SIZE = 3
+# Quantos candidatos (os que mais compartilham n-gramas) passam pela pontuação fuzzy.
+MAX_CANDIDATES = 50
+# N-gramas presentes em mais que esta fração dos títulos quase não discriminam
+# ("the", " de") e só são usados quando a consulta não tem nenhum outro.
+COMMON_NGRAM_RATIO = 0.1
+
+def _ngrams(normalized):
+    padded = f" {normalized} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+class TitleMatcher:
+    """Busca de títulos construída uma vez, no carregamento do modelo.
+
+    1. Caminho rápido: tabela hash com o título normalizado (mesma normalização
+       do thefuzz), que resolve digitações exatas em O(1).
+    2. Geração de candidatos: índice invertido de trigramas de caracteres.
+    3. Pontuação: `process.extractOne` (WRatio) apenas na lista curta de candidatos.
+    """
+
+    def __init__(self, titles, rows=None):
+        """`rows`, se informado, é a linha do modelo de cada título (o padrão é a
+        própria posição na lista); é o que `index_of` devolve."""
+        self.titles = list(titles)
+        rows = range(len(self.titles)) if rows is None else [int(r) for r in rows]
+        self._exact = {}
+        self._positions = {}
+        postings = {}
+        self._gram_counts = np.zeros(len(self.titles), dtype=np.int32)
+
+        for i, (title, row) in enumerate(zip(self.titles, rows)):
+            self._positions.setdefault(title, row)
+            normalized = utils.full_process(str(title))
+            self._exact.setdefault(normalized, i)
+            grams = _ngrams(normalized)
+            self._gram_counts[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._common_limit = max(1, int(len(self.titles) * COMMON_NGRAM_RATIO))
+
+    def __len__(self):
+        return len(self.titles)
+
+    def index_of(self, title):
+        """Posição (linha do modelo) do título exato, ou None."""
+        return self._positions.get(title)
+
+    def candidates(self, title, limit=MAX_CANDIDATES):
+        """Retorna os índices dos títulos que mais compartilham trigramas com a consulta."""
+        normalized = utils.full_process(title)
+        grams = [g for g in _ngrams(normalized) if g in self._postings]
+        selective = [g for g in grams if len(self._postings[g]) <= self._common_limit]
+        grams = selective or grams
+        if not grams:
+            return np.empty(0, dtype=np.int32)
+
+        ids, shared = np.unique(np.concatenate([self._postings[g] for g in grams]), return_counts=True)
+        # Normaliza pelo menor conjunto de trigramas: um título contido na consulta
+        # (ou a consulta contida no título) recebe pontuação máxima.
+        smaller = np.minimum(self._gram_counts[ids], len(grams))
+        ranking = shared / np.maximum(smaller, 1)
+        if len(ids) > limit:
+            top = np.lexsort((-shared, -ranking))[:limit]
+            ids = ids[np.sort(top)]
+        return ids
+
+    def match(self, title):
+        """Retorna o título mais parecido (score > SCORE_THRESHOLD) ou None."""
+        normalized = utils.full_process(title)
+        if not normalized:
+            return None
+        if normalized in self._exact:
+            return self.titles[self._exact[normalized]]
+
+        candidate_ids = self.candidates(title)
+        if len(candidate_ids) == 0:
+            return None
+        best_match, score = process.extractOne(title, [self.titles[i] for i in candidate_ids])
+        return best_match if score > SCORE_THRESHOLD else None
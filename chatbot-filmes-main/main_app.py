@@ -1,111 +1,232 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
-from thefuzz import process
 
 # Módulos principais do projeto
-from core.config import engine
+from core.config import engine, read_engine
 import core.database_manager as db
 import core.model.model_trainer as mt
+from core.model.registry import ModelRegistry, make_recommender_registry
+from core.genre_index import GenreIndex
+from core.jobs import CANCELLED, DONE, FAILED, JobManager
+from core.query_cache import QueryCache, read_dataset_generation
+from core.intents import GENRE_TRANSLATIONS_INV, ResponseMemo, parse_intent
 
 # --- CONFIGURAÇÃO E CONSTANTES ---
 CSV_FILE_PATH = 'data/tmdb_5000_movies.csv'
 SPEC_SCRIPT_PATH = 'core/data/spec_genre_ratings.sql'
+# Um job ativo por dataset (core/jobs.py): o CSV, o banco e o modelo derivados dele.
+DATASET_JOB_KEY = f'dataset:{CSV_FILE_PATH}'
+JOBS_REFRESH_S = 2
+JOBS_SHOWN = 5
 st.set_page_config(page_title="CineBot", layout="wide")
 
-GENRE_TRANSLATIONS = {
-    "ação": "Action", "aventura": "Adventure", "animação": "Animation",
-    "comédia": "Comedy", "crime": "Crime", "documentário": "Documentary",
-    "drama": "Drama", "família": "Family", "fantasia": "Fantasy",
-    "história": "History", "terror": "Horror", "música": "Music",
-    "mistério": "Mystery", "romance": "Romance", "ficção científica": "Science Fiction",
-    "cinema tv": "TV Movie", "suspense": "Thriller", "guerra": "War", "faroeste": "Western"
-}
-GENRE_TRANSLATIONS_INV = {v: k for k, v in GENRE_TRANSLATIONS.items()}
-
 # --- FUNÇÕES DE CACHE ---
-@st.cache_data
+@st.cache_resource
+def get_recommender_registry():
+    """Registro único por processo: todas as sessões compartilham o modelo carregado."""
+    return make_recommender_registry(mt.MODEL_PATH / mt.ARTIFACT_NAME).start()
+
+@st.cache_resource
+def get_genre_index_registry():
+    """Índice de gêneros em memória, recarregado quando o pipeline avança a geração do dataset."""
+    return ModelRegistry(
+        loader=lambda: GenreIndex.from_engine(read_engine),
+        fingerprint=lambda: read_dataset_generation(read_engine) or None,
+        name='índice de gêneros',
+    ).start()
+
+@st.cache_resource
+def get_job_manager():
+    """Pool de jobs único por processo: os treinos de todas as sessões passam por ele."""
+    return JobManager()
+
+def training_job(job, registry, genre_registry, query_cache, incremental):
+    """Pipeline de dados + treino do recomendador, executado em segundo plano.
+
+    A carga SOR -> SOT -> SPEC não é interrompida no meio (usa `job.update`);
+    o cancelamento é atendido antes dela e entre as etapas do treino, até o
+    modelo começar a ser gravado. Na carga incremental, o recomendador também é
+    atualizado de forma incremental (`mt.update_recommender`).
+    """
+    summary = db.run_data_pipeline(
+        engine, CSV_FILE_PATH, 'sor_movies', SPEC_SCRIPT_PATH, incremental=incremental,
+        progress=lambda stage, fraction: job.update(stage, 0.6 * fraction)
+    )
+    # As respostas em cache passam a usar a nova geração já na próxima consulta.
+    query_cache.generation(read_engine, force=True)
+    genre_registry.refresh()
+    job.report('Pipeline de dados concluído', 0.6)
+    touched_ids = summary.pop('touched_movie_ids')
+    model_progress = lambda stage, fraction: job.report(stage, 0.6 + 0.4 * fraction)
+    if touched_ids is not None:
+        # Só os filmes novos/alterados passam pelo recomendador (delta sobre o artefato atual).
+        summary['recommender'] = mt.update_recommender(engine, touched_ids, progress=model_progress)
+    else:
+        mt.train_and_save_model(engine, progress=model_progress)
+    # Troca a versão imediatamente; as demais sessões recebem a nova
+    # versão pela thread do registro.
+    registry.refresh()
+    return summary
+
+def collect_training_result(manager):
+    """Mostra (uma vez) o resultado do treino desta sessão, quando o job termina."""
+    job = manager.get(st.session_state.get('train_job_id'))
+    if job is None or not job.finished:
+        return
+    st.session_state.train_job_id = None
+    if job.status == DONE:
+        st.session_state.pipeline_summary = job.result
+        st.success("Treinamento concluído com sucesso!")
+    elif job.status == FAILED:
+        st.error(f"Ocorreu um erro durante o treinamento: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning("Treinamento cancelado; o modelo anterior foi mantido.")
+
+@st.fragment(run_every=JOBS_REFRESH_S)
+def jobs_panel():
+    """Status dos jobs do processo (de todas as sessões), atualizado a cada JOBS_REFRESH_S segundos."""
+    manager = get_job_manager()
+    jobs = manager.jobs()
+    if not jobs:
+        st.caption("Nenhum job executado ainda.")
+    for job in jobs[:JOBS_SHOWN]:
+        st.progress(job.progress, text=f"{job.name} — {job.status} ({job.elapsed():.0f}s)")
+        if not job.finished:
+            st.caption(job.stage)
+            if st.button("Cancelar", key=f"cancel_{job.id}", disabled=job.cancel_requested):
+                job.cancel()
+        elif job.status == FAILED:
+            st.caption(f"Erro: {job.error}")
+    # O treino desta sessão terminou: roda a página inteira de novo (resultado e novo modelo).
+    own_job = manager.get(st.session_state.get('train_job_id'))
+    if own_job is not None and own_job.finished:
+        st.rerun()
+
+@st.cache_resource
+def get_query_cache():
+    """Cache de resultados único por processo, invalidado pela geração do dataset."""
+    return QueryCache()
+
+@st.cache_resource
+def get_response_memo():
+    """Respostas memorizadas, compartilhadas por todas as sessões do processo."""
+    return ResponseMemo()
+
 def get_best_genre_cached():
-    df = db.query_db(engine, "SELECT genre_name, average_rating FROM spec_genre_ratings ORDER BY average_rating DESC LIMIT 1")
+    df = db.query_db(read_engine, "SELECT genre_name, average_rating FROM spec_genre_ratings ORDER BY average_rating DESC LIMIT 1",
+                     cache=get_query_cache())
     return df
 
-@st.cache_data
 def get_top_movies_cached(genre_name_en):
-    query = "SELECT m.title, m.vote_average FROM sot_movies_clean m JOIN sot_movie_genres g ON m.movie_id = g.movie_id WHERE g.genre_name = :genre ORDER BY m.vote_average DESC LIMIT 5;"
-    return db.query_db(engine, query, params={'genre': genre_name_en})
+    query = "SELECT title, rating AS vote_average FROM spec_genre_top_movies WHERE genre_name = :genre ORDER BY rank LIMIT 5;"
+    return db.query_db(read_engine, query, params={'genre': genre_name_en}, cache=get_query_cache())
 
-def find_best_movie_match(title, movie_list):
-    best_match, score = process.extractOne(title, movie_list)
-    return best_match if score > 80 else None
+def find_best_movie_match(title, artifact):
+    return artifact.title_matcher.match(title)
 
 # --- LÓGICA PRINCIPAL DO CHATBOT (FUNÇÃO ATUALIZADA) ---
 
-def handle_user_prompt(prompt, df_rec, cosine_sim):
-    """Processa a mensagem do usuário, identifica a intenção e retorna a resposta."""
-    prompt_lower = prompt.lower()
+def describe_genre_query(genres, op, exclude, min_rating, rating_inclusive=False):
+    """Descrição da consulta na resposta, ex.: "de **Ação** e **Comédia** com nota acima de 7"
+    (ou "com nota mínima 7", com `rating_inclusive`)."""
+    def names(genre_list):
+        return [f"**{GENRE_TRANSLATIONS_INV.get(g, g).capitalize()}**" for g in genre_list]
+
+    parts = []
+    if genres:
+        parts.append("de " + (" ou " if op == 'or' else " e ").join(names(genres)))
+    if exclude:
+        parts.append("sem " + " nem ".join(names(exclude)))
+    if min_rating is not None:
+        parts.append(f"com nota {'mínima' if rating_inclusive else 'acima de'} {min_rating:g}")
+    return " ".join(parts)
 
+def answer_intent(intent, artifact, genre_index=None):
+    """Resposta para uma intenção já reconhecida.
+
+    Retorna (resposta, memorizável): respostas de falha na consulta ao banco não
+    são memorizadas, para a próxima pergunta tentar de novo.
+    """
     # Intenção 0: Saudações
-    saudacoes = ['oi', 'ola', 'olá', 'bom dia']
-    if prompt_lower in saudacoes:
-        return "Olá! Sou o CineBot. Como posso te ajudar?"
+    if intent.name == 'greeting':
+        return "Olá! Sou o CineBot. Como posso te ajudar?", True
 
     # Intenção 1: Encontrar o melhor gênero (LÓGICA MELHORADA)
-    elif "melhor" in prompt_lower and "gênero" in prompt_lower:
+    elif intent.name == 'best_genre':
         df = get_best_genre_cached()
         if df is not None and not df.empty:
             genre_en, rating = df.iloc[0]['genre_name'], df.iloc[0]['average_rating']
             genre_pt = GENRE_TRANSLATIONS_INV.get(genre_en, genre_en).capitalize()
-            return f"O gênero com a melhor avaliação média é **{genre_pt}**, com nota **{rating:.2f}**!"
-        return "Não consegui encontrar o melhor gênero no momento."
+            return f"O gênero com a melhor avaliação média é **{genre_pt}**, com nota **{rating:.2f}**!", True
+        return "Não consegui encontrar o melhor gênero no momento.", False
 
     # Intenção 2: Listar top filmes de um gênero (LÓGICA REINTRODUZIDA E CORRIGIDA)
-    elif any(keyword in prompt_lower for keyword in ["filmes de", "top filmes"]):
-        genre_found = None
-        for genre_pt, genre_en in GENRE_TRANSLATIONS.items():
-            if genre_pt in prompt_lower:
-                genre_found = (genre_pt, genre_en)
-                break
-
-        if genre_found:
-            genre_pt, genre_en = genre_found
-            df = get_top_movies_cached(genre_en)
-            if df is not None and not df.empty:
-                response = f"Claro! Aqui estão os top 5 filmes de **{genre_pt.capitalize()}** mais bem avaliados:\n"
-                for _, row in df.iterrows():
-                    response += f"- {row['title']} (Nota: {row['vote_average']:.1f})\n"
-                return response
-            return f"Não encontrei filmes para o gênero '{genre_pt}'. Tente outro."
-        return "Por favor, especifique um gênero. Ex: 'top 5 filmes de suspense'."
+    elif intent.name == 'top_movies':
+        genres, op, exclude, min_rating, rating_inclusive = (
+            intent.slot(name) for name in ('genres', 'op', 'exclude', 'min_rating', 'rating_inclusive'))
+        if not genres and not exclude and min_rating is None:
+            return "Por favor, especifique um gênero. Ex: 'top 5 filmes de suspense'.", True
+        description = describe_genre_query(genres, op, exclude, min_rating, rating_inclusive)
+        if genre_index is not None:
+            # Índice em memória (core/genre_index.py): E/OU/SEM e nota sem consultar o banco.
+            rows = genre_index.top(genre_index.select(genres, op, exclude, min_rating, inclusive=rating_inclusive), n=5)
+        elif len(genres) == 1 and not exclude and min_rating is None:
+            df = get_top_movies_cached(genres[0])
+            if df is None:
+                return "Não consegui consultar os filmes no momento.", False
+            rows = list(zip(df['title'], df['vote_average']))
+        else:
+            return "O índice de gêneros ainda não foi carregado; tente um gênero por vez.", False
+        if rows:
+            response = f"Claro! Aqui estão os top 5 filmes {description} mais bem avaliados:\n"
+            for title, rating in rows:
+                response += f"- {title} (Nota: {rating:.1f})\n"
+            return response, True
+        return f"Não encontrei filmes {description}. Tente outro.", True
 
     # Intenção 3: Recomendar filmes similares
-    elif any(keyword in prompt_lower for keyword in ["recomende", "parecido com", "similar a"]):
-        title_to_search = prompt.split("parecido com")[-1].split("recomende")[-1].split("similar a")[-1].strip().replace('"', '')
+    elif intent.name == 'recommend':
+        title_to_search = intent.slot('title')
         if not title_to_search:
-            return "Por favor, diga um filme para eu recomendar similares. Ex: 'recomende algo parecido com Avatar'."
-
-        found_title = find_best_movie_match(title_to_search, df_rec['title'].tolist())
-        if found_title:
-            idx = df_rec[df_rec['title'] == found_title].index[0]
-            sim_scores = sorted(list(enumerate(cosine_sim[idx])), key=lambda x: x[1], reverse=True)[1:6]
-            movie_indices = [i[0] for i in sim_scores]
-            recommended_movies = df_rec['title'].iloc[movie_indices]
+            return "Por favor, diga um filme para eu recomendar similares. Ex: 'recomende algo parecido com Avatar'.", True
 
+        found_title = find_best_movie_match(title_to_search, artifact)
+        idx = artifact.title_matcher.index_of(found_title) if found_title else None
+        # As listas de vizinhos já vêm ordenadas por similaridade no índice.
+        recommended_movies = [artifact.title(i) for i in artifact.neighbors(idx, n=5)] if idx is not None else []
+        if recommended_movies:
             response = f"Se você gostou de **{found_title}**, talvez também goste de:\n"
             for movie in recommended_movies:
                 response += f"- {movie}\n"
-            return response
-        return f"Não encontrei o filme '{title_to_search}' na minha base de dados."
+            return response, True
+        return f"Não encontrei o filme '{title_to_search}' na minha base de dados.", True
 
     # Resposta padrão
     else:
-        return "Desculpe, não entendi. Tente perguntar sobre o 'melhor gênero' ou peça 'top 5 filmes de ação'."
+        return "Desculpe, não entendi. Tente perguntar sobre o 'melhor gênero' ou peça 'top 5 filmes de ação'.", True
+
+def handle_user_prompt(prompt, artifact, dataset_version=None, genre_index=None):
+    """Processa a mensagem do usuário, identifica a intenção e retorna a resposta.
+
+    A intenção e os slots saem de uma passada só (core/intents.py). As respostas
+    são determinísticas para uma mesma versão dos dados e do modelo, então ficam
+    memorizadas por (intenção, slots, `dataset_version`) para todas as sessões.
+    """
+    intent = parse_intent(prompt)
+    memo = get_response_memo()
+    key = (intent.name, intent.slots, dataset_version)
+    response = memo.get(key)
+    if response is None:
+        response, cacheable = answer_intent(intent, artifact, genre_index)
+        if cacheable:
+            memo.put(key, response)
+    return response
 
 # --- INTERFACE GRÁFICA (UI) ---
 st.title("🎬 CineBot - Assistente de Filmes")
 
 # Inicialização do estado da aplicação
-if 'model_ready' not in st.session_state:
-    st.session_state.model_ready = False
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
@@ -120,31 +241,42 @@ with st.sidebar:
     )
 
     if choice == 'Treinar um novo modelo':
+        incremental = st.checkbox(
+            "Atualização incremental",
+            help="Regrava apenas os filmes novos ou alterados no CSV (comparando o hash de cada linha)."
+        )
         if st.button("Iniciar Treinamento Completo"):
-            try:
-                with st.spinner("Executando pipeline de dados e treinamento... Por favor, aguarde."):
-                    db.run_data_pipeline(engine, CSV_FILE_PATH, 'sor_movies', SPEC_SCRIPT_PATH)
-                    mt.train_and_save_model(engine)
-                st.success("Treinamento concluído com sucesso!")
-                st.session_state.model_ready = True
-                st.rerun()
-            except Exception as e:
-                st.error(f"Ocorreu um erro durante o treinamento: {e}")
+            job, created = get_job_manager().submit(
+                DATASET_JOB_KEY, "Pipeline + treino", training_job, get_recommender_registry(), get_genre_index_registry(),
+                get_query_cache(), incremental
+            )
+            st.session_state.train_job_id = job.id
+            if created:
+                st.info("Treinamento iniciado em segundo plano. Acompanhe o progresso em 'Jobs'.")
+            else:
+                st.info("Já existe um treinamento em andamento para este dataset; acompanhando o job existente.")
     else: # Carregar modelo existente
-        st.info("O aplicativo tentará carregar o modelo pré-treinado 'movie_recommender.pkl'.")
+        st.info("O aplicativo tentará carregar o modelo pré-treinado em 'model/recommender/'.")
+    collect_training_result(get_job_manager())
+
+    if 'pipeline_summary' in st.session_state:
+        with st.expander("Resumo da última execução do pipeline"):
+            st.json(st.session_state.pipeline_summary)
+
+    st.header("Jobs")
+    jobs_panel()
+
+    with st.expander("Cache de consultas"):
+        st.json(get_query_cache().stats())
+        st.json(get_response_memo().stats())
 
-# Carrega o modelo quando a aplicação inicia (se não estiver no modo de treino)
-# ou depois que o treino for concluído.
-if not st.session_state.model_ready:
-    cosine_sim, df_rec = mt.load_recommendation_data()
-    if cosine_sim is not None and df_rec is not None:
-        st.session_state.model_ready = True
-        st.session_state.cosine_sim = cosine_sim
-        st.session_state.df_rec = df_rec
+# Snapshot do modelo usado durante toda esta execução do script: se um retreino
+# trocar a versão no meio de uma resposta, esta requisição termina com a antiga.
+recommender = get_recommender_registry().current()
 
 # --- INTERFACE DO CHAT (só aparece se o modelo estiver pronto) ---
-if st.session_state.model_ready:
-    st.sidebar.success("Modelo carregado e pronto para uso!")
+if recommender is not None:
+    st.sidebar.success(f"Modelo carregado e pronto para uso! (versão {recommender.version[:8]})")
 
     if not st.session_state.messages:
         st.session_state.messages = [{"role": "assistant", "content": "Olá! O modelo está carregado. Como posso ajudar?"}]
@@ -160,7 +292,16 @@ if st.session_state.model_ready:
 
         with st.chat_message("assistant"):
             with st.spinner("Pensando..."):
-                full_response = handle_user_prompt(prompt, st.session_state.df_rec, st.session_state.cosine_sim)
+                # Versão dos dados (geração do pipeline) e do modelo: chave da memória de respostas.
+                genre_index = get_genre_index_registry().current()
+                dataset_version = (
+                    get_query_cache().generation(read_engine),
+                    genre_index.version if genre_index else None,
+                    recommender.version,
+                )
+                full_response = handle_user_prompt(
+                    prompt, recommender.model, dataset_version, genre_index.model if genre_index else None
+                )
             st.markdown(full_response)
 
         st.session_state.messages.append({"role": "assistant", "content": full_response})
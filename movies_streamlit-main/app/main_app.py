@@ -1,8 +1,12 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 import os
 import pickle
+import shutil
 import sys
+import time
+import uuid
 
 # --- INÍCIO DA SOLUÇÃO 2: CORREÇÃO DO CAMINHO (PYTHONPATH) ---
 # Adiciona o diretório raiz do projeto ao caminho de busca de módulos do Python.
@@ -19,16 +23,19 @@ except ImportError:
     st.stop()
 
 # --- Importar as Funções do Projeto ---
-from core.database import (
-    create_database_connection,
-    load_sot_data_for_training
-)
-# As funções 'create_tables' e 'transform_data' foram removidas das importações.
+from core.data.io import named_buffer
+from core.etl import TARGET, load_training_frame, persist_sor_sot
 from core.features.preprocess import make_preprocess_pipeline
-from core.models.train import train_regressor
+from core.models.train import search_regressor, train_regressor
+from core.models.incremental import train_regressor_incremental
+from core.database import create_database_connection
 from core.models.predict import evaluate_regressor
 from core.explain.coefficients import extract_linear_importances
 from core.chatbot.rules import answer_from_metrics
+from core.models.registry import ModelRegistry
+from core.models.batch_score import score_csv
+from core.models.fast_scorer import disable_fast_scorer, export_linear_scorer, verify_equivalence
+from core.jobs import CANCELLED, DONE, FAILED, JobConflict, JobManager
 
 # --- Configurações da Página e Diretórios ---
 st.set_page_config(page_title="Análise de Filmes TMDB", layout="wide")
@@ -36,11 +43,40 @@ st.set_page_config(page_title="Análise de Filmes TMDB", layout="wide")
 # Ajusta os caminhos para serem relativos à raiz do projeto
 DB_FILE = os.path.join(project_root, "tmdb.db")
 MODEL_DIR = os.path.join(project_root, "model")
+SQL_FOLDER = os.path.join(project_root, "core", "sql")
+# Cache colunar dos CSVs enviados, endereçado pelo conteúdo (core/data/cache.py)
+CACHE_DIR = os.path.join(project_root, "data", "cache")
+# Nomes estáveis dos CSVs enviados: chave do esquema de dtypes que read_csv_smart
+# guarda em CACHE_DIR/schemas e reaproveita no próximo upload (mesmo com outro conteúdo).
+MOVIES_SOURCE_NAME = "tmdb_5000_movies.csv"
+CREDITS_SOURCE_NAME = "tmdb_5000_credits.csv"
+
+# Saída da pontuação em lote (core/models/batch_score.py); a aba mostra só uma prévia.
+# Cada previsão grava o seu próprio arquivo (uuid guardado na sessão), para que
+# sessões simultâneas não sobrescrevam nem baixem as previsões umas das outras.
+PREDICTIONS_DIR = os.path.join(project_root, "data", "predictions")
+PREVIEW_ROWS = 1_000
+# Arquivos de previsão mais antigos que isto são de sessões encerradas e são apagados (s).
+PREDICTIONS_TTL_S = 3600
 
 if not os.path.exists(MODEL_DIR):
     os.makedirs(MODEL_DIR)
 MODEL_PATH = os.path.join(MODEL_DIR, "movie_rating_predictor.pickle")
 
+TRAIN_SIMPLE = "Simples (regressão linear)"
+TRAIN_SEARCH = "Busca do melhor modelo (validação cruzada)"
+TRAIN_INCREMENTAL = "Incremental a partir da SOT (memória constante)"
+# Com as colunas de hashing há milhares de coeficientes; a tela mostra os maiores.
+IMPORTANCES_TOP_N = 50
+
+# Recursos gravados pelos jobs em segundo plano (core/jobs.py): no máximo um job
+# ativo por recurso. As chaves dos jobs vêm do hash dos CSVs enviados (dataset_key):
+# o mesmo upload reaproveita o job em andamento; outro upload é recusado até ele terminar.
+DB_RESOURCE = f"banco:{DB_FILE}"
+MODEL_RESOURCE = f"modelo:{MODEL_PATH}"
+JOBS_REFRESH_S = 2
+JOBS_SHOWN = 5
+
 # --- Estado da Sessão (Session State) ---
 # Inicializa o estado para garantir que as chaves existam
 if "model_trained" not in st.session_state:
@@ -57,10 +93,208 @@ if "importances" not in st.session_state:
     st.session_state.importances = None
 
 # --- Funções Auxiliares ---
-@st.cache_data
-def convert_df_to_csv(df):
-    """Converte um DataFrame para CSV codificado em UTF-8."""
-    return df.to_csv(index=False).encode('utf-8')
+@st.cache_resource
+def get_model_registry():
+    """Registro único por processo: todas as sessões compartilham o modelo carregado."""
+    return ModelRegistry(MODEL_PATH).start()
+
+@st.cache_resource
+def get_job_manager():
+    """Pool de jobs único por processo: os treinos de todas as sessões passam por ele."""
+    return JobManager()
+
+def new_predictions_path() -> str:
+    """
+    Caminho de saída para uma nova previsão desta sessão.
+
+    Apaga o arquivo da previsão anterior da sessão e os arquivos com mais de
+    PREDICTIONS_TTL_S segundos (o Streamlit não avisa quando uma sessão termina).
+    """
+    os.makedirs(PREDICTIONS_DIR, exist_ok=True)
+    stale = [st.session_state.get("predictions_path")]
+    cutoff = time.time() - PREDICTIONS_TTL_S
+    for entry in os.scandir(PREDICTIONS_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                stale.append(entry.path)
+        except FileNotFoundError:
+            pass
+    for path in stale:
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return os.path.join(PREDICTIONS_DIR, f"movie_predictions_{uuid.uuid4().hex}.csv")
+
+def dataset_key(movies_bytes: bytes, credits_bytes: bytes, *extra) -> str:
+    """Hash do conteúdo dos CSVs enviados (e de `extra`, ex.: as opções de treino)."""
+    digest = hashlib.sha256()
+    for part in (movies_bytes, credits_bytes, repr(extra).encode("utf-8")):
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()[:16]
+
+def submit_persist(manager: JobManager, movies_bytes: bytes, credits_bytes: bytes):
+    """Agenda a gravação da SOR/SOT destes CSVs (ou devolve a que já está em andamento para eles).
+
+    Raises:
+        JobConflict: Se o banco está sendo gravado a partir de outros CSVs.
+    """
+    return manager.submit(
+        f"banco:{dataset_key(movies_bytes, credits_bytes)}", "Gravar SOR/SOT", persist_job,
+        movies_bytes, credits_bytes, resource=DB_RESOURCE
+    )
+
+def persist_job(job, movies_bytes: bytes, credits_bytes: bytes) -> dict:
+    """Job de gravação da SOR/SOT (o banco só é trocado no fim; cancelar mantém o anterior)."""
+    return persist_sor_sot(
+        DB_FILE, named_buffer(movies_bytes, MOVIES_SOURCE_NAME), named_buffer(credits_bytes, CREDITS_SOURCE_NAME),
+        SQL_FOLDER, progress=job.report
+    )
+
+def training_job(job, manager: JobManager, registry: ModelRegistry, movies_bytes: bytes, credits_bytes: bytes,
+                 options: dict) -> dict:
+    """
+    Pipeline de treino completo, executado em segundo plano pelo JobManager.
+
+    Pode ser cancelado em qualquer etapa até "Salvando o modelo": o modelo
+    publicado só é trocado no fim, então um cancelamento mantém o anterior.
+
+    Returns:
+        dict: Métricas, importâncias, tabela da busca, o id do job de persistência
+            e o aviso do scorer rápido (None se o modelo dobrou sem divergência).
+    """
+    result = {"search_results": None, "persist_job_id": None, "persist_error": None, "scorer_warning": None}
+    if options["train_mode"] == TRAIN_INCREMENTAL:
+        # Etapas 1-2: SOR/SOT destes CSVs gravadas primeiro (o treino lê da SOT)
+        try:
+            persist, _ = submit_persist(manager, movies_bytes, credits_bytes)
+        except JobConflict as e:
+            raise RuntimeError(f"O banco está sendo gravado com outros arquivos: {e}") from e
+        result["persist_job_id"] = persist.id
+        while not persist.wait(0.5):
+            job.report(f"Aguardando a gravação da SOT ({persist.stage})", 0.0)
+        if persist.status != DONE:
+            raise RuntimeError(f"A gravação da SOR/SOT terminou com status '{persist.status}': {persist.error}")
+
+        # Etapa 3: Treino incremental em chunks (memória constante)
+        conn = create_database_connection(DB_FILE)
+        try:
+            model, metrics, X_test = train_regressor_incremental(
+                conn, test_size=options["test_size"], epochs=options["sgd_epochs"], progress=job.report
+            )
+        finally:
+            conn.close()
+        X = X_test
+    else:
+        # Etapa 1: ETL em memória (só as colunas do modelo, junção feita uma vez)
+        job.report("ETL em memória", 0.0)
+        df_train = load_training_frame(
+            named_buffer(movies_bytes, MOVIES_SOURCE_NAME), named_buffer(credits_bytes, CREDITS_SOURCE_NAME),
+            cache_dir=CACHE_DIR, text_columns=options["text_columns"]
+        )
+
+        # Etapa 2: SOR/SOT (scripts tipados + tabelas filhas) gravadas em outro job;
+        # o treino não espera a serialização das colunas que o modelo não lê.
+        if options["persist_db"]:
+            try:
+                persist, _ = submit_persist(manager, movies_bytes, credits_bytes)
+                result["persist_job_id"] = persist.id
+            except JobConflict as e:
+                result["persist_error"] = f"Banco não gravado: ele já está sendo gravado com outros arquivos ({e})"
+        if df_train.empty:
+            raise ValueError("A tabela de treino está vazia. Verifique os arquivos enviados.")
+
+        # Etapa 3: Treinar o modelo
+        y = df_train[TARGET]
+        X = df_train.drop(columns=[TARGET])
+
+        pre = make_preprocess_pipeline(X)
+        if options["train_mode"] == TRAIN_SEARCH:
+            model, X_test, y_test, result["search_results"] = search_regressor(
+                X, y, pre, test_size=options["test_size"], n_splits=options["cv_folds"],
+                time_budget_s=options["time_budget"], progress=job.report
+            )
+        else:
+            job.report("Treinando a regressão linear", 0.3)
+            model, X_test, y_test = train_regressor(X, y, pre, test_size=options["test_size"])
+        job.report("Avaliando no conjunto de teste", 0.9)
+        metrics = evaluate_regressor(model, X_test, y_test)
+
+    # Etapa 4: Conferir o scorer rápido contra o pipeline, antes de publicar
+    # (o serviço de previsão dobra o modelo linear no carregamento; só modelos
+    # lineares sobre features numéricas se dobram: a busca pode escolher um
+    # modelo de árvores, e as colunas com hashing não viram pesos). Se a dobra
+    # divergir, o modelo é publicado assim mesmo, marcado para o serviço usar o pipeline.
+    is_linear = hasattr(model.named_steps["regressor"], "coef_")
+    if is_linear:
+        job.report("Conferindo o scorer rápido", 0.93)
+        try:
+            scorer = export_linear_scorer(model)
+            verify_equivalence(model, scorer, X_test)
+        except ValueError as e:
+            result["scorer_warning"] = f"Scorer rápido não usado: o modelo não é dobrável ({e}). O serviço usa o pipeline."
+        except AssertionError as e:
+            disable_fast_scorer(model, str(e))
+            result["scorer_warning"] = f"Scorer rápido desativado: {e} O serviço usa o pipeline."
+        if result["scorer_warning"]:
+            job.report(result["scorer_warning"], 0.94)
+
+    # Etapa 5: Salvar o modelo (último ponto de cancelamento)
+    # (grava ao lado e troca, para o registro nunca ler um arquivo pela metade)
+    job.report("Salvando o modelo", 0.95)
+    tmp_model_path = MODEL_PATH + ".tmp"
+    with open(tmp_model_path, "wb") as f:
+        pickle.dump(model, f)
+    os.replace(tmp_model_path, MODEL_PATH)
+    registry.refresh()
+
+    result["metrics"] = metrics
+    result["importances"] = (
+        extract_linear_importances(model, X.columns, top_n=IMPORTANCES_TOP_N) if is_linear else None
+    )
+    return result
+
+def collect_training_result(manager: JobManager):
+    """Copia para a sessão o resultado do treino desta sessão, quando o job termina."""
+    job = manager.get(st.session_state.get("train_job_id"))
+    if job is None or not job.finished:
+        return
+    st.session_state.train_job_id = None
+    if job.status == DONE:
+        st.session_state.metrics = job.result["metrics"]
+        st.session_state.importances = job.result["importances"]
+        st.session_state.search_results = job.result["search_results"]
+        st.session_state.persist_job_id = job.result["persist_job_id"]
+        st.session_state.persist_error = job.result["persist_error"]
+        st.session_state.scorer_warning = job.result["scorer_warning"]
+        st.session_state.model_trained = True
+        st.session_state.predictions_made = False # Reseta a aba de previsão
+        st.success("Modelo treinado e salvo com sucesso!")
+    elif job.status == FAILED:
+        st.error(f"Ocorreu um erro durante o pipeline: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning("Treino cancelado; o modelo anterior foi mantido.")
+
+@st.fragment(run_every=JOBS_REFRESH_S)
+def jobs_panel():
+    """Status dos jobs do processo (de todas as sessões), atualizado a cada JOBS_REFRESH_S segundos."""
+    manager = get_job_manager()
+    jobs = manager.jobs()
+    if not jobs:
+        st.caption("Nenhum job executado ainda.")
+    for job in jobs[:JOBS_SHOWN]:
+        st.progress(job.progress, text=f"{job.name} — {job.status} ({job.elapsed():.0f}s)")
+        if not job.finished:
+            st.caption(job.stage)
+            if st.button("Cancelar", key=f"cancel_{job.id}", disabled=job.cancel_requested):
+                job.cancel()
+        elif job.status == FAILED:
+            st.caption(f"Erro: {job.error}")
+    # O treino desta sessão terminou: roda a página inteira de novo para mostrar os resultados.
+    own_job = manager.get(st.session_state.get("train_job_id"))
+    if own_job is not None and own_job.finished:
+        st.rerun()
 
 # --- Título e Sidebar ---
 st.title("🎬 Pipeline Preditivo de Notas de Filmes (TMDB)")
@@ -78,112 +312,102 @@ with st.sidebar:
     # --- AÇÃO 1: Treinar um novo modelo ---
     st.subheader("Treinar Novo Modelo")
     test_size = st.slider("Tamanho do conjunto de teste (validação)", 0.1, 0.4, 0.2, 0.05)
+    persist_db = st.checkbox("Gravar SOR/SOT no banco (em segundo plano)", value=True)
+    train_mode = st.radio("Modo de treino", [TRAIN_SIMPLE, TRAIN_SEARCH, TRAIN_INCREMENTAL])
+    if train_mode != TRAIN_INCREMENTAL:
+        use_text_features = st.checkbox(
+            "Usar gêneros, palavras-chave e produtoras (hashing)", value=False
+        )
+    if train_mode == TRAIN_SEARCH:
+        cv_folds = st.slider("Número de folds", 3, 10, 5)
+        time_budget = st.slider("Limite de tempo da busca (s)", 10, 600, 60, 10)
+    elif train_mode == TRAIN_INCREMENTAL:
+        sgd_epochs = st.slider("Épocas do SGD", 1, 20, 5)
     if st.button("Executar Treinamento", type="primary"):
         movies_file = next((f for f in uploaded_files if "movies" in f.name.lower()), None)
         credits_file = next((f for f in uploaded_files if "credits" in f.name.lower()), None)
 
         if movies_file and credits_file:
-            with st.spinner("Executando pipeline de dados e treino..."):
-                # Etapa 1: Limpar e Criar DB
-                if os.path.exists(DB_FILE):
-                    os.remove(DB_FILE)
-                conn = create_database_connection(DB_FILE)
-
-                if conn:
-                    pipeline_success = False
-                    try:
-                        # Etapa 2.1: Ingestão de Dados
-                        movies_df = pd.read_csv(movies_file)
-                        credits_df = pd.read_csv(credits_file)
-                        movies_df.to_sql("sor_movies", conn, if_exists="replace", index=False)
-                        credits_df.to_sql("sor_credits", conn, if_exists="replace", index=False)
-
-                        # Etapa 2.2: Transformação de Dados (junção das tabelas)
-                        sor_movies = pd.read_sql_query("SELECT * FROM sor_movies", conn)
-                        sor_credits = pd.read_sql_query("SELECT * FROM sor_credits", conn)
-                        
-                        sor_credits.rename(columns={'movie_id': 'id'}, inplace=True)
-                        
-                        sot_df = pd.merge(sor_movies, sor_credits, on='id')
-                        
-                        sot_df.to_sql("sot_movies", conn, if_exists="replace", index=False)
-
-                        # Etapa 3: Carregar dados para treino
-                        df_train = load_sot_data_for_training(conn)
-                        
-                        if df_train.empty:
-                            st.error("A tabela de treino está vazia. Verifique a etapa de transformação.")
-                        else:
-                            # Etapa 4: Treinar o modelo
-                            target = "vote_average"
-                            y = df_train[target]
-                            X = df_train.drop(columns=[target])
-                            
-                            pre = make_preprocess_pipeline(X)
-                            model, X_test, y_test = train_regressor(X, y, pre, test_size=test_size)
-                            
-                            # Etapa 5: Salvar o modelo e as métricas na sessão
-                            with open(MODEL_PATH, "wb") as f:
-                                pickle.dump(model, f)
-                            
-                            st.session_state.metrics = evaluate_regressor(model, X_test, y_test)
-                            st.session_state.importances = extract_linear_importances(model, X.columns, pre)
-                            st.session_state.model_trained = True
-                            st.session_state.predictions_made = False # Reseta a aba de previsão
-                            
-                            pipeline_success = True
-
-                    except Exception as e:
-                        st.error(f"Ocorreu um erro durante o pipeline: {e}")
-                    finally:
-                        # Esta linha garante que a conexão seja fechada, liberando o arquivo.
-                        conn.close()
-                        if pipeline_success:
-                            st.success("Modelo treinado e salvo com sucesso!")
+            options = {
+                "test_size": test_size,
+                "persist_db": persist_db,
+                "train_mode": train_mode,
+                "text_columns": train_mode != TRAIN_INCREMENTAL and use_text_features,
+                "cv_folds": cv_folds if train_mode == TRAIN_SEARCH else None,
+                "time_budget": time_budget if train_mode == TRAIN_SEARCH else None,
+                "sgd_epochs": sgd_epochs if train_mode == TRAIN_INCREMENTAL else None,
+            }
+            # O job recebe os bytes (e não os objetos de upload), pois continua
+            # rodando depois que esta execução do script termina.
+            manager = get_job_manager()
+            movies_bytes, credits_bytes = movies_file.getvalue(), credits_file.getvalue()
+            try:
+                job, created = manager.submit(
+                    f"modelo:{dataset_key(movies_bytes, credits_bytes, sorted(options.items()))}",
+                    f"Treino: {train_mode}", training_job, manager, get_model_registry(),
+                    movies_bytes, credits_bytes, options, resource=MODEL_RESOURCE
+                )
+            except JobConflict as e:
+                st.warning(f"Há um treino de outros arquivos ou opções em andamento: {e}")
+            else:
+                st.session_state.train_job_id = job.id
+                if created:
+                    st.info("Treino iniciado em segundo plano. Acompanhe o progresso em '4. Jobs'.")
                 else:
-                    st.error("Falha ao conectar ao banco de dados.")
+                    st.info("Já existe um treino destes arquivos em andamento; acompanhando o job existente.")
         else:
             st.warning("Arquivos 'tmdb_5000_movies.csv' e 'tmdb_5000_credits.csv' são necessários para o treino.")
+    collect_training_result(get_job_manager())
 
     # --- AÇÃO 2: Usar o modelo salvo para prever ---
     st.subheader("Usar Modelo Existente")
     if st.button("Carregar Modelo e Fazer Previsões"):
-        if not os.path.exists(MODEL_PATH):
+        # Snapshot da versão atual: a previsão inteira usa o mesmo modelo,
+        # mesmo que um retreino seja publicado no meio do caminho.
+        model_version = get_model_registry().current()
+        if model_version is None:
             st.error("Nenhum modelo treinado foi encontrado! Execute o treinamento primeiro.")
         else:
             predict_file = next((f for f in uploaded_files if "predict" in f.name.lower() or "test" in f.name.lower()), None)
             
             if predict_file:
-                with st.spinner("Carregando modelo e fazendo previsões..."):
-                    df_predict = pd.read_csv(predict_file)
-                    
-                    with open(MODEL_PATH, 'rb') as f:
-                        model = pickle.load(f)
-
-                    # Faz as previsões
-                    predictions = model.predict(df_predict)
-                    
-                    # Monta o DataFrame de resultados
-                    result_df = df_predict.copy()
-                    result_df['predicted_vote_average'] = predictions
-                    
-                    st.session_state.prediction_df = result_df
-                    st.session_state.predictions_made = True
-                st.success("Previsões geradas com sucesso!")
+                try:
+                    with st.spinner("Carregando modelo e fazendo previsões..."):
+                        # Pontuação em streaming: o CSV é lido e gravado em chunks (pool de
+                        # processos), sem manter o arquivo inteiro em memória.
+                        predictions_path = new_predictions_path()
+                        st.session_state.prediction_stats = score_csv(model_version.model, predict_file, predictions_path)
+                        st.session_state.predictions_path = predictions_path
+                        st.session_state.prediction_df = pd.read_csv(predictions_path, nrows=PREVIEW_ROWS)
+                        st.session_state.predictions_made = True
+                except ValueError as e:
+                    st.error(f"Não foi possível pontuar o arquivo: {e}")
+                else:
+                    st.success("Previsões geradas com sucesso!")
             else:
                 st.warning("Envie um arquivo para prever (deve conter 'predict' ou 'test' no nome).")
 
     # --- AÇÃO 3: Limpeza ---
     st.header("3. Manutenção")
     if st.button("Limpar Tudo"):
+        if get_job_manager().busy():
+            st.warning("Há jobs em andamento; cancele-os ou aguarde antes de limpar.")
+            st.stop()
         if os.path.exists(DB_FILE):
             os.remove(DB_FILE)
         if os.path.exists(MODEL_PATH):
             os.remove(MODEL_PATH)
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        shutil.rmtree(PREDICTIONS_DIR, ignore_errors=True)
+        get_model_registry().refresh()
         st.session_state.clear()
-        st.info("Banco de dados, modelo salvo e sessão resetados.")
+        st.info("Banco de dados, cache dos CSVs, previsões, modelo salvo e sessão resetados.")
         st.rerun()
 
+    # --- Jobs em segundo plano ---
+    st.header("4. Jobs")
+    jobs_panel()
+
 # --- Abas Principais ---
 tab_train, tab_predict, tab_chat = st.tabs(["📊 Resultados do Treino", "🚀 Previsões", "💬 Chat com o Modelo"])
 
@@ -194,22 +418,58 @@ with tab_train:
     else:
         st.subheader("📈 Métricas (Regressão)")
         st.json(st.session_state.metrics)
+        if st.session_state.get("scorer_warning"):
+            st.warning(st.session_state.scorer_warning)
+        persist = get_job_manager().get(st.session_state.get("persist_job_id"))
+        if st.session_state.get("persist_error"):
+            st.subheader("💾 Persistência SOR/SOT")
+            st.warning(st.session_state.persist_error)
+        if persist is not None:
+            st.subheader("💾 Persistência SOR/SOT")
+            if not persist.finished:
+                st.info(f"Gravação do banco em andamento: {persist.stage} (o modelo já está disponível).")
+            elif persist.status == FAILED:
+                st.error(f"Falha ao gravar o banco: {persist.error}")
+            elif persist.status == CANCELLED:
+                st.warning("Gravação do banco cancelada; o banco anterior foi mantido.")
+            else:
+                persist_stats = persist.result
+                st.markdown("**📥 Ingestão (CSV -> SOR)**")
+                st.json({k: v for k, v in persist_stats.items() if k != "normalization"})
+                st.markdown("**🧩 Normalização JSON (gêneros, palavras-chave, elenco, equipe)**")
+                st.json(persist_stats["normalization"])
+        if st.session_state.get("search_results") is not None:
+            st.subheader("🏁 Busca de Modelos (validação cruzada)")
+            st.dataframe(st.session_state.search_results, use_container_width=True)
         st.subheader("🔎 Importâncias (Coeficientes)")
-        st.dataframe(st.session_state.importances, use_container_width=True)
+        if st.session_state.importances is not None:
+            st.dataframe(st.session_state.importances, use_container_width=True)
+        else:
+            st.info("O modelo escolhido não é linear: não há coeficientes para mostrar.")
 
 with tab_predict:
     st.header("Previsões para Novos Dados")
     if not st.session_state.predictions_made:
         st.info("⬅️ Carregue um modelo e faça uma previsão na barra lateral para ver os resultados.")
     else:
+        stats = st.session_state.get("prediction_stats") or {}
+        st.caption(f"Prévia das primeiras {PREVIEW_ROWS} de {stats.get('rows', '?')} linhas pontuadas ({stats}).")
         st.dataframe(st.session_state.prediction_df)
-        csv_data = convert_df_to_csv(st.session_state.prediction_df)
-        st.download_button(
-           label="Download das Previsões em CSV",
-           data=csv_data,
-           file_name='movie_predictions.csv',
-           mime='text/csv',
-        )
+        # O st.download_button carrega o arquivo inteiro na memória do servidor:
+        # a leitura só acontece quando o download é pedido, e não a cada rerun.
+        if st.toggle("Preparar download das previsões"):
+            try:
+                with open(st.session_state.get("predictions_path") or "", "rb") as predictions_file:
+                    predictions_data = predictions_file.read()
+            except FileNotFoundError:
+                st.warning("O arquivo de previsões não existe mais (limpeza ou expiração). Gere as previsões novamente.")
+            else:
+                st.download_button(
+                   label="Download das Previsões em CSV",
+                   data=predictions_data,
+                   file_name='movie_predictions.csv',
+                   mime='text/csv',
+                )
 
 with tab_chat:
     st.header("Converse com o Assistente do Modelo")
@@ -0,0 +1,74 @@
+"""Latência do pipeline do sklearn contra o LinearScorer dobrado (core/models/fast_scorer.py).
+
+Sem --model, treina um pipeline como o do app (ColumnTransformer + LinearRegression)
+sobre dados sintéticos. Confere a equivalência das previsões e mede a latência
+mediana por chamada para lotes de tamanhos diferentes.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/fast_scorer_benchmark.py --batch-sizes 1 10 1000
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.etl import FEATURES
+from core.features.preprocess import make_preprocess_pipeline
+from core.models.fast_scorer import export_linear_scorer, verify_equivalence
+from core.models.train import train_regressor
+
+def synthetic_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "budget": rng.integers(1_000_000, 200_000_000, n_rows).astype(float),
+        "revenue": rng.integers(1_000_000, 900_000_000, n_rows).astype(float),
+        "popularity": rng.uniform(0.5, 150, n_rows),
+        "runtime": rng.integers(80, 180, n_rows).astype(float),
+    })
+    df["vote_average"] = 5 + 1e-9 * df["revenue"] + 0.01 * df["popularity"] + rng.normal(0, 0.5, n_rows)
+    return df
+
+def median_latency_us(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=None, help="Pipeline treinado (.pickle); sem ele, treina um sintético.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+
+    df = synthetic_frame(5_000)
+    if args.model:
+        with open(args.model, "rb") as f:
+            model = pickle.load(f)
+    else:
+        X = df[FEATURES]
+        model, _, _ = train_regressor(X, df["vote_average"], make_preprocess_pipeline(X))
+
+    scorer = export_linear_scorer(model)
+    print(f"Equivalência com o pipeline: diferença máxima {verify_equivalence(model, scorer, df[FEATURES]):.3e}")
+
+    for batch_size in args.batch_sizes:
+        frame = df[FEATURES].iloc[:batch_size]
+        array = frame.to_numpy(dtype=np.float64)
+        pipeline_us = median_latency_us(lambda: model.predict(frame), args.repeats)
+        scorer_us = median_latency_us(lambda: scorer.predict(array), args.repeats)
+        print(f"lote={batch_size:>5}  pipeline={pipeline_us:9.1f} µs  scorer={scorer_us:7.1f} µs  "
+              f"ganho={pipeline_us / scorer_us:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Teste de carga do serviço de previsão (core/models/service.py).
+
+Dispara requisições de uma linha a partir de várias threads e mede vazão e
+latência p50/p99. Sem --url, sobe o serviço no próprio processo com o modelo
+informado; com --url, mede um serviço já em execução.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/prediction_service_load.py --concurrency 1 8 32 --max-wait-ms 0 2 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.models.service import make_server
+
+def random_movie(rng):
+    return {
+        "budget": float(rng.integers(1_000_000, 200_000_000)),
+        "revenue": float(rng.integers(1_000_000, 900_000_000)),
+        "popularity": float(rng.uniform(0.5, 150)),
+        "runtime": float(rng.integers(80, 180)),
+    }
+
+def run_load(url, concurrency, requests_per_client):
+    latencies = [[] for _ in range(concurrency)]
+    errors = []
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        for _ in range(requests_per_client):
+            body = json.dumps(random_movie(rng)).encode("utf-8")
+            request = urllib.request.Request(f"{url}/predict", data=body, headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    json.loads(response.read())
+            except Exception as e:
+                errors.append(e)
+                continue
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return {
+        "requests": len(all_latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(all_latencies, 50)), 2) if len(all_latencies) else None,
+        "p99_ms": round(float(np.percentile(all_latencies, 99)), 2) if len(all_latencies) else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Serviço já em execução (ex.: http://127.0.0.1:8000).")
+    parser.add_argument("--model", default=os.path.join(project_root, "model", "movie_rating_predictor.pickle"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requisições por cliente.")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0.0, 2.0, 5.0])
+    args = parser.parse_args()
+
+    if args.url:
+        for concurrency in args.concurrency:
+            print(f"concorrência={concurrency:>3}  {run_load(args.url, concurrency, args.requests)}")
+        return
+
+    for max_wait_ms in args.max_wait_ms:
+        server = make_server(args.model, port=0, max_batch=args.max_batch, max_wait_ms=max_wait_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        for concurrency in args.concurrency:
+            result = run_load(url, concurrency, args.requests)
+            print(f"max_wait={max_wait_ms:>4} ms  concorrência={concurrency:>3}  {result}")
+        server.shutdown()
+        server.server_close()
+        server.batcher.registry.stop()
+
+if __name__ == "__main__":
+    main()
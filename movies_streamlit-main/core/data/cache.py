@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import pandas as pd
+
+from core.data.io import csv_columns, read_csv_smart
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # sem pyarrow o cache fica desligado e o CSV é sempre lido
+    feather = None
+
+HASH_BLOCK_SIZE = 1 << 20
+# Arquivos de cache mantidos em disco (um por CSV distinto); os usados há mais
+# tempo são apagados depois de cada gravação.
+CACHE_KEEP_FILES = 8
+
+# (caminho, tamanho, mtime) -> sha256, para não reler do disco um arquivo que não mudou.
+_path_digests = {}
+
+def content_hash(source) -> str:
+    """
+    SHA-256 do conteúdo de um CSV.
+
+    Args:
+        source: Caminho do arquivo ou objeto de arquivo (ex.: upload do Streamlit).
+
+    Returns:
+        str: Hash hexadecimal do conteúdo.
+    """
+    if hasattr(source, "getvalue"):
+        return hashlib.sha256(source.getvalue()).hexdigest()
+    if hasattr(source, "read"):
+        source.seek(0)
+        digest = hashlib.sha256()
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block if isinstance(block, bytes) else block.encode("utf-8"))
+        source.seek(0)
+        return digest.hexdigest()
+
+    stat = os.stat(source)
+    key = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+    if key not in _path_digests:
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        _path_digests[key] = digest.hexdigest()
+    return _path_digests[key]
+
+def cache_file_for(source, cache_dir: str, read_options: dict | None = None) -> str:
+    """Arquivo de cache do CSV: hash do conteúdo + hash das opções de leitura."""
+    options_key = hashlib.sha256(
+        json.dumps(read_options or {}, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{content_hash(source)}-{options_key}.feather")
+
+def evict_cache(cache_dir: str, keep: int = CACHE_KEEP_FILES):
+    """Apaga os arquivos .feather além dos `keep` usados mais recentemente (mtime)."""
+    files = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".feather"):
+            try:
+                files.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:  # removido por outra sessão
+                pass
+    for _, path in sorted(files, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def load_cached_frame(source, cache_dir: str, columns: list[str] | None = None,
+                      read_options: dict | None = None) -> pd.DataFrame:
+    """
+    Lê um CSV através de um cache colunar endereçado pelo conteúdo do arquivo.
+
+    Na primeira vez só as `columns` pedidas são parseadas (`read_csv_smart` com
+    `usecols`, sem decodificar colunas grandes que a etapa não usa) e gravadas em
+    Arrow/Feather sem compressão. Nas seguintes, o mesmo conteúdo não é parseado
+    de novo: o arquivo é mapeado em memória e só as `columns` pedidas são lidas.
+    Se uma etapa pedir colunas que o cache ainda não tem, o CSV é parseado com
+    elas mais as já guardadas, e o arquivo de cache é substituído.
+
+    Args:
+        source: Caminho do CSV ou objeto de arquivo.
+        cache_dir: Pasta onde ficam os arquivos de cache.
+        columns: Colunas que a etapa precisa (None = todas).
+        read_options: Argumentos extras para `pd.read_csv` (fazem parte da chave).
+
+    Returns:
+        pandas.DataFrame: Os dados (apenas as colunas pedidas).
+    """
+    read_options = read_options or {}
+    schema_dir = os.path.join(cache_dir, "schemas")
+    if feather is None:
+        return read_csv_smart(source, usecols=columns, schema_dir=schema_dir, **read_options)
+
+    start = time.perf_counter()
+    path = cache_file_for(source, cache_dir, read_options)
+    wanted = list(columns) if columns is not None else csv_columns(source)
+    cached_columns = []
+    try:
+        table = feather.read_table(path, memory_map=True)
+        cached_columns = table.column_names
+        if set(wanted) <= set(cached_columns):
+            df = table.select(wanted).to_pandas()
+            os.utime(path)  # marca o uso, para a remoção dos menos usados
+            print(f"Cache colunar: '{os.path.basename(path)}' lido em {time.perf_counter() - start:.2f}s.")
+            return df
+    except FileNotFoundError:
+        pass
+
+    usecols = wanted + [c for c in cached_columns if c not in wanted]
+    df = read_csv_smart(source, usecols=usecols, schema_dir=schema_dir, **read_options)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Nome único: duas sessões gravando o mesmo CSV não usam o mesmo temporário.
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        feather.write_feather(df, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_cache(cache_dir)
+    print(f"Cache colunar: {len(usecols)} colunas parseadas e salvas em '{os.path.basename(path)}' "
+          f"({time.perf_counter() - start:.2f}s).")
+    return df[wanted]
@@ -1,4 +1,172 @@
+import codecs
+import csv
+import io
+import json
+import os
+
 import pandas as pd
 
-def read_csv_smart(file_or_path):
-    return pd.read_csv(file_or_path, sep=None, engine="python")
+try:
+    import pyarrow  # noqa: F401  (só para saber se o engine "pyarrow" do pandas está disponível)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Bytes do início do arquivo usados para detectar delimitador e encoding.
+SNIFF_SAMPLE_BYTES = 64 * 1024
+SNIFF_DELIMITERS = ",;\t|"
+# Opções do pd.read_csv que o engine "pyarrow" não aceita; com elas, usa-se o engine "c".
+PYARROW_UNSUPPORTED = {"chunksize", "float_precision", "iterator", "low_memory", "nrows", "skipfooter"}
+
+# Esquemas (sep, encoding, dtypes) já vistos neste processo, por fonte.
+_schemas = {}
+
+def _head_sample(file_or_path, size: int = SNIFF_SAMPLE_BYTES) -> bytes:
+    if hasattr(file_or_path, "read"):
+        file_or_path.seek(0)
+        sample = file_or_path.read(size)
+        file_or_path.seek(0)
+        return sample.encode("utf-8") if isinstance(sample, str) else sample
+    with open(file_or_path, "rb") as f:
+        return f.read(size)
+
+def detect_encoding(sample: bytes) -> str:
+    """Encoding provável do CSV: utf-8 (com ou sem BOM) ou, se não decodificar, latin-1."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Um caractere multibyte cortado no fim da amostra não conta como erro.
+        if e.start < len(sample) - 3:
+            return "latin-1"
+    return "utf-8"
+
+def detect_delimiter(text: str) -> str:
+    """Delimitador detectado pelo csv.Sniffer nas linhas completas da amostra (padrão ',')."""
+    if "\n" in text:
+        text = text[:text.rindex("\n")]
+    try:
+        return csv.Sniffer().sniff(text, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+def sniff_csv(file_or_path) -> tuple[str, str]:
+    """Delimitador e encoding do CSV, a partir de uma amostra do início do arquivo."""
+    sample = _head_sample(file_or_path)
+    encoding = detect_encoding(sample)
+    return detect_delimiter(sample.decode(encoding, errors="ignore")), encoding
+
+def csv_columns(file_or_path) -> list[str]:
+    """Nomes das colunas do CSV (só o cabeçalho é lido)."""
+    sep, encoding = sniff_csv(file_or_path)
+    if hasattr(file_or_path, "seek"):
+        file_or_path.seek(0)
+    columns = list(pd.read_csv(file_or_path, sep=sep, encoding=encoding, nrows=0).columns)
+    if hasattr(file_or_path, "seek"):
+        file_or_path.seek(0)
+    return columns
+
+def named_buffer(data: bytes, name: str) -> io.BytesIO:
+    """
+    Buffer em memória com `.name`, como um upload do Streamlit.
+
+    O nome é a chave do esquema salvo por `read_csv_smart`: um BytesIO sem nome
+    não guarda nem reaproveita os dtypes inferidos.
+
+    Args:
+        data: Conteúdo do CSV.
+        name: Nome estável da fonte (ex.: "tmdb_5000_movies.csv").
+
+    Returns:
+        io.BytesIO: O buffer, posicionado no início.
+    """
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return buffer
+
+def _source_key(file_or_path) -> str | None:
+    if isinstance(file_or_path, (str, os.PathLike)):
+        return os.path.abspath(file_or_path)
+    return getattr(file_or_path, "name", None)  # ex.: upload do Streamlit, named_buffer
+
+def _schema_file(schema_dir: str, key: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in os.path.basename(key))
+    return os.path.join(schema_dir, f"{safe}.json")
+
+def _load_schema(key, schema_dir):
+    if key is None:
+        return None
+    if key not in _schemas and schema_dir is not None:
+        path = _schema_file(schema_dir, key)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                _schemas[key] = json.load(f)
+    return _schemas.get(key)
+
+def _save_schema(key, schema_dir, schema: dict):
+    if key is None:
+        return
+    _schemas[key] = schema
+    if schema_dir is not None:
+        os.makedirs(schema_dir, exist_ok=True)
+        with open(_schema_file(schema_dir, key), "w", encoding="utf-8") as f:
+            json.dump(schema, f, ensure_ascii=False, indent=2)
+
+def read_csv_smart(file_or_path, usecols: list[str] | None = None, schema_dir: str | None = None,
+                   **read_options) -> pd.DataFrame:
+    """
+    Lê um CSV detectando delimitador e encoding, com o engine mais rápido disponível.
+
+    - Delimitador e encoding vêm de uma amostra do início do arquivo (csv.Sniffer),
+      e não do parser Python de `sep=None`.
+    - Os dtypes inferidos na primeira leitura de uma fonte (engine "c") ficam
+      guardados (em memória e, com `schema_dir`, em JSON); nas leituras seguintes
+      são passados ao pandas, que não infere os tipos de novo e usa o engine
+      "pyarrow" quando instalado. Se o arquivo mudou e o esquema não serve mais,
+      lê de novo com inferência e atualiza o esquema.
+
+    Args:
+        file_or_path: Caminho do CSV ou objeto de arquivo (ex.: upload do Streamlit).
+        usecols: Colunas que a etapa precisa (None = todas).
+        schema_dir: Pasta onde os esquemas por fonte são persistidos (opcional).
+        **read_options: Opções extras para `pd.read_csv` (ex.: dtype, float_precision).
+
+    Returns:
+        pandas.DataFrame: Os dados lidos.
+    """
+    sep, encoding = sniff_csv(file_or_path)
+    fast_engine = "pyarrow" if PYARROW_AVAILABLE and not PYARROW_UNSUPPORTED & read_options.keys() else "c"
+
+    user_dtype = read_options.pop("dtype", None) or {}
+    key = _source_key(file_or_path)
+    schema = _load_schema(key, schema_dir)
+    if schema is not None and (schema["sep"], schema["encoding"]) != (sep, encoding):
+        schema = None
+    dtypes = None
+    if schema is not None:
+        dtypes = {c: t for c, t in schema["dtypes"].items() if usecols is None or c in usecols}
+        dtypes.update(user_dtype)
+
+    def _read(dtype, engine):
+        if hasattr(file_or_path, "seek"):
+            file_or_path.seek(0)
+        options = dict(read_options)
+        if dtype is not None:
+            options["dtype"] = dtype
+        return pd.read_csv(file_or_path, sep=sep, encoding=encoding, usecols=usecols, engine=engine, **options)
+
+    if dtypes is not None:
+        try:
+            return _read(dtypes, fast_engine)
+        except (ValueError, TypeError):
+            pass  # esquema desatualizado: lê com inferência e regrava abaixo
+
+    # A inferência fica com o engine "c": o "pyarrow" infere tipos diferentes
+    # (ex.: datas viram date32), e o esquema gravado aqui é o que as próximas
+    # leituras vão usar.
+    df = _read(user_dtype or None, "c")
+    known = dict(schema["dtypes"]) if schema is not None else {}
+    known.update({c: str(t) for c, t in df.dtypes.items()})
+    _save_schema(key, schema_dir, {"sep": sep, "encoding": encoding, "dtypes": known})
+    return df
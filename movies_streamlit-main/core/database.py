@@ -1,8 +1,18 @@
 import sqlite3
 import os
 import pandas as pd
+from contextlib import contextmanager
 from sqlite3 import Connection
 
+# PRAGMAs da sessão de carga em massa: WAL, sem fsync a cada commit e cache de
+# páginas maior (valor negativo = KiB).
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "OFF",
+    "cache_size": "-262144",
+    "temp_store": "MEMORY",
+}
+
 def create_database_connection(db_file: str) -> Connection | None:
     """Cria uma conexão com o banco de dados SQLite."""
     conn = None
@@ -15,12 +25,46 @@ def create_database_connection(db_file: str) -> Connection | None:
         print(f"Ocorreu um erro ao conectar ao banco de dados: {e}")
         return None
 
+@contextmanager
+def bulk_load_session(conn: Connection):
+    """
+    Ajusta a conexão para cargas em massa (BULK_LOAD_PRAGMAS) durante o bloco `with`.
+
+    Ao sair, faz o checkpoint do WAL e restaura os valores anteriores de
+    synchronous, cache_size e temp_store (o journal continua em WAL, que é durável
+    com synchronous=FULL e permite leituras concorrentes).
+    """
+    previous = {
+        pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        for pragma in ("synchronous", "cache_size", "temp_store")
+    }
+    conn.commit()
+    for pragma, value in BULK_LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        for pragma, value in previous.items():
+            conn.execute(f"PRAGMA {pragma}={value}")
+
+def run_in_transaction(conn: Connection, statements_sql: str):
+    """Executa um script SQL dentro de uma única transação explícita (BEGIN ... COMMIT)."""
+    conn.commit()
+    try:
+        conn.executescript(f"BEGIN;\n{statements_sql}\nCOMMIT;")
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
 def execute_sql_from_file(conn: Connection, filepath: str):
     """Lê um arquivo .sql e executa seu conteúdo."""
     print(f"Executando script: {os.path.basename(filepath)}...")
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            conn.executescript(f.read())
+            run_in_transaction(conn, f.read())
         print("Script executado com sucesso.")
     except sqlite3.Error as e:
         print(f"Ocorreu um erro ao executar o script {os.path.basename(filepath)}: {e}")
@@ -41,18 +85,44 @@ def transform_data(conn: Connection, sql_folder: str):
         script_path = os.path.join(sql_folder, script_name)
         execute_sql_from_file(conn, script_path)
 
+def create_indexes(conn: Connection, sql_folder: str):
+    """Cria os índices depois da carga (mais barato do que mantê-los durante os inserts)."""
+    print("\n--- Criando índices ---")
+    execute_sql_from_file(conn, os.path.join(sql_folder, "indexes.sql"))
+
+TRAINING_FILTER = "budget > 1000 AND revenue > 1000 AND runtime > 0 AND vote_average > 0"
+
 def load_sot_data_for_training(conn: Connection) -> pd.DataFrame:
     """Carrega os dados da tabela SOT, prontos para o treinamento."""
     print("Carregando dados da SOT para treinamento...")
-    query = """
+    query = f"""
         SELECT budget, revenue, popularity, runtime, vote_average
         FROM sot_movies
-        WHERE budget > 1000 AND revenue > 1000 AND runtime > 0 AND vote_average > 0
+        WHERE {TRAINING_FILTER}
     """
     df = pd.read_sql_query(query, conn)
     print(f"Carregados {len(df)} registros para treinamento.")
     return df
 
+def iter_sot_training_chunks(conn: Connection, chunksize: int = 50_000):
+    """
+    Itera os dados de treino da SOT em chunks, sem materializar o resultado inteiro.
+
+    O cursor do SQLite avança a consulta sob demanda (fetchmany), então a memória
+    fica limitada a um chunk. Cada chunk traz também o `id` do filme, usado para
+    separar treino e teste de forma determinística.
+    """
+    columns = ["id", "budget", "revenue", "popularity", "runtime", "vote_average"]
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM sot_movies WHERE {TRAINING_FILTER}")
+    try:
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
 # --- FUNÇÃO QUE FALTAVA ---
 def drop_database(conn: Connection, db_file: str):
     """Fecha a conexão e apaga o arquivo do banco de dados."""
@@ -0,0 +1,130 @@
+import os
+import time
+
+import pandas as pd
+
+from core.data.cache import load_cached_frame
+from core.data.io import read_csv_smart
+from core.database import (
+    bulk_load_session,
+    create_database_connection,
+    create_indexes,
+    create_tables,
+    transform_data
+)
+from core.ingestion import ingest_csv_chunked
+from core.normalize import normalize_json_columns
+
+FEATURES = ["budget", "revenue", "popularity", "runtime"]
+TARGET = "vote_average"
+# Colunas JSON opcionais do treino (codificadas por hashing em core.features.preprocess).
+# Só do CSV de filmes, para o modelo poder pontuar um CSV de filmes sem os créditos.
+MOVIE_TEXT_COLUMNS = ["genres", "keywords", "production_companies"]
+
+# Mesmo filtro de load_sot_data_for_training, aplicado em memória.
+def _training_filter(df: pd.DataFrame) -> pd.Series:
+    return (df["budget"] > 1000) & (df["revenue"] > 1000) & (df["runtime"] > 0) & (df["vote_average"] > 0)
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+def load_training_frame(movies_source, credits_source, cache_dir: str | None = None,
+                        text_columns: bool = False) -> pd.DataFrame:
+    """
+    Monta o DataFrame de treino direto dos CSVs, em uma única passada.
+
+    Só as colunas usadas pelo modelo são materializadas no parse (`usecols`):
+    do arquivo de créditos lê-se apenas `movie_id`, sem decodificar as células
+    JSON de cast/crew. A junção filmes x créditos e o filtro de qualidade são
+    feitos uma vez, em memória.
+
+    Args:
+        movies_source: Caminho ou arquivo do tmdb_5000_movies.csv.
+        credits_source: Caminho ou arquivo do tmdb_5000_credits.csv.
+        cache_dir: Se informado, os CSVs passam pelo cache colunar
+            (core.data.cache): um conteúdo já visto não é parseado de novo.
+        text_columns: Se True, traz também as colunas JSON de gêneros,
+            palavras-chave e produtoras (strings cruas).
+
+    Returns:
+        pandas.DataFrame: Colunas FEATURES (+ colunas JSON) + TARGET, prontas para o treino.
+    """
+    start = time.perf_counter()
+    movies_options = {
+        "dtype": {col: "float64" for col in [*FEATURES, TARGET]},
+        # mesmo arredondamento do CAST AS REAL do SQLite (os valores batem com a SOT)
+        "float_precision": "round_trip",
+    }
+    text_movies = MOVIE_TEXT_COLUMNS if text_columns else []
+    movie_columns = ["id", *FEATURES, *text_movies, TARGET]
+    credit_columns = ["movie_id"]
+    if cache_dir is not None:
+        movies = load_cached_frame(movies_source, cache_dir, movie_columns, movies_options)
+        credits = load_cached_frame(credits_source, cache_dir, credit_columns)
+    else:
+        movies = read_csv_smart(movies_source, usecols=movie_columns, **movies_options)
+        credits = read_csv_smart(credits_source, usecols=credit_columns)
+
+    df = movies.merge(credits.rename(columns={"movie_id": "id"}), on="id")
+    df = df.loc[_training_filter(df), [*FEATURES, *text_movies, TARGET]].reset_index(drop=True)
+    print(f"Carregados {len(df)} registros para treinamento em {time.perf_counter() - start:.2f}s (ETL em memória).")
+    return df
+
+def _no_progress(stage: str, progress: float | None = None):
+    pass
+
+def persist_sor_sot(db_file: str, movies_source, credits_source, sql_folder: str, progress=None) -> dict:
+    """
+    Grava as camadas SOR e SOT (scripts tipados + tabelas filhas JSON) em `db_file`.
+
+    O banco é montado em um arquivo temporário e só então trocado pelo atual
+    (os.replace), para que nenhuma leitura veja um banco pela metade. Se algo
+    falhar antes da troca (inclusive um cancelamento levantado por `progress`),
+    o temporário é apagado e o banco atual fica intacto.
+
+    Args:
+        progress: Opcional, chamado como progress(etapa, fração) entre as etapas
+            (ex.: Job.report de core/jobs.py).
+
+    Returns:
+        dict: Estatísticas de ingestão e normalização.
+    """
+    progress = progress or _no_progress
+    tmp_file = db_file + ".tmp"
+    tmp_paths = (tmp_file, tmp_file + "-wal", tmp_file + "-shm")
+    for path in tmp_paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+    conn = create_database_connection(tmp_file)
+    if conn is None:
+        raise RuntimeError(f"Não foi possível criar o banco '{tmp_file}'.")
+    try:
+        with bulk_load_session(conn):
+            progress("SOR: criando tabelas", 0.0)
+            create_tables(conn, sql_folder)
+            progress("SOR: ingestão dos filmes", 0.05)
+            stats = {"sor_tmdb_movies": ingest_csv_chunked(conn, _rewind(movies_source), "sor_tmdb_movies")}
+            progress("SOR: ingestão dos créditos", 0.25)
+            stats["sor_tmdb_credits"] = ingest_csv_chunked(conn, _rewind(credits_source), "sor_tmdb_credits")
+            progress("SOT: transformação", 0.5)
+            transform_data(conn, sql_folder)
+            create_indexes(conn, sql_folder)
+            progress("SOT: normalização JSON", 0.6)
+            stats["normalization"] = normalize_json_columns(conn, sql_folder)
+        progress("Publicando o banco", 0.95)
+        # Sai do WAL antes da troca, para o arquivo principal conter tudo.
+        conn.execute("PRAGMA journal_mode=DELETE")
+    except BaseException:
+        conn.close()
+        for path in tmp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    conn.close()
+
+    os.replace(tmp_file, db_file)
+    print(f"SOR/SOT persistidas em '{os.path.basename(db_file)}'.")
+    return stats
@@ -1,35 +1,64 @@
 import numpy as np
 import pandas as pd
 
-def extract_linear_importances(model_pipeline, original_cols):
+def _output_feature_names(preprocessor, original_cols):
+    """
+    Nomes das colunas de saída do pré-processador, na ordem dos coeficientes.
+
+    Colunas padronizadas mantêm o nome original; colunas com hashing viram um
+    nome por bucket (ver JsonListHasher.bucket_label).
+    """
+    if preprocessor is None or not hasattr(preprocessor, "transformers_"):
+        return list(original_cols)
+
+    names = []
+    for _, transformer, selected in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        if hasattr(transformer, "bucket_label"):
+            names.extend(transformer.bucket_label(i) for i in range(transformer.n_features))
+        else:
+            selected = [original_cols[c] if isinstance(c, (int, np.integer)) else c for c in np.atleast_1d(selected)]
+            names.extend(selected)
+    return names
+
+def extract_linear_importances(model_pipeline, original_cols, preprocessor=None, top_n=None):
     """
     Extrai os coeficientes de um modelo de regressão linear de dentro de um pipeline.
-    Esta versão é adaptada para um pré-processador simples que não altera
-    os nomes ou a ordem das features.
+
+    Com um pré-processador simples (só padronização), cada coeficiente é uma
+    feature original. Com as colunas JSON codificadas por hashing, cada
+    coeficiente é um bucket, nomeado com os tokens mais frequentes que caíram
+    nele no treino (ex.: "keywords#812 (dystopia, android)").
 
     Args:
         model_pipeline (sklearn.pipeline.Pipeline): O pipeline treinado que contém um passo chamado 'regressor'.
         original_cols (list): A lista de nomes das colunas originais (features).
+        preprocessor: Pré-processador treinado (padrão: o passo 'preprocessor' do pipeline).
+        top_n (int, opcional): Devolve só as `top_n` features de maior coeficiente em módulo.
 
     Returns:
         pandas.DataFrame: Um DataFrame com as features e seus coeficientes, ordenado pela importância.
     """
     # 1. Acessa o passo do regressor no nosso pipeline (que chamamos de 'regressor')
     regressor = model_pipeline.named_steps['regressor']
-    
+    if preprocessor is None:
+        preprocessor = model_pipeline.named_steps.get('preprocessor')
+
     # 2. Extrai os coeficientes do modelo treinado
     coefs = regressor.coef_.ravel()
-    
-    # 3. Cria o DataFrame final
-    # Como nosso pré-processador não muda as colunas, podemos usar os nomes originais
+
+    # 3. Cria o DataFrame final, com um nome por coluna de saída do pré-processador
+    names = _output_feature_names(preprocessor, list(original_cols))
     df = pd.DataFrame({
-        "Feature": original_cols, 
+        "Feature": names,
         "Coefficient": coefs
     })
 
     # 4. Adiciona uma coluna com o valor absoluto para poder ordenar pela magnitude
     df["abs_coef"] = df["Coefficient"].abs()
-    
+
     # 5. Ordena o DataFrame pela importância (maior coeficiente em módulo)
     # e remove a coluna auxiliar antes de retornar.
-    return df.sort_values(by="abs_coef", ascending=False).drop(columns="abs_coef")
\ No newline at end of file
+    df = df.sort_values(by="abs_coef", ascending=False).drop(columns="abs_coef")
+    return df.head(top_n) if top_n is not None else df
@@ -1,18 +1,106 @@
+import json
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.compose import ColumnTransformer
 
+# Colunas JSON (listas de objetos do TMDB) codificadas com o hashing trick,
+# com a largura fixa (número de buckets) de cada uma. Só colunas do CSV de
+# filmes: é o único arquivo disponível na hora de pontuar (CSV de previsão,
+# serviço HTTP, CLI), então cast/crew do CSV de créditos ficam de fora.
+HASHED_COLUMNS = {
+    "genres": 2**6,
+    "keywords": 2**12,
+    "production_companies": 2**10,
+}
+# Quantos tokens de exemplo são guardados por bucket, para explicar os coeficientes.
+TOKENS_PER_BUCKET = 3
+
+def _json_items(value) -> list:
+    """Lista de objetos de uma célula JSON (string ou lista já decodificada)."""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value:
+        return []
+    try:
+        items = json.loads(value)
+    except ValueError:
+        return []
+    return items if isinstance(items, list) else []
+
+class JsonListHasher(BaseEstimator, TransformerMixin):
+    """
+    Codifica uma coluna JSON do TMDB (ex.: genres, keywords) em uma matriz esparsa de largura fixa.
+
+    Cada objeto da lista vira um token "coluna=nome" e o FeatureHasher o leva a
+    um dos `n_features` buckets: a memória não cresce com o número de produtoras ou
+    palavras-chave distintas, ao contrário do one-hot. O `fit` não é necessário
+    para codificar; ele só guarda os tokens mais frequentes de cada bucket, para
+    que os coeficientes possam ser explicados depois (`bucket_label`).
+    """
+
+    def __init__(self, column: str, n_features: int = 2**10):
+        self.column = column
+        self.n_features = n_features
+
+    def _tokens(self, value) -> list:
+        return [f"{self.column}={item['name']}" for item in _json_items(value) if isinstance(item, dict) and item.get("name")]
+
+    def _hasher(self):
+        # alternate_sign=False: cada bucket soma contagens, e o coeficiente tem um sinal legível.
+        return FeatureHasher(n_features=self.n_features, input_type="string", alternate_sign=False)
+
+    def _column_values(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X.iloc[:, 0]
+        return np.asarray(X, dtype=object).ravel()
+
+    def fit(self, X, y=None):
+        counts = Counter(token for value in self._column_values(X) for token in self._tokens(value))
+        buckets = defaultdict(list)
+        if counts:
+            tokens = [token for token, _ in counts.most_common()]
+            indices = self._hasher().transform([[token] for token in tokens]).indices
+            for token, bucket in zip(tokens, indices):
+                if len(buckets[bucket]) < TOKENS_PER_BUCKET:
+                    buckets[bucket].append(token.split("=", 1)[1])
+        self.bucket_tokens_ = dict(buckets)
+        return self
+
+    def transform(self, X):
+        return self._hasher().transform(self._tokens(value) for value in self._column_values(X))
+
+    def bucket_label(self, bucket: int) -> str:
+        """Nome legível de um bucket: coluna, índice e os tokens mais frequentes vistos no treino."""
+        tokens = self.bucket_tokens_.get(bucket)
+        label = f"{self.column}#{bucket}"
+        return f"{label} ({', '.join(tokens)})" if tokens else label
+
 def make_preprocess_pipeline(X):
-    """Cria um pipeline de pré-processamento para as features."""
-    # Para este projeto, todas as nossas features são numéricas.
-    # Vamos apenas aplicar a padronização (StandardScaler).
+    """
+    Cria um pipeline de pré-processamento para as features.
+
+    As colunas numéricas são padronizadas (StandardScaler). As colunas JSON de
+    HASHED_COLUMNS presentes em X viram matrizes esparsas de largura fixa
+    (JsonListHasher), empilhadas ao lado das numéricas. Qualquer outra coluna é
+    descartada, para nunca chegar texto cru ao regressor.
+    """
     numeric_features = X.select_dtypes(include=['number']).columns
-    
+    transformers = [('num', StandardScaler(), numeric_features)]
+    for column, n_features in HASHED_COLUMNS.items():
+        if column in X.columns:
+            transformers.append((f'hash_{column}', JsonListHasher(column, n_features), column))
+
     preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numeric_features)
-        ],
-        remainder='passthrough' # Mantém outras colunas, se houver
+        transformers=transformers,
+        remainder='drop',
+        # Com alguma coluna esparsa, a saída inteira fica esparsa (as numéricas são poucas).
+        sparse_threshold=1.0
     )
-    
-    return preprocessor
\ No newline at end of file
+
+    return preprocessor
@@ -1,42 +1,117 @@
 import pandas as pd
 from sqlite3 import Connection
 import os
+import sys
+import time
 
-def ingest_csv_to_sor(conn: Connection, csv_path: str, table_name: str):
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Linhas lidas do CSV por vez. A memória de pico da ingestão fica limitada a um
+# chunk (e não ao arquivo inteiro), mesmo com as células JSON enormes de cast/crew.
+DEFAULT_CHUNKSIZE = 20_000
+
+def peak_rss_mb() -> float | None:
+    """Pico de memória residente do processo em MB (None se não disponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _quote(identifier: str) -> str:
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+def _sqlite_type(dtype) -> str:
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def ingest_csv_chunked(conn: Connection, csv_source, table_name: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                       as_text: bool = True, replace: bool = False) -> dict:
     """
-    Lê dados de um arquivo CSV e os insere em uma tabela SOR no banco de dados.
+    Lê um CSV em chunks e grava cada chunk em uma transação, com inserts em lote (executemany).
+
+    Args:
+        conn: Conexão SQLite.
+        csv_source: Caminho do CSV ou objeto de arquivo (ex.: upload do Streamlit).
+        table_name: Tabela de destino. É criada a partir das colunas do primeiro chunk se não existir.
+        chunksize: Número de linhas por chunk.
+        as_text: Se True, mantém todos os valores como texto (padrão da camada SOR);
+            se False, usa os tipos inferidos pelo pandas.
+        replace: Se True, apaga a tabela antes da ingestão.
+
+    Returns:
+        dict: Estatísticas da ingestão (linhas, segundos, linhas/s e pico de memória em MB).
+    """
+    start = time.perf_counter()
+    read_options = {"dtype": str, "keep_default_na": False} if as_text else {}
+    if replace:
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+
+    rows = 0
+    insert_sql = None
+    for chunk in pd.read_csv(csv_source, chunksize=chunksize, **read_options):
+        if insert_sql is None:
+            columns = ", ".join(f"{_quote(c)} {_sqlite_type(t)}" for c, t in chunk.dtypes.items())
+            placeholders = ", ".join("?" for _ in chunk.columns)
+            insert_sql = (
+                f"INSERT INTO {_quote(table_name)} ({', '.join(_quote(c) for c in chunk.columns)}) "
+                f"VALUES ({placeholders})"
+            )
+            with conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table_name)} ({columns})")
+
+        records = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+        with conn:  # uma transação por chunk
+            conn.executemany(insert_sql, records)
+        rows += len(chunk)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None,
+    }
+
+def ingest_csv_to_sor(conn: Connection, csv_path: str, table_name: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Lê dados de um arquivo CSV em chunks e os insere em uma tabela SOR no banco de dados.
     """
     if not os.path.exists(csv_path):
         print(f"Erro: Arquivo CSV não encontrado em '{csv_path}'")
         return
 
     print(f"Iniciando ingestão do '{os.path.basename(csv_path)}' para a tabela '{table_name}'...")
-    
-    try:
-        df = pd.read_csv(csv_path)
 
-        # Tratamento para a coluna 'cast' no arquivo de créditos
-        if 'cast' in df.columns:
-            df.rename(columns={'cast': '"cast"'}, inplace=True)
-
-        df.to_sql(table_name, conn, if_exists='append', index=False)
-        
-        print(f"Ingestão de {len(df)} registros para '{table_name}' concluída.")
+    try:
+        stats = ingest_csv_chunked(conn, csv_path, table_name, chunksize=chunksize)
+        print(
+            f"Ingestão de {stats['rows']} registros para '{table_name}' concluída "
+            f"({stats['rows_per_s']} linhas/s, pico de memória {stats['peak_rss_mb']} MB)."
+        )
+        return stats
 
     except Exception as e:
         print(f"Ocorreu um erro durante a ingestão para a tabela '{table_name}': {e}")
 
-def ingest_all_data(conn: Connection, data_folder: str):
+def ingest_all_data(conn: Connection, data_folder: str, chunksize: int = DEFAULT_CHUNKSIZE):
     """
     Orquestra a ingestão de todos os arquivos CSV para suas respectivas tabelas SOR.
     """
     print("\n--- Iniciando a ingestão de dados (CSV -> SOR) ---")
-    
+
     ingestion_map = {
         "tmdb_5000_movies.csv": "sor_tmdb_movies",
         "tmdb_5000_credits.csv": "sor_tmdb_credits"
     }
-    
+
     for csv_file, table_name in ingestion_map.items():
         csv_path = os.path.join(data_folder, csv_file)
-        ingest_csv_to_sor(conn, csv_path, table_name)
\ No newline at end of file
+        ingest_csv_to_sor(conn, csv_path, table_name, chunksize=chunksize)
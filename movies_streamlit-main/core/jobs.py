@@ -0,0 +1,174 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "na fila"
+RUNNING = "executando"
+DONE = "concluído"
+FAILED = "erro"
+CANCELLED = "cancelado"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Quantos jobs terminados continuam visíveis no painel.
+HISTORY_SIZE = 20
+
+class JobCancelled(Exception):
+    """Levantada dentro do job, no próximo ponto de progresso, depois de um pedido de cancelamento."""
+
+class JobConflict(Exception):
+    """Levantada por `submit` quando o recurso já está sendo escrito por um job de outra chave."""
+
+    def __init__(self, active: "Job"):
+        super().__init__(f"'{active.name}' ({active.id}) já está escrevendo este recurso; aguarde ou cancele-o.")
+        self.active = active
+
+class Job:
+    """
+    Uma execução em segundo plano, com etapa, progresso e cancelamento cooperativo.
+
+    A função do job recebe o próprio Job e chama `report(etapa, fração)` entre
+    as etapas. O cancelamento só é atendido nesses pontos: `report` levanta
+    JobCancelled, e a função desfaz o que for preciso ao propagar a exceção.
+    """
+
+    def __init__(self, key: str, name: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.key = key
+        self.name = name
+        self.status = PENDING
+        self.stage = ""
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, stage: str, progress: float | None = None):
+        """Atualiza etapa/progresso (0 a 1) e levanta JobCancelled se o cancelamento foi pedido."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job '{self.name}' cancelado na etapa '{self.stage}'.")
+        self.stage = stage
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class JobManager:
+    """
+    Executa jobs em um pool de threads, com no máximo um job ativo por chave.
+
+    A chave identifica o trabalho (ex.: gravar no banco *estes* CSVs, pelo hash
+    do conteúdo): um segundo pedido para a mesma chave, enquanto o primeiro está
+    na fila ou executando, recebe o job existente. O `resource` opcional
+    identifica o que o job escreve (o banco, o arquivo do modelo): um pedido com
+    outra chave para um recurso ocupado é recusado com JobConflict, em vez de
+    disputar os arquivos ou ser confundido com o job que já está lá.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: dict[str, Job] = {}
+        self._active: dict[str, Job] = {}
+        self._writers: dict[str, Job] = {}
+        self._resources: dict[str, str] = {}  # id do job -> recurso
+
+    def submit(self, key: str, name: str, fn, *args, resource: str | None = None, **kwargs) -> tuple[Job, bool]:
+        """
+        Agenda `fn(job, *args, **kwargs)` sob a chave `key`.
+
+        Args:
+            resource: O que o job escreve; no máximo um job ativo por recurso.
+
+        Returns:
+            tuple: (job, criado) — `criado` é False quando já havia um job ativo
+            para a chave e ele foi devolvido no lugar de um novo.
+
+        Raises:
+            JobConflict: Se `resource` está ocupado por um job de outra chave.
+        """
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                return active, False
+            writer = self._writers.get(resource) if resource is not None else None
+            if writer is not None:
+                raise JobConflict(writer)
+            job = Job(key, name)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            if resource is not None:
+                self._writers[resource] = job
+                self._resources[job.id] = resource
+            self._trim_history()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+
+    def _run(self, job: Job, fn, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.report("iniciando", 0.0)
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                resource = self._resources.pop(job.id, None)
+                if resource is not None and self._writers.get(resource) is job:
+                    del self._writers[resource]
+            job._done.set()
+            print(f"Job '{job.name}' ({job.id}) {job.status} em {job.elapsed():.2f}s.")
+
+    def _trim_history(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - HISTORY_SIZE)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str | None) -> Job | None:
+        return self._jobs.get(job_id) if job_id else None
+
+    def active(self, key: str) -> Job | None:
+        with self._lock:
+            return self._active.get(key)
+
+    def busy(self) -> bool:
+        """True se algum job está na fila ou executando."""
+        with self._lock:
+            return bool(self._active)
+
+    def jobs(self) -> list[Job]:
+        """Jobs conhecidos, do mais recente para o mais antigo."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
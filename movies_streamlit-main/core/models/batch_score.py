@@ -0,0 +1,186 @@
+import argparse
+import itertools
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow, só saída em CSV
+    pa = pq = None
+
+if __package__ in (None, ""):
+    # Execução direta (python core/models/batch_score.py): põe a raiz do projeto no caminho.
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from core.data.io import sniff_csv
+from core.ingestion import peak_rss_mb
+
+# Linhas do CSV de entrada por chunk (e por tarefa do pool).
+DEFAULT_CHUNKSIZE = 50_000
+PREDICTION_COLUMN = "predicted_vote_average"
+
+# Modelo carregado uma vez em cada processo do pool (ver _init_worker).
+_worker_model = None
+
+def _init_worker(model_bytes: bytes):
+    global _worker_model
+    _worker_model = pickle.loads(model_bytes)
+
+def missing_features(model, columns) -> list[str]:
+    """Colunas com que o modelo foi treinado e que faltam em `columns`."""
+    present = set(columns)
+    return [name for name in getattr(model, "feature_names_in_", []) if name not in present]
+
+def predict_chunk(model, chunk: pd.DataFrame):
+    """Previsões de um chunk, usando só as colunas com que o modelo foi treinado."""
+    features = getattr(model, "feature_names_in_", None)
+    X = chunk[list(features)] if features is not None else chunk
+    return model.predict(X)
+
+def _score_chunk(model, chunk: pd.DataFrame, as_csv: bool):
+    """Chunk com a coluna de previsão; para saída CSV já volta formatado (texto sem cabeçalho),
+    pois formatar o CSV custa mais do que a previsão e também é feito no pool."""
+    scored = chunk.assign(**{PREDICTION_COLUMN: predict_chunk(model, chunk)})
+    return scored.to_csv(header=False, index=False) if as_csv else scored
+
+def _score_in_worker(chunk: pd.DataFrame, as_csv: bool):
+    return _score_chunk(_worker_model, chunk, as_csv)
+
+class _PredictionWriter:
+    """Grava os chunks já pontuados em CSV ou Parquet (pela extensão), em um arquivo temporário."""
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.tmp_path = output_path + ".tmp"
+        self.parquet = output_path.lower().endswith(".parquet")
+        if self.parquet and pq is None:
+            raise ImportError("Saída em Parquet requer pyarrow: pip install pyarrow")
+        self._writer = None
+
+    def write(self, columns, scored):
+        """`scored` é o DataFrame pontuado (Parquet) ou seu texto CSV sem cabeçalho."""
+        if self.parquet:
+            table = pa.Table.from_pandas(scored, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            if self._writer is None:
+                self._writer = open(self.tmp_path, "w", encoding="utf-8", newline="")
+                self._writer.write(pd.DataFrame(columns=[*columns, PREDICTION_COLUMN]).to_csv(index=False))
+            self._writer.write(scored)
+
+    def close(self, commit: bool):
+        if self._writer is not None:
+            self._writer.close()
+        if commit and os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.output_path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def score_csv(model, input_csv, output_path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+              workers: int | None = None) -> dict:
+    """
+    Pontua um CSV em streaming e grava as previsões incrementalmente.
+
+    O CSV de entrada é lido em chunks (delimitador e encoding detectados por
+    `sniff_csv`); cada chunk é pontuado em um processo do pool, que carrega o
+    modelo uma única vez no initializer, e gravado na saída na ordem de leitura,
+    com as colunas originais mais `predicted_vote_average`. No máximo
+    `workers * 2` chunks ficam em memória. A saída só aparece em `output_path`
+    quando o arquivo está completo.
+
+    Args:
+        model: Caminho do .pickle do pipeline treinado ou o próprio pipeline.
+        input_csv: Caminho do CSV ou objeto de arquivo (ex.: upload do Streamlit).
+        output_path: Arquivo de saída; `.parquet` grava em Parquet, senão CSV.
+        chunksize: Linhas por chunk.
+        workers: Processos do pool (padrão: número de CPUs; 1 = no próprio processo).
+
+    Returns:
+        dict: Linhas pontuadas, segundos, linhas/s e pico de memória em MB.
+
+    Raises:
+        ValueError: Se o CSV não tem alguma coluna com que o modelo foi treinado
+            (conferido no primeiro chunk, antes de gravar qualquer coisa).
+    """
+    start = time.perf_counter()
+    if isinstance(model, (str, os.PathLike)):
+        with open(model, "rb") as f:
+            model_bytes = f.read()
+        model = pickle.loads(model_bytes)
+    else:
+        model_bytes = pickle.dumps(model)
+    workers = workers or os.cpu_count() or 1
+
+    sep, encoding = sniff_csv(input_csv)
+    if hasattr(input_csv, "seek"):
+        input_csv.seek(0)
+    chunks = pd.read_csv(input_csv, sep=sep, encoding=encoding, chunksize=chunksize)
+    first = next(chunks, None)
+    missing = missing_features(model, [] if first is None else first.columns)
+    if first is not None and missing:
+        raise ValueError(f"O arquivo de entrada não tem as colunas usadas pelo modelo: {', '.join(missing)}.")
+    if first is None or len(first) < chunksize:
+        workers = 1  # arquivo cabe em um chunk: o pool não compensa
+    chunks = itertools.chain([] if first is None else [first], chunks)
+
+    writer = _PredictionWriter(output_path)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_bytes,)) if workers > 1 else None
+    rows, committed = 0, False
+    try:
+        pending = []
+        while True:
+            chunk = next(chunks, None)
+            if chunk is not None and pool is None:
+                writer.write(chunk.columns, _score_chunk(model, chunk, not writer.parquet))
+                rows += len(chunk)
+                continue
+            if chunk is not None:
+                pending.append((chunk.columns, len(chunk), pool.submit(_score_in_worker, chunk, not writer.parquet)))
+            # Grava na ordem de leitura, limitando os chunks em memória.
+            while pending and (len(pending) >= workers * 2 or chunk is None):
+                columns, n_rows, future = pending.pop(0)
+                writer.write(columns, future.result())
+                rows += n_rows
+            if chunk is None:
+                break
+        committed = True
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.close(commit=committed)
+
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    stats = {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+    print(f"Pontuação em lote concluída: {stats} -> '{output_path}'.")
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pontua um CSV de filmes com o modelo de notas salvo.")
+    parser.add_argument("--model", default=os.path.join("model", "movie_rating_predictor.pickle"),
+                        help="Pipeline treinado (.pickle).")
+    parser.add_argument("--input", required=True, help="CSV de entrada.")
+    parser.add_argument("--output", required=True, help="Arquivo de saída (.csv ou .parquet).")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Linhas por chunk.")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do pool (padrão: número de CPUs).")
+    args = parser.parse_args(argv)
+    try:
+        score_csv(args.model, args.input, args.output, chunksize=args.chunksize, workers=args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == "__main__":
+    main()
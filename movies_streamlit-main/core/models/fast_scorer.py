@@ -0,0 +1,134 @@
+import numpy as np
+
+# Tolerância da checagem de equivalência com o pipeline do sklearn
+# (a dobra muda a ordem das operações de ponto flutuante).
+EQUIVALENCE_RTOL = 1e-9
+EQUIVALENCE_ATOL = 1e-9
+
+class LinearScorer:
+    """
+    Modelo linear "dobrado": previsão = X @ weights + intercept, sobre as features brutas.
+
+    Avalia arrays NumPy diretamente (linhas na ordem de `feature_names`), sem a
+    validação de Pipeline/ColumnTransformer nem DataFrames; só depende do NumPy.
+    """
+
+    def __init__(self, feature_names, weights, intercept: float):
+        self.feature_names = list(feature_names)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    def predict(self, X) -> np.ndarray:
+        """Previsões para uma matriz (n, n_features) ou uma única linha (n_features,)."""
+        X = np.asarray(X, dtype=np.float64)
+        return X @ self.weights + self.intercept
+
+    def predict_records(self, records) -> np.ndarray:
+        """Previsões para dicionários {feature: valor}."""
+        X = np.array([[record[name] for name in self.feature_names] for record in records], dtype=np.float64)
+        return self.predict(X)
+
+def _affine_columns(preprocessor, feature_names):
+    """
+    Lista (feature de entrada, média, escala) na ordem das colunas de saída do preprocessador.
+
+    Aceita um StandardScaler ou um ColumnTransformer cujos transformadores são
+    StandardScaler, 'passthrough' ou 'drop'. Qualquer outra coisa não é afim e
+    não pode ser dobrada.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler
+
+    def scaler_columns(scaler, names):
+        mean = scaler.mean_ if scaler.mean_ is not None and scaler.with_mean else np.zeros(len(names))
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(names))
+        return list(zip(names, mean, scale))
+
+    if preprocessor is None or preprocessor == "passthrough":
+        return [(name, 0.0, 1.0) for name in feature_names]
+    if isinstance(preprocessor, StandardScaler):
+        return scaler_columns(preprocessor, feature_names)
+    if not isinstance(preprocessor, ColumnTransformer):
+        raise ValueError(f"Preprocessador não suportado para o scorer rápido: {type(preprocessor).__name__}")
+
+    columns = []
+    for name, transformer, selected in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        names = [feature_names[c] if isinstance(c, (int, np.integer)) else c for c in np.atleast_1d(selected)]
+        if len(names) == 0:
+            continue
+        if transformer == "passthrough":
+            columns.extend((n, 0.0, 1.0) for n in names)
+        elif isinstance(transformer, StandardScaler):
+            columns.extend(scaler_columns(transformer, names))
+        else:
+            raise ValueError(f"Transformador '{name}' não suportado para o scorer rápido: {type(transformer).__name__}")
+    return columns
+
+def export_linear_scorer(pipeline) -> LinearScorer:
+    """
+    Dobra a padronização e os coeficientes do pipeline treinado em um LinearScorer.
+
+    Com z = (x - média) / escala e y = coef · z + b, fica
+    y = (coef / escala) · x + (b - Σ coef · média / escala).
+
+    Args:
+        pipeline: Pipeline de `train_regressor` (preprocessor + regressor linear) ou
+            um regressor linear sozinho.
+
+    Returns:
+        LinearScorer: Pesos e intercepto sobre as features brutas.
+
+    Raises:
+        ValueError: Se o modelo não for dobrável ou foi marcado por `disable_fast_scorer`.
+    """
+    disabled = getattr(pipeline, "fast_scorer_disabled", None)
+    if disabled:
+        raise ValueError(f"Scorer rápido desativado no treino: {disabled}")
+
+    steps = getattr(pipeline, "named_steps", None)
+    regressor = steps["regressor"] if steps is not None else pipeline
+    preprocessor = steps.get("preprocessor") if steps is not None else None
+    if not hasattr(regressor, "coef_"):
+        raise ValueError(f"Regressor sem coeficientes lineares: {type(regressor).__name__}")
+
+    feature_names = list(pipeline.feature_names_in_)
+    coef = np.ravel(regressor.coef_)
+    columns = _affine_columns(preprocessor, feature_names)
+    if len(columns) != len(coef):
+        raise ValueError(f"{len(columns)} colunas após o preprocessador, mas {len(coef)} coeficientes.")
+
+    index = {name: i for i, name in enumerate(feature_names)}
+    weights = np.zeros(len(feature_names))
+    intercept = float(np.ravel(regressor.intercept_)[0])
+    for c, (name, mean, scale) in zip(coef, columns):
+        weights[index[name]] += c / scale
+        intercept -= c * mean / scale
+    return LinearScorer(feature_names, weights, intercept)
+
+def disable_fast_scorer(pipeline, reason: str):
+    """
+    Marca o pipeline para nunca ser dobrado (o motivo vai junto no pickle).
+
+    Quem carrega o modelo (ex.: core/models/service.py) recebe ValueError de
+    `export_linear_scorer` e avalia pelo próprio pipeline.
+    """
+    pipeline.fast_scorer_disabled = reason
+
+def verify_equivalence(pipeline, scorer: LinearScorer, X) -> float:
+    """
+    Confere que o scorer reproduz o pipeline em `X` (DataFrame com as features).
+
+    Returns:
+        float: Maior diferença absoluta encontrada.
+
+    Raises:
+        AssertionError: Se alguma previsão sair da tolerância.
+    """
+    expected = pipeline.predict(X)
+    actual = scorer.predict(X[scorer.feature_names].to_numpy(dtype=np.float64))
+    max_diff = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if not np.allclose(actual, expected, rtol=EQUIVALENCE_RTOL, atol=EQUIVALENCE_ATOL):
+        raise AssertionError(f"Scorer rápido diverge do pipeline (diferença máxima {max_diff:.3e}).")
+    return max_diff
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from core.database import iter_sot_training_chunks
+from core.etl import FEATURES, TARGET
+
+DEFAULT_CHUNKSIZE = 50_000
+# Quantos filmes de teste são guardados para conferir o modelo exportado (scorer rápido).
+TEST_SAMPLE_ROWS = 1_000
+
+def is_test_row(ids, test_size: float) -> np.ndarray:
+    """
+    Separação treino/teste determinística pelo id do filme.
+
+    Um hash multiplicativo do id decide o lado: o mesmo filme cai sempre no
+    mesmo conjunto, em qualquer chunk e em qualquer passada.
+    """
+    buckets = (np.asarray(ids, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2**32) % np.uint64(10_000)
+    return buckets < int(test_size * 10_000)
+
+class StreamingRegressionMetrics:
+    """R2 e MSE acumulados chunk a chunk (somas de y, y² e do erro quadrático)."""
+
+    def __init__(self):
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+        self.sse = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        self.n += len(y_true)
+        self.sum_y += y_true.sum()
+        self.sum_y2 += np.square(y_true).sum()
+        self.sse += np.square(y_true - y_pred).sum()
+
+    def result(self) -> dict:
+        if self.n == 0:
+            return {"R-squared (R2)": float("nan"), "Mean Squared Error (MSE)": float("nan")}
+        sst = self.sum_y2 - self.sum_y ** 2 / self.n
+        return {
+            "R-squared (R2)": float(1 - self.sse / sst) if sst > 0 else float("nan"),
+            "Mean Squared Error (MSE)": float(self.sse / self.n),
+        }
+
+def train_regressor_incremental(conn, test_size: float = 0.2, epochs: int = 5,
+                                chunksize: int = DEFAULT_CHUNKSIZE, random_state: int = 42, progress=None):
+    """
+    Treina o regressor sobre a SOT inteira com memória constante (partial_fit).
+
+    1ª passada: `StandardScaler.partial_fit` nos chunks de treino.
+    Passadas seguintes (`epochs`): `SGDRegressor.partial_fit` em cada chunk de
+    treino já padronizado (linhas embaralhadas dentro do chunk).
+    Última passada: previsões nos chunks de teste, com métricas acumuladas.
+
+    A separação treino/teste é feita pelo id do filme (`is_test_row`), então
+    não depende da ordem em que o banco devolve as linhas.
+
+    Args:
+        conn: Conexão SQLite com a tabela `sot_movies` populada.
+        test_size: Fração dos filmes usada como teste.
+        epochs: Passadas do SGD sobre os dados de treino.
+        chunksize: Linhas lidas do banco por vez.
+        random_state: Semente do SGD e do embaralhamento.
+        progress: Opcional, chamado como progress(etapa, fração) a cada passada
+            (ex.: Job.report de core/jobs.py, que pode cancelar o treino).
+
+    Returns:
+        tuple: (pipeline treinado, métricas no teste, amostra de X de teste).
+    """
+    start = time.perf_counter()
+    progress = progress or (lambda stage, fraction=None: None)
+    total_passes = epochs + 2
+    scaler = StandardScaler()
+    regressor = SGDRegressor(random_state=random_state)
+    rng = np.random.default_rng(random_state)
+
+    def chunks(test):
+        for chunk in iter_sot_training_chunks(conn, chunksize):
+            chunk = chunk[is_test_row(chunk["id"], test_size) == test]
+            if not chunk.empty:
+                yield chunk[FEATURES], chunk[TARGET].to_numpy()
+
+    progress("Treino incremental: padronização", 0.0)
+    train_rows = 0
+    for X, _ in chunks(test=False):
+        scaler.partial_fit(X)
+        train_rows += len(X)
+    if train_rows == 0:
+        raise ValueError("A tabela de treino está vazia. Verifique a etapa de transformação.")
+
+    for epoch in range(epochs):
+        progress(f"Treino incremental: época {epoch + 1}/{epochs}", (epoch + 1) / total_passes)
+        for X, y in chunks(test=False):
+            order = rng.permutation(len(X))
+            regressor.partial_fit(scaler.transform(X.iloc[order]), y[order])
+        print(f"Treino incremental: época {epoch + 1}/{epochs} concluída.")
+
+    model_pipeline = Pipeline(steps=[
+        ('preprocessor', scaler),
+        ('regressor', regressor)
+    ])
+
+    progress("Treino incremental: avaliação", (epochs + 1) / total_passes)
+    metrics = StreamingRegressionMetrics()
+    samples, sampled = [], 0
+    for X, y in chunks(test=True):
+        metrics.update(y, model_pipeline.predict(X))
+        if sampled < TEST_SAMPLE_ROWS:
+            samples.append(X.iloc[:TEST_SAMPLE_ROWS - sampled])
+            sampled += len(samples[-1])
+
+    result = metrics.result()
+    print(f"Treino incremental concluído em {time.perf_counter() - start:.2f}s "
+          f"({train_rows} linhas de treino, {metrics.n} de teste): {result}")
+    X_sample = pd.concat(samples, ignore_index=True) if samples else pd.DataFrame(columns=FEATURES)
+    return model_pipeline, result, X_sample
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import namedtuple
+
+# Uma versão carregada do modelo. Cada execução do app pega um snapshot
+# (versão + modelo) e usa sempre o mesmo, mesmo que um retreino troque
+# a versão atual enquanto as previsões ainda estão sendo feitas.
+ModelVersion = namedtuple("ModelVersion", ["version", "model"])
+
+class ModelRegistry:
+    """
+    Mantém no processo uma única instância carregada do modelo salvo em `model_path`.
+
+    Uma thread em segundo plano verifica o arquivo a cada `poll_interval` segundos
+    (mtime/tamanho e, se mudarem, o hash SHA-256). Quando a versão muda, o novo
+    modelo é carregado fora do lock e trocado atomicamente.
+    """
+
+    def __init__(self, model_path: str, poll_interval: float = 5.0):
+        self.model_path = model_path
+        self.poll_interval = poll_interval
+        self._current = None
+        self._stat = None
+        self._digest = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def fingerprint(self) -> str | None:
+        """Hash do arquivo do modelo; só relê o arquivo quando mtime/tamanho mudam."""
+        try:
+            stat = os.stat(self.model_path)
+        except FileNotFoundError:
+            self._stat, self._digest = None, None
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self._stat:
+            digest = hashlib.sha256()
+            with open(self.model_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self._stat, self._digest = key, digest.hexdigest()
+        return self._digest
+
+    def current(self) -> ModelVersion | None:
+        """Snapshot da versão atual ou None se não houver modelo salvo."""
+        with self._lock:
+            return self._current
+
+    def refresh(self) -> ModelVersion | None:
+        """Recarrega o modelo se o arquivo mudou. Retorna o snapshot atual."""
+        with self._reload_lock:
+            version = self.fingerprint()
+            current = self.current()
+            if current is not None and current.version == version:
+                return current
+
+            new = None
+            if version is not None:
+                try:
+                    with open(self.model_path, "rb") as f:
+                        new = ModelVersion(version, pickle.load(f))
+                    print(f"Registro: modelo versão {version[:12]} ativo.")
+                except Exception as e:
+                    print(f"Ocorreu um erro ao carregar o modelo: {e}")
+                    return current
+
+            with self._lock:
+                self._current = new
+            return new
+
+    def start(self) -> "ModelRegistry":
+        """Carrega a versão atual e inicia a thread que observa o arquivo."""
+        self.refresh()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
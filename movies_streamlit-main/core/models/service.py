@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+if __package__ in (None, ""):
+    # Execução direta (python core/models/service.py): põe a raiz do projeto no caminho.
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from core.features.preprocess import HASHED_COLUMNS
+from core.models.fast_scorer import export_linear_scorer
+from core.models.registry import ModelRegistry
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+class MicroBatcher:
+    """
+    Junta requisições de uma linha, vindas de threads diferentes, em lotes para o modelo.
+
+    Uma thread única consome a fila: pega a primeira requisição, espera até
+    `max_wait_ms` por outras (ou até completar `max_batch`) e faz um único
+    `predict` com o lote. O lote inteiro usa o mesmo snapshot do registro, e cada
+    requisição recebe a sua previsão junto com a versão do modelo. Se o pipeline
+    for linear, o lote é avaliado pelo LinearScorer dobrado, direto em NumPy.
+    """
+
+    def __init__(self, registry: ModelRegistry, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._scorer = (None, None)  # (versão, LinearScorer ou None se o modelo não for dobrável)
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features: dict) -> Future:
+        """Enfileira uma linha; o Future resolve em {"prediction", "model_version"}.
+
+        Linhas sem alguma feature (ou com valor não numérico) são recusadas aqui,
+        com ValueError, para não derrubarem o lote das outras requisições. As
+        colunas JSON de HASHED_COLUMNS aceitam a string do CSV ou a lista já
+        decodificada.
+        """
+        snapshot = self.registry.current()
+        for name in getattr(snapshot.model, "feature_names_in_", []) if snapshot else []:
+            value = features.get(name)
+            if name in HASHED_COLUMNS:
+                if not isinstance(value, (str, list)):
+                    raise ValueError(f"feature '{name}' ausente ou não é uma lista JSON")
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"feature '{name}' ausente ou não numérica")
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def predict(self, features: dict, timeout: float | None = None) -> dict:
+        return self.submit(features).result(timeout)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _scorer_for(self, snapshot):
+        """Scorer rápido (core/models/fast_scorer.py) da versão, exportado uma vez por versão."""
+        version, scorer = self._scorer
+        if version != snapshot.version:
+            try:
+                scorer = export_linear_scorer(snapshot.model)
+            except (ValueError, AttributeError, KeyError):
+                scorer = None  # modelo não linear: usa o pipeline
+            self._scorer = (snapshot.version, scorer)
+        return scorer
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            snapshot = self.registry.current()
+            if snapshot is None:
+                for _, future in batch:
+                    future.set_exception(LookupError("Nenhum modelo treinado disponível."))
+                continue
+
+            model = snapshot.model
+            scorer = self._scorer_for(snapshot)
+            try:
+                if scorer is not None:
+                    predictions = scorer.predict_records([row for row, _ in batch])
+                else:
+                    X = pd.DataFrame([row for row, _ in batch], columns=getattr(model, "feature_names_in_", None))
+                    predictions = model.predict(X)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result({"prediction": float(prediction), "model_version": snapshot.version})
+
+def make_handler(batcher: MicroBatcher):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._send_json(404, {"error": "rota não encontrada"})
+                return
+            snapshot = batcher.registry.current()
+            self._send_json(200, {"status": "ok", "model_version": snapshot.version if snapshot else None})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "rota não encontrada"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                features = json.loads(self.rfile.read(length))
+                if not isinstance(features, dict):
+                    raise ValueError("o corpo deve ser um objeto JSON com as features do filme")
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+
+            try:
+                self._send_json(200, batcher.predict(features))
+            except LookupError as e:
+                self._send_json(503, {"error": str(e)})
+            except Exception as e:
+                self._send_json(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass  # sem uma linha de log por requisição
+
+    return PredictionHandler
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Fila de conexões maior que o padrão (5): sob rajadas, conexões recusadas
+    # voltam só depois do timeout de retransmissão do TCP (~1 s) e dominam o p99.
+    request_queue_size = 128
+
+def make_server(model_path: str, host: str = "127.0.0.1", port: int = 8000,
+                max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS) -> PredictionServer:
+    """
+    Cria o servidor HTTP de previsões (ainda sem atender; chame `serve_forever`).
+
+    O modelo é carregado uma vez pelo ModelRegistry, que também publica os
+    retreinos salvos em `model_path` sem reiniciar o serviço.
+
+    Rotas:
+        POST /predict  corpo {"budget": ..., "revenue": ..., "popularity": ..., "runtime": ...}
+                       -> {"prediction": 6.4, "model_version": "<sha256 do .pickle>"}
+        GET  /health   -> {"status": "ok", "model_version": ...}
+    """
+    registry = ModelRegistry(model_path).start()
+    batcher = MicroBatcher(registry, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    server = PredictionServer((host, port), make_handler(batcher))
+    server.batcher = batcher
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de previsão de notas de filmes.")
+    parser.add_argument("--model", default=os.path.join("model", "movie_rating_predictor.pickle"),
+                        help="Pipeline treinado (.pickle).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Linhas por lote do modelo.")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Espera máxima para completar um lote, em milissegundos.")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.model, args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"Serviço de previsão em http://{args.host}:{args.port} (lotes de até {args.max_batch}, "
+          f"espera máxima {args.max_wait_ms} ms).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,202 @@
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.linear_model import Lasso, LinearRegression, Ridge
 from sklearn.pipeline import Pipeline
 
 def train_regressor(X, y, preprocessor, test_size=0.2):
     """Treina um modelo de regressão e retorna o modelo e os dados de teste."""
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
-    
+
     # Cria o pipeline final que inclui o pré-processamento e o modelo
     model_pipeline = Pipeline(steps=[
         ('preprocessor', preprocessor),
         ('regressor', LinearRegression())
     ])
-    
+
     print("Treinando o modelo de Regressão Linear...")
     model_pipeline.fit(X_train, y_train)
-    
-    return model_pipeline, X_test, y_test
\ No newline at end of file
+
+    return model_pipeline, X_test, y_test
+
+def default_model_zoo(sparse_input: bool = False):
+    """Candidatos padrão da busca com validação cruzada (nome -> estimador não treinado).
+
+    Com `sparse_input` (features com hashing), o HistGradientBoosting fica de
+    fora: ele não aceita matriz esparsa, e densificar milhares de buckets não compensa.
+    """
+    zoo = {
+        "LinearRegression": LinearRegression(),
+        "Ridge": Ridge(alpha=1.0),
+        "Lasso": Lasso(alpha=0.01),
+    }
+    if not sparse_input:
+        zoo["HistGradientBoosting"] = HistGradientBoostingRegressor(random_state=42)
+    return zoo
+
+def _fit_and_score(name, estimator, fold, Xt_train, y_train, Xt_val, y_val):
+    """Treina um candidato em um fold já pré-processado. Roda nos processos do pool."""
+    start = time.perf_counter()
+    model = clone(estimator).fit(Xt_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    predictions = model.predict(Xt_val)
+    return {
+        "candidate": name,
+        "fold": fold,
+        "r2": r2_score(y_val, predictions),
+        "mse": mean_squared_error(y_val, predictions),
+        "fit_seconds": fit_seconds,
+        "score_seconds": time.perf_counter() - start,
+    }
+
+def _results_table(candidates, fold_results, n_splits, failures):
+    rows = []
+    for name in candidates:
+        folds = [r for r in fold_results if r["candidate"] == name]
+        if name in failures:
+            status = f"erro: {failures[name]}"
+        else:
+            status = "ok" if len(folds) == n_splits else "tempo esgotado"
+        rows.append({
+            "candidate": name,
+            "status": status,
+            "folds": len(folds),
+            "cv_r2_mean": np.mean([r["r2"] for r in folds]) if folds else np.nan,
+            "cv_r2_std": np.std([r["r2"] for r in folds]) if folds else np.nan,
+            "cv_mse_mean": np.mean([r["mse"] for r in folds]) if folds else np.nan,
+            "fit_seconds": sum(r["fit_seconds"] for r in folds),
+            "score_seconds": sum(r["score_seconds"] for r in folds),
+        })
+    table = pd.DataFrame(rows)
+    table["_complete"] = table["status"] == "ok"
+    table = table.sort_values(["_complete", "cv_r2_mean"], ascending=False).drop(columns="_complete")
+    return table.reset_index(drop=True)
+
+def search_regressor(X, y, preprocessor, test_size=0.2, candidates=None, n_splits=5,
+                     time_budget_s=60.0, n_jobs=None, progress=None):
+    """
+    Busca o melhor regressor por validação cruzada k-fold, em paralelo e com limite de tempo.
+
+    O conjunto de treino (o mesmo split de `train_regressor`) é dividido em
+    `n_splits` folds. O pré-processador é ajustado uma única vez por fold, e as
+    matrizes transformadas são reaproveitadas por todos os candidatos. Cada par
+    (candidato, fold) é uma tarefa do pool de processos. Ao estourar
+    `time_budget_s`, as tarefas pendentes são canceladas e só os candidatos com
+    todos os folds avaliados entram no ranking. O melhor (maior R2 médio) é
+    treinado de novo no conjunto de treino inteiro.
+
+    Args:
+        X, y: Features e alvo.
+        preprocessor: Pré-processador não treinado (ex.: make_preprocess_pipeline).
+        test_size: Fração separada para o teste final (avaliado fora da busca).
+        candidates: Dicionário nome -> estimador (padrão: default_model_zoo(), sem os
+            candidatos que não aceitam a saída esparsa do pré-processador).
+        n_splits: Número de folds.
+        time_budget_s: Tempo máximo da busca, em segundos.
+        n_jobs: Processos do pool (padrão: número de CPUs; 1 = no próprio processo).
+        progress: Opcional, chamado como progress(etapa, fração) a cada fold avaliado
+            (ex.: Job.report de core/jobs.py; uma exceção ali interrompe a busca).
+
+    Returns:
+        tuple: (pipeline do melhor candidato, X_test, y_test, tabela por candidato).
+    """
+    progress = progress or (lambda stage, fraction=None: None)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    deadline = time.monotonic() + time_budget_s
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+    # Pré-processamento ajustado uma vez por fold (cache compartilhado pelos candidatos).
+    folds = []
+    for train_idx, val_idx in KFold(n_splits=n_splits, shuffle=True, random_state=42).split(X_train):
+        fold_pre = clone(preprocessor).fit(X_train.iloc[train_idx])
+        folds.append((
+            fold_pre.transform(X_train.iloc[train_idx]), y_train.iloc[train_idx].to_numpy(),
+            fold_pre.transform(X_train.iloc[val_idx]), y_train.iloc[val_idx].to_numpy(),
+        ))
+    candidates = candidates or default_model_zoo(sparse_input=sparse.issparse(folds[0][0]))
+
+    # Tarefas em ordem de candidato: com o tempo curto, os primeiros terminam completos.
+    tasks = [(name, estimator, i, *fold) for name, estimator in candidates.items() for i, fold in enumerate(folds)]
+    fold_results, failures = [], {}
+
+    finished_tasks = 0
+
+    def task_done(name):
+        nonlocal finished_tasks
+        finished_tasks += 1
+        progress(f"Busca de modelos: {name} ({finished_tasks}/{len(tasks)} tarefas)", finished_tasks / len(tasks))
+
+    print(f"Busca de modelos: {len(candidates)} candidatos x {n_splits} folds, limite de {time_budget_s:g}s.")
+
+    if n_jobs == 1:
+        for task in tasks:
+            if time.monotonic() >= deadline:
+                break
+            if task[0] in failures:
+                continue
+            try:
+                fold_results.append(_fit_and_score(*task))
+            except Exception as e:
+                failures[task[0]] = str(e)
+            task_done(task[0])
+    else:
+        # multiprocessing.Pool (e não ProcessPoolExecutor): terminate() encerra
+        # também os processos com um fit em andamento.
+        pool = multiprocessing.Pool(processes=n_jobs)
+        finished = queue.SimpleQueue()  # (candidato, resultado, erro), preenchida pelos callbacks
+        pending = len(tasks)
+        try:
+            for task in tasks:
+                pool.apply_async(
+                    _fit_and_score, task,
+                    callback=lambda result, name=task[0]: finished.put((name, result, None)),
+                    error_callback=lambda error, name=task[0]: finished.put((name, None, error)),
+                )
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    name, result, error = finished.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending -= 1
+                if error is None:
+                    fold_results.append(result)
+                else:
+                    failures[name] = str(error)
+                task_done(name)
+        finally:
+            if pending:
+                # Tempo esgotado ou busca cancelada (exceção em `progress`).
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+    results = _results_table(candidates, fold_results, n_splits, failures)
+    complete = results[results["status"] == "ok"]
+    if complete.empty:
+        raise TimeoutError(
+            f"Nenhum candidato completou os {n_splits} folds em {time_budget_s:g}s; aumente o limite de tempo."
+        )
+
+    best_name = complete.iloc[0]["candidate"]
+    print(f"Melhor candidato: {best_name} (R2 médio {complete.iloc[0]['cv_r2_mean']:.4f}). Treinando no conjunto completo...")
+    model_pipeline = Pipeline(steps=[
+        ('preprocessor', clone(preprocessor)),
+        ('regressor', clone(candidates[best_name]))
+    ])
+    model_pipeline.fit(X_train, y_train)
+
+    return model_pipeline, X_test, y_test, results
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlite3 import Connection
+
+from core.database import execute_sql_from_file
+
+# Linhas (filmes) enviadas por tarefa ao pool de processos.
+DEFAULT_CHUNKSIZE = 2_000
+# Abaixo deste número de filmes o custo de subir o pool não compensa: parse no próprio processo.
+PARALLEL_MIN_ROWS = 20_000
+
+def _items(blob):
+    """Decodifica uma célula JSON de lista; células vazias ou inválidas viram lista vazia."""
+    if not blob:
+        return []
+    try:
+        items = json.loads(blob)
+    except (TypeError, ValueError):
+        return []
+    return [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+
+def _genre_rows(movie_id, blob):
+    return [(movie_id, item.get("id"), item["name"]) for item in _items(blob) if item.get("name")]
+
+def _cast_rows(movie_id, blob):
+    return [
+        (movie_id, item.get("order"), item.get("id"), item["name"], item.get("character"))
+        for item in _items(blob) if item.get("name")
+    ]
+
+def _crew_rows(movie_id, blob):
+    return [
+        (movie_id, item.get("id"), item["name"], item.get("job"), item.get("department"))
+        for item in _items(blob) if item.get("name")
+    ]
+
+# tabela filha -> (função que gera as linhas, número de colunas)
+_PARSERS = {
+    "movie_genre": (_genre_rows, 3),
+    "movie_keyword": (_genre_rows, 3),
+    "movie_cast": (_cast_rows, 5),
+    "movie_crew": (_crew_rows, 5),
+}
+
+def parse_json_chunk(table: str, records: list) -> list:
+    """Converte [(movie_id, json), ...] nas linhas da tabela filha. Roda nos processos do pool."""
+    parse, _ = _PARSERS[table]
+    rows = []
+    for movie_id, blob in records:
+        if movie_id is not None:
+            rows.extend(parse(int(movie_id), blob))
+    return rows
+
+def _sources(movies_table, credits_table, credits_id):
+    # tabela filha -> (tabela de origem, coluna id, coluna JSON)
+    return {
+        "movie_genre": (movies_table, "id", "genres"),
+        "movie_keyword": (movies_table, "id", "keywords"),
+        "movie_cast": (credits_table, credits_id, '"cast"'),
+        "movie_crew": (credits_table, credits_id, "crew"),
+    }
+
+def normalize_json_columns(conn: Connection, sql_folder: str, movies_table: str = "sot_movies",
+                           credits_table: str = "sot_credits", credits_id: str = "movie_id",
+                           workers: int | None = None, chunksize: int = DEFAULT_CHUNKSIZE) -> dict:
+    """
+    Normaliza as colunas JSON (genres, keywords, cast, crew) nas tabelas filhas
+    movie_genre, movie_keyword, movie_cast e movie_crew.
+
+    A leitura é feita em chunks pelo cursor; cada chunk é decodificado em um
+    processo do pool (json.loads é CPU-bound e não escala com threads) e as
+    linhas resultantes são gravadas com executemany pelo processo principal,
+    em uma transação por tabela. No máximo `workers * 2` chunks ficam em voo.
+
+    Returns:
+        dict: Linhas gravadas por tabela e o tempo total.
+    """
+    start = time.perf_counter()
+    execute_sql_from_file(conn, os.path.join(sql_folder, "sot_children.sql"))
+    workers = workers or os.cpu_count() or 1
+    counts = {}
+
+    total_rows = conn.execute(f"SELECT COUNT(*) FROM {movies_table}").fetchone()[0]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and total_rows >= PARALLEL_MIN_ROWS else None
+    try:
+        for table, (source, id_column, json_column) in _sources(movies_table, credits_table, credits_id).items():
+            _, n_columns = _PARSERS[table]
+            insert_sql = f"INSERT INTO {table} VALUES ({', '.join('?' for _ in range(n_columns))})"
+            cursor = conn.execute(f"SELECT {id_column}, {json_column} FROM {source}")
+            counts[table] = 0
+
+            with conn:  # uma transação por tabela filha
+                pending = []
+                while True:
+                    records = cursor.fetchmany(chunksize)
+                    if records and pool is None:
+                        rows = parse_json_chunk(table, records)
+                        conn.executemany(insert_sql, rows)
+                        counts[table] += len(rows)
+                        continue
+                    if records:
+                        pending.append(pool.submit(parse_json_chunk, table, records))
+                    # Escreve na ordem de leitura, limitando os chunks em memória.
+                    while pending and (len(pending) >= workers * 2 or not records):
+                        rows = pending.pop(0).result()
+                        conn.executemany(insert_sql, rows)
+                        counts[table] += len(rows)
+                    if not records:
+                        break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    counts["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Normalização das colunas JSON concluída: {counts}")
+    return counts
@@ -0,0 +1,6 @@
+-- Índices criados ao final da carga, depois que os dados já estão nas tabelas.
+
+-- Índice de cobertura para a consulta de treino (load_sot_data_for_training):
+-- o filtro e as colunas lidas são resolvidos sem tocar na tabela.
+CREATE INDEX IF NOT EXISTS idx_sot_movies_training
+    ON sot_movies (budget, revenue, runtime, vote_average, popularity);
@@ -0,0 +1,35 @@
+-- Tabelas filhas da SOT com as colunas JSON normalizadas (uma linha por item).
+-- Recriadas a cada normalização.
+
+DROP TABLE IF EXISTS movie_genre;
+CREATE TABLE movie_genre (
+    movie_id INTEGER NOT NULL,
+    genre_id INTEGER,
+    name TEXT NOT NULL
+);
+
+DROP TABLE IF EXISTS movie_keyword;
+CREATE TABLE movie_keyword (
+    movie_id INTEGER NOT NULL,
+    keyword_id INTEGER,
+    name TEXT NOT NULL
+);
+
+-- Elenco na ordem de créditos (cast_order) e com o personagem.
+DROP TABLE IF EXISTS movie_cast;
+CREATE TABLE movie_cast (
+    movie_id INTEGER NOT NULL,
+    cast_order INTEGER,
+    person_id INTEGER,
+    name TEXT NOT NULL,
+    character TEXT
+);
+
+DROP TABLE IF EXISTS movie_crew;
+CREATE TABLE movie_crew (
+    movie_id INTEGER NOT NULL,
+    person_id INTEGER,
+    name TEXT NOT NULL,
+    job TEXT,
+    department TEXT
+);
@@ -9,7 +9,7 @@ INSERT INTO sot_credits (
 SELECT
     CAST(movie_id AS INTEGER),
     title,
-    CAST("cast" AS JSON),
-    CAST(crew AS JSON)
+    "cast",
+    crew
 FROM
     sor_tmdb_credits;
\ No newline at end of file
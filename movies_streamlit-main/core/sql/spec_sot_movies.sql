@@ -1,5 +1,7 @@
 -- Script de transformação (SPEC) para popular a sot_movies a partir da sor_tmdb_movies.
 -- Realiza a limpeza e a conversão de tipos (casting).
+-- Colunas JSON são copiadas como texto: CAST(... AS JSON) no SQLite aplica
+-- afinidade NUMERIC e transformaria o JSON em 0.
 
 INSERT INTO sot_movies (
     id,
@@ -29,8 +31,8 @@ SELECT
     original_title,
     CAST(budget AS BIGINT),
     CAST(revenue AS BIGINT),
-    CAST(genres AS JSON),
-    CAST(keywords AS JSON),
+    genres,
+    keywords,
     overview,
     CAST(popularity AS REAL),
     -- Trata datas vazias para evitar erros
@@ -43,8 +45,8 @@ SELECT
     CAST(vote_count AS INTEGER),
     homepage,
     original_language,
-    CAST(production_companies AS JSON),
-    CAST(production_countries AS JSON),
-    CAST(spoken_languages AS JSON)
+    production_companies,
+    production_countries,
+    spoken_languages
 FROM
     sor_tmdb_movies;
\ No newline at end of file
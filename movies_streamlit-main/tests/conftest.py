@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os testes importam `core` a partir da raiz do projeto (como o app/main_app.py).
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
@@ -0,0 +1,68 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from core.data import io as csv_io
+from core.data.io import named_buffer, read_csv_smart
+from core.etl import load_training_frame
+
+MOVIES_CSV = (
+    "id,budget,revenue,popularity,runtime,vote_average,title\n"
+    "1,2000000,9000000,10.5,120,7.1,A\n"
+    "2,3000000,8000000,4.2,95,6.3,B\n"
+)
+CREDITS_CSV = "movie_id,title,cast,crew\n1,A,[],[]\n2,B,[],[]\n"
+
+@pytest.fixture
+def read_calls(monkeypatch):
+    """Opções de cada pd.read_csv feito por core.data.io (exceto a leitura só do cabeçalho)."""
+    calls = []
+    real_read_csv = pd.read_csv
+
+    def spy(*args, **kwargs):
+        if kwargs.get("nrows") != 0:
+            calls.append(kwargs)
+        return real_read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(csv_io.pd, "read_csv", spy)
+    monkeypatch.setattr(csv_io, "_schemas", {})
+    return calls
+
+def test_named_upload_saves_and_reuses_schema(tmp_path, read_calls):
+    schema_dir = str(tmp_path / "schemas")
+
+    first = read_csv_smart(named_buffer(MOVIES_CSV.encode(), "tmdb_5000_movies.csv"), schema_dir=schema_dir)
+    assert os.listdir(schema_dir) == ["tmdb_5000_movies.csv.json"]
+    assert "dtype" not in read_calls[-1]
+
+    csv_io._schemas.clear()  # outro processo: só o JSON em disco
+    changed = MOVIES_CSV.replace("7.1", "8.0").encode()
+    second = read_csv_smart(named_buffer(changed, "tmdb_5000_movies.csv"), schema_dir=schema_dir)
+    assert read_calls[-1]["dtype"] == {c: str(t) for c, t in first.dtypes.items()}
+    assert second["vote_average"].tolist() == [8.0, 6.3]
+
+def test_unnamed_buffer_does_not_save_schema(tmp_path, read_calls):
+    read_csv_smart(io.BytesIO(MOVIES_CSV.encode()), schema_dir=str(tmp_path / "schemas"))
+    assert not (tmp_path / "schemas").exists()
+
+def test_training_frame_from_uploads_reuses_schema(tmp_path, read_calls):
+    cache_dir = str(tmp_path / "cache")
+
+    def load(movies_csv):
+        return load_training_frame(
+            named_buffer(movies_csv.encode(), "tmdb_5000_movies.csv"),
+            named_buffer(CREDITS_CSV.encode(), "tmdb_5000_credits.csv"),
+            cache_dir=cache_dir,
+        )
+
+    load(MOVIES_CSV)
+    assert sorted(os.listdir(os.path.join(cache_dir, "schemas"))) == [
+        "tmdb_5000_credits.csv.json", "tmdb_5000_movies.csv.json",
+    ]
+    # Novo upload (outro conteúdo, cache colunar não serve): o parse usa o esquema salvo.
+    read_calls.clear()
+    df = load(MOVIES_CSV.replace("7.1", "8.0"))
+    assert len(read_calls) == 1 and "dtype" in read_calls[0]
+    assert df["vote_average"].tolist() == [8.0, 6.3]
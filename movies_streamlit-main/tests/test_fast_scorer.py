@@ -0,0 +1,63 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.etl import FEATURES
+from core.features.preprocess import make_preprocess_pipeline
+from core.models.fast_scorer import disable_fast_scorer, export_linear_scorer, verify_equivalence
+from core.models.train import train_regressor
+
+def _movies_frame(n_rows: int = 200, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "budget": rng.uniform(1e5, 2e8, n_rows),
+        "revenue": rng.uniform(1e5, 1e9, n_rows),
+        "popularity": rng.gamma(2.0, 10.0, n_rows),
+        "runtime": rng.uniform(70, 180, n_rows),
+    })
+    df["vote_average"] = 5 + 1e-9 * df["revenue"] + 0.01 * df["runtime"] + rng.normal(0, 0.3, n_rows)
+    return df
+
+@pytest.fixture
+def trained_pipeline():
+    df = _movies_frame()
+    X, y = df[FEATURES], df["vote_average"]
+    model, X_test, _ = train_regressor(X, y, make_preprocess_pipeline(X))
+    return model, X_test
+
+def test_folded_scorer_matches_pipeline(trained_pipeline):
+    model, X_test = trained_pipeline
+    scorer = export_linear_scorer(model)
+
+    assert verify_equivalence(model, scorer, X_test) < 1e-9
+    records = X_test.to_dict(orient="records")
+    np.testing.assert_allclose(scorer.predict_records(records), model.predict(X_test), rtol=1e-9, atol=1e-9)
+
+def test_verify_equivalence_rejects_a_wrong_scorer(trained_pipeline):
+    model, X_test = trained_pipeline
+    scorer = export_linear_scorer(model)
+    scorer.weights[0] *= 1.01
+
+    with pytest.raises(AssertionError):
+        verify_equivalence(model, scorer, X_test)
+
+def test_hashed_columns_are_not_folded():
+    df = _movies_frame()
+    df["genres"] = json.dumps([{"id": 18, "name": "Drama"}])
+    X, y = df[[*FEATURES, "genres"]], df["vote_average"]
+    model, _, _ = train_regressor(X, y, make_preprocess_pipeline(X))
+
+    with pytest.raises(ValueError):
+        export_linear_scorer(model)
+
+def test_disabled_pipeline_is_not_folded_after_reload(trained_pipeline):
+    model, X_test = trained_pipeline
+    disable_fast_scorer(model, "diferença máxima 1e-3")
+    reloaded = pickle.loads(pickle.dumps(model))
+
+    with pytest.raises(ValueError, match="desativado"):
+        export_linear_scorer(reloaded)
+    np.testing.assert_allclose(reloaded.predict(X_test), model.predict(X_test))